@@ -0,0 +1,64 @@
+"""Benchmark: async run_date_checks vs. date_check in a thread pool.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_async.py
+Both sides look up the same distinct city/months (so no cache hits)
+from the local stand-in server, which waits LATENCY before answering,
+like a far-away website would.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append('../')
+from moon_module import functions
+from moon_module.month_cache import MonthCache
+from moon_module.fixture_pages import serve_pages
+from moon_module.async_scraper import run_date_checks
+
+LATENCY = 0.05
+CONCURRENCY = 32
+CITIES = ["San Diego", "Sacramento", "Concord", "Chicago", "Seattle",
+          "Dallas", "Phoenix", "Boston", "Denver", "Miami"]
+
+
+def queries():
+    """One query per city/month of 2020. (120 distinct month pages)"""
+    return [(city, "2020", str(month), "15")
+            for city in CITIES for month in range(1, 13)]
+
+
+def thread_pool(query_list: list):
+    """date_check every query with CONCURRENCY threads."""
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        return list(executor.map(lambda query: functions.date_check(*query),
+                                 query_list))
+
+
+def async_loop(query_list: list):
+    """date_check every query on one event loop, CONCURRENCY at a time."""
+    return run_date_checks(query_list, limit=CONCURRENCY)
+
+
+def timed(func, query_list: list):
+    """Seconds it takes func to answer every query, from a cold cache."""
+    functions.MONTH_CACHE = MonthCache()
+    start = time.perf_counter()
+    func(query_list)
+    return time.perf_counter() - start
+
+
+def main():
+    """Time both paths & print lookups/sec for each."""
+    query_list = queries()
+    with serve_pages(latency=LATENCY) as server:
+        functions.BASE_URL = server.base_url
+        for name, func in (("threads", thread_pool), ("asyncio", async_loop)):
+            seconds = timed(func, query_list)
+            print(f"{name:8} {len(query_list) / seconds:8.1f} lookups/sec "
+                  f"({seconds:.2f}s for {len(query_list)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark: batch_dic_calculator vs. a loop over dic_calculator.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_batch_phase.py
+Both sides compute the moon phase label of every day from 2000 to 2100.
+"""
+import sys
+import time
+import datetime as dt
+
+import numpy as np
+
+sys.path.append('../')
+from moon_module.functions import dic_calculator
+from moon_module.batch_phase import PHASE_LABELS, batch_dic_calculator
+
+
+def scalar_loop(dates: list):
+    """Phase label of each date, one dic_calculator call at a time."""
+    return [dic_calculator(date.year, date.month, date.day)
+            for date in dates]
+
+
+def batch_call(dates: np.ndarray):
+    """Phase label of each date, with a single batch_dic_calculator call."""
+    _, _, codes = batch_dic_calculator(dates)
+    return np.array(PHASE_LABELS)[codes]
+
+
+def best_of(func, arg, repeat: int = 5):
+    """Best wall time (in seconds) out of `repeat` runs of func(arg)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Time both paths & print dates/sec for each."""
+    dates = np.arange(np.datetime64(dt.date(2000, 1, 6)),
+                      np.datetime64(dt.date(2101, 1, 1)),
+                      dtype="datetime64[D]")
+    date_list = dates.tolist()
+
+    scalar_time = best_of(scalar_loop, date_list)
+    batch_time = best_of(batch_call, dates)
+
+    print(f"dates:  {len(dates)}")
+    print(f"scalar: {len(dates) / scalar_time:14,.0f} dates/sec")
+    print(f"batch:  {len(dates) / batch_time:14,.0f} dates/sec")
+    print(f"speed-up: {scalar_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark: soup_moon_table (whole page) vs. fast_moon_table (table only).
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_extract.py
+Both sides parse every recorded (real) timeanddate page, if there are any
+(see moon_module/fixture_pages.py), or else every synthetic page in
+moon_module/fixtures/synthetic_pages, & say which. (The synthetic ones
+only mirror the website's layout, so quote those numbers as synthetic)
+CPU time is per page, & peak memory is the most memory (per tracemalloc)
+that parsing one page needed at once.
+"""
+import sys
+import time
+import tracemalloc
+
+sys.path.append('../')
+from moon_module.functions import fast_moon_table, soup_moon_table
+from moon_module.fixture_pages import page_corpus
+
+ROUNDS = 20
+
+
+def cpu_per_page(parse, corpus: list):
+    """CPU seconds parse takes per page, over ROUNDS of the corpus."""
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        for content in corpus:
+            parse(content)
+    return (time.process_time() - start) / (ROUNDS * len(corpus))
+
+
+def peak_memory(parse, corpus: list):
+    """Most bytes allocated at once while parsing any one page."""
+    peak = 0
+    for content in corpus:
+        tracemalloc.start()
+        parse(content)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def main():
+    """Time & measure both parsers & print the results."""
+    kind, corpus = page_corpus()
+    print(f"{len(corpus)} {kind} pages")
+    results = {}
+    for name, parse in (("soup_moon_table", soup_moon_table),
+                        ("fast_moon_table", fast_moon_table)):
+        results[name] = (cpu_per_page(parse, corpus),
+                         peak_memory(parse, corpus))
+        cpu, peak = results[name]
+        print(f"{name:17} {cpu * 1e3:7.3f} ms CPU/page "
+              f"{peak / 1024:9.1f} KiB peak")
+
+    soup_cpu, soup_peak = results["soup_moon_table"]
+    fast_cpu, fast_peak = results["fast_moon_table"]
+    print(f"CPU {soup_cpu / fast_cpu:.1f}x less, "
+          f"memory {soup_peak / fast_peak:.1f}x less")
+
+
+if __name__ == "__main__":
+    main()
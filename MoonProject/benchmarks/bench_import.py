@@ -0,0 +1,80 @@
+"""Benchmark: how long a cold import of each part of moon_module takes.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_import.py
+Every import runs in a brand new Python with -X importtime, ROUNDS times,
+& the median is printed. Only what the import itself adds counts (not
+Python's own startup). It exits with 1 if the phase-only import goes over
+PHASE_BUDGET_MS, so it can be used as a check.
+"""
+import os
+import sys
+import statistics
+import subprocess
+
+ROUNDS = 5
+PHASE_BUDGET_MS = 50
+
+# What gets imported (& what it's for).
+IMPORTS = {
+    "phase only": "from moon_module.functions import check_date",
+    "gazetteer": "from moon_module.gazetteer import get_gazetteer",
+    "command line": "import moon_module.cli",
+    "scraping": "from moon_module.transport import fetch",
+    "offline engine": "from moon_module.lunar_engine import moon_rise_set",
+}
+HEAVY_MODULES = ("requests", "bs4", "numpy", "PIL", "sqlite3", "aiohttp")
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def top_level_imports(statement: str):
+    """{module: cumulative microseconds} of the top-level imports of a run."""
+    run = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                          statement], cwd=PROJECT_DIR, capture_output=True,
+                         text=True, check=True)
+    imports = {}
+    for line in run.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def import_ms(statement: str, startup: set):
+    """Milliseconds that the statement's imports took, minus startup."""
+    imports = top_level_imports(statement)
+    return sum(cumulative for name, cumulative in imports.items()
+               if name not in startup) / 1000
+
+
+def heavy_modules(statement: str):
+    """Which of HEAVY_MODULES the statement ends up loading."""
+    check = (f"{statement}\nimport sys\n"
+             f"print(*[m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    run = subprocess.run([sys.executable, "-c", check], cwd=PROJECT_DIR,
+                         capture_output=True, text=True, check=True)
+    return run.stdout.split()
+
+
+def main():
+    """Time every import, print it, & give 1 if phase-only is over budget."""
+    startup = set(top_level_imports("pass"))
+    timings = {}
+    for name, statement in IMPORTS.items():
+        timings[name] = statistics.median(import_ms(statement, startup)
+                                          for _ in range(ROUNDS))
+        heavy = ", ".join(heavy_modules(statement)) or "-"
+        print(f"{name:15} {timings[name]:8.1f} ms   heavy: {heavy}")
+
+    if timings["phase only"] > PHASE_BUDGET_MS:
+        print(f"phase only is over its {PHASE_BUDGET_MS} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Benchmark: offline moonrise/moonset lookups per second.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_lunar_engine.py
+1. One day per call (what date_check(..., offline=True) does)
+2. A whole year per call (city_place, moon_rise_set, vectorized over the days)
+"""
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('../')
+from moon_module.lunar_engine import (city_place, moon_rise_set,
+                                      offline_moon_scraper)
+
+
+def per_second(func, count: int):
+    """How many times per second func() runs, over `count` runs."""
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    """Time both ways & print lookups/sec."""
+    single = per_second(lambda: offline_moon_scraper("San Diego", 2020, 5, 12),
+                        500)
+    print(f"one day per call:  {single:10,.0f} lookups/sec")
+
+    latitude, longitude, timezone = city_place("San Diego")
+    days = np.arange(np.datetime64("2020-01-01"), np.datetime64("2021-01-01"))
+    years = per_second(lambda: moon_rise_set(latitude, longitude, timezone,
+                                             days), 20)
+    print(f"a year per call:   {years * len(days):10,.0f} lookups/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: what the metrics of the lookup pipeline cost, off & on.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_metrics.py
+Times check_date & a warm (cached) date_check with functions.METRICS off
+(None, the default) & on (a Metrics()). Off, every stage only runs a
+guard like GUARD below, so it also times that guard on its
+own, & exits with 1 if the guards of one lookup cost over OFF_BUDGET of it.
+"""
+import sys
+import timeit
+
+sys.path.append('../')
+from moon_module import functions
+from moon_module.metrics import Metrics
+from moon_module.month_cache import MonthCache
+from moon_module.fixture_pages import serve_pages
+
+# Most of a lookup the (disabled) guards are allowed to cost.
+OFF_BUDGET = 0.02
+
+# The guards a warm date_check passes through: date_check, check_date (3),
+# month_table (2), moon_scraper (2).
+GUARDS_PER_LOOKUP = 8
+
+# One disabled stage: the same checks functions.py does.
+GUARD = """
+metrics = METRICS
+started = metrics and metrics.clock()
+if metrics is not None:
+    metrics.observe("stage", started)
+"""
+
+
+def guard_cost(number: int = 1000000, repeat: int = 7):
+    """Seconds one disabled GUARD costs, on top of an empty statement."""
+    namespace = {"METRICS": None}
+    guarded = min(timeit.repeat(GUARD, number=number, repeat=repeat,
+                                globals=namespace))
+    empty = min(timeit.repeat("pass", number=number, repeat=repeat))
+    return max(guarded - empty, 0.0) / number
+
+
+def per_call(func, number: int, repeat: int = 7):
+    """Best time (in seconds) of one func() call, out of `repeat` runs."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main():
+    """Time both lookups with metrics off & on, & the guard on its own."""
+    with serve_pages() as server:
+        functions.BASE_URL = server.base_url
+        functions.MONTH_CACHE = MonthCache()
+        functions.date_check("San Diego", "2020", "5", "12")
+
+        lookups = {
+            "check_date": lambda: functions.check_date("2020", "5", "12"),
+            "date_check (warm)": lambda: functions.date_check(
+                "San Diego", "2020", "5", "12"),
+        }
+        timings = {}
+        for name, lookup in lookups.items():
+            functions.METRICS = None
+            off = per_call(lookup, 20000)
+            functions.METRICS = Metrics()
+            on = per_call(lookup, 20000)
+            functions.METRICS = None
+            timings[name] = off
+            print(f"{name:18} off {off * 1e6:7.2f} us   on {on * 1e6:7.2f} us"
+                  f"   (+{(on - off) / off:.0%} when on)")
+
+    one_guard = guard_cost()
+    share = GUARDS_PER_LOOKUP * one_guard / timings["date_check (warm)"]
+    print(f"one disabled guard: {one_guard * 1e9:.1f} ns, "
+          f"{GUARDS_PER_LOOKUP} of them = {share:.2%} of a warm date_check "
+          f"(budget {OFF_BUDGET:.0%})")
+    return 0 if share <= OFF_BUDGET else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
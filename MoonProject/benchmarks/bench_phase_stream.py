@@ -0,0 +1,71 @@
+"""Benchmark: iter_phase_chunks with 1, 2, 4 & 8 worker processes.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_phase_stream.py
+Streams the phase code of every day from --first to --last (Jan 1st to
+Dec 31st; 1000 to 3000 by default, so ~730,000 days, & at least 100
+years is the point) & prints days/sec, the speed-up over 1 worker & how
+close that is to linear. Every run has to give the same phase codes.
+The chunk size is iter_phase_chunks's default (several chunks per
+worker) unless --chunk-days is given.
+Past the number of cores (os.cpu_count()), more workers can't help.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append('../')
+from moon_module.batch_phase import iter_phase_chunks
+
+WORKERS = (1, 2, 4, 8)
+
+
+def stream(first: str, last: str, workers: int, chunk_days: int):
+    """Read every chunk like a caller would (a checksum, not a list), so
+    only the chunks in flight are ever in memory."""
+    days = chunks = 0
+    counts = np.zeros(8, dtype=np.int64)
+    for chunk in iter_phase_chunks(first, last, chunk_days=chunk_days,
+                                   workers=workers):
+        days += len(chunk.dates)
+        chunks += 1
+        counts += np.bincount(chunk.phase_codes, minlength=8)
+    return days, chunks, counts
+
+
+def main(argv=None):
+    """Time each number of workers & print how they scale."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--first", type=int, default=1000)
+    parser.add_argument("--last", type=int, default=3000)
+    parser.add_argument("--chunk-days", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.last - args.first + 1 < 100:
+        parser.error("give at least 100 years")
+    if args.first < 1 or args.last > 9999:
+        parser.error("give years from 1 to 9999")
+
+    first, last = f"{args.first:04d}-01-01", f"{args.last:04d}-12-31"
+    print(f"{first} to {last}, {os.cpu_count()} cores")
+
+    one_worker = None
+    for workers in WORKERS:
+        start = time.perf_counter()
+        days, chunks, counts = stream(first, last, workers, args.chunk_days)
+        seconds = time.perf_counter() - start
+
+        if one_worker is None:
+            one_worker, expected = seconds, counts
+        assert np.array_equal(counts, expected)
+        speed_up = one_worker / seconds
+        print(f"{workers} workers: {days / seconds:14,.0f} days/sec  "
+              f"{speed_up:4.2f}x  ({speed_up / workers:4.0%} of linear)  "
+              f"{chunks} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark: memory of date_check's lists vs. MoonResult vs. MoonResults.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_results.py
+Holds ROWS results 3 ways, measured with tracemalloc:
+1. [city, date, ["moonrise", "moonset", "moon phase"]] lists, with new
+   str for every time, like scraped pages give. (Today's way)
+2. (city, date, MoonResult) tuples.
+3. One MoonResults. (& how long its to_csv takes)
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import datetime as dt
+
+sys.path.append('../')
+from moon_module.results import MoonResult, MoonResults, format_minutes
+
+ROWS = 200000
+CITIES = ["San Diego", "Sacramento", "Concord", "Chicago", "Seattle"]
+
+
+def outputs():
+    """ROWS (city, date, date_check output) with made-up times & phases."""
+    start = dt.date(2000, 1, 1)
+    for count in range(ROWS):
+        # "".join, so every time is a new str (like parsed pages give).
+        yield (CITIES[count % len(CITIES)],
+               start + dt.timedelta(days=count // len(CITIES) % 36500),
+               ["".join(format_minutes(count % 1440)),
+                "".join(format_minutes((count * 7) % 1440)),
+                "Waxing Gibbous"])
+
+
+def held(make):
+    """Bytes still allocated once make() is done (& what it made)."""
+    tracemalloc.start()
+    made = make()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, made
+
+
+def main():
+    """Measure the 3 ways & print bytes/row of each."""
+    sizes = {}
+    sizes["lists"], _ = held(lambda: [[city, date, output]
+                                      for city, date, output in outputs()])
+    sizes["MoonResult"], _ = held(lambda: [
+        (city, date, MoonResult.from_output(output))
+        for city, date, output in outputs()])
+
+    def columnar():
+        results = MoonResults(capacity=ROWS)
+        for city, date, output in outputs():
+            results.append(city, date, MoonResult.from_output(output))
+        return results
+
+    sizes["MoonResults"], results = held(columnar)
+
+    for name, size in sizes.items():
+        print(f"{name:12} {size / ROWS:7.1f} bytes/row "
+              f"({size / 2 ** 20:7.1f} MiB for {ROWS:,} rows)")
+
+    path = os.path.join(tempfile.mkdtemp(), "results.csv")
+    start = time.perf_counter()
+    results.to_csv(path)
+    seconds = time.perf_counter() - start
+    print(f"to_csv: {ROWS / seconds:,.0f} rows/sec "
+          f"({os.path.getsize(path) / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark: a bare requests.get() per page vs. transport.fetch().
+
+Notes
+-----
+Run from this folder (same as the GUI script): python bench_transport.py
+Both sides download the same page REQUESTS times from the local stand-in
+server. The difference is the connection setup that fetch() saves by
+keeping its connections open. (Over the internet, with TLS on top,
+the saving per request is much bigger than on localhost.)
+"""
+import sys
+import time
+import statistics
+
+import requests
+
+sys.path.append('../')
+from moon_module import transport
+from moon_module.fixture_pages import serve_pages
+
+REQUESTS = 300
+
+
+def latencies(get, link: str):
+    """Seconds each of REQUESTS downloads of link took."""
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        get(link).content
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    """Time both ways & print the median/mean latency of each."""
+    with serve_pages() as server:
+        link = f"{server.base_url}/moon/usa/san-diego?month=1&year=2006"
+        for name, get in (("requests.get", requests.get),
+                          ("transport.fetch", transport.fetch)):
+            before = server.connection_count
+            timings = latencies(get, link)
+            print(f"{name:16} median {statistics.median(timings) * 1e3:6.2f} "
+                  f"ms  mean {statistics.mean(timings) * 1e3:6.2f} ms  "
+                  f"connections {server.connection_count - before}")
+
+
+if __name__ == "__main__":
+    main()
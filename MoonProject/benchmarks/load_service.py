@@ -0,0 +1,161 @@
+"""Load test: the HTTP/JSON service, against the local stand-in website.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python load_service.py
+The service runs on its own thread & event loop (like its own process
+would), in front of the stand-in server, which waits --latency before
+every page. --clients clients then send --requests requests (a mix of
+/phase, /riseset, /range & /compare over a few cities & months) as fast
+as they're answered. It prints requests/sec & p50/p99 latency for every
+endpoint, for the first (cold cache) round & a second (warm) one.
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+import threading
+import statistics
+
+import aiohttp
+from aiohttp import web
+
+sys.path.append('../')
+from moon_module import functions
+from moon_module.month_cache import MonthCache
+from moon_module.fixture_pages import serve_pages
+from moon_module.service import MoonService, make_app
+
+CITIES = ["San Diego", "Sacramento", "Concord", "Chicago", "Seattle",
+          "Dallas", "Phoenix", "Boston"]
+
+
+def request_mix(count: int, seed: int = 18):
+    """count (path, params) requests, the same ones for the same seed."""
+    randomness = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        city = randomness.choice(CITIES)
+        date = f"2020-{randomness.randint(1, 12):02d}-" \
+               f"{randomness.randint(1, 28):02d}"
+        kind = randomness.random()
+        if kind < 0.2:
+            requests.append(("/phase", {"date": date}))
+        elif kind < 0.8:
+            requests.append(("/riseset", {"city": city, "date": date}))
+        elif kind < 0.9:
+            requests.append(("/range", {"city": city, "start": date,
+                                        "end": date[:5] + "12-31"}))
+        else:
+            requests.append(("/compare", [("city", other) for other in
+                                          randomness.sample(CITIES, 4)]
+                             + [("date", date)]))
+    return requests
+
+
+def start_service(settings: dict):
+    """Run the service on a thread of its own.
+
+    Returns
+    -------
+    url, stop : str, callable
+        Where it's listening, & what stops it.
+    """
+    ready = threading.Event()
+    state = {}
+
+    async def serve():
+        runner = web.AppRunner(make_app(MoonService(**settings)))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        state["url"] = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        state["stop"] = asyncio.Event()
+        ready.set()
+        await state["stop"].wait()
+        await runner.cleanup()
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(serve(),), daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(state["stop"].set)
+        thread.join()
+
+    return state["url"], stop
+
+
+async def load(url: str, requests: list, clients: int):
+    """Send every request, clients at a time.
+
+    Returns
+    -------
+    seconds, latencies, errors : float, dict, int
+        How long it all took, {path: [seconds of each]}, & non-200s.
+    """
+    latencies = {}
+    errors = 0
+    pending = iter(requests)
+    connector = aiohttp.TCPConnector(limit=clients)
+
+    async def client(session):
+        nonlocal errors
+        for path, params in pending:
+            start = time.perf_counter()
+            async with session.get(url + path, params=params) as answer:
+                await answer.read()
+                errors += answer.status != 200
+            latencies.setdefault(path, []).append(
+                time.perf_counter() - start)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+        return time.perf_counter() - start, latencies, errors
+
+
+def report(name: str, seconds: float, latencies: dict, errors: int):
+    """Print requests/sec, & p50/p99 latency of every endpoint."""
+    every = [latency for values in latencies.values() for latency in values]
+    print(f"{name}: {len(every) / seconds:8.1f} requests/sec "
+          f"({len(every)} in {seconds:.2f}s, {errors} errors)")
+    for path, values in sorted(latencies.items()) + [("all", every)]:
+        cuts = statistics.quantiles(values, n=100)
+        print(f"  {path:9} {len(values):6} requests   "
+              f"p50 {cuts[49] * 1000:8.2f} ms   "
+              f"p99 {cuts[98] * 1000:8.2f} ms")
+
+
+def main(argv=None):
+    """Run the cold & warm rounds & print what they gave."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds the stand-in website waits per page")
+    parser.add_argument("--max-concurrent", type=int, default=64)
+    parser.add_argument("--max-waiting", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    requests = request_mix(args.requests)
+    with serve_pages(latency=args.latency) as upstream:
+        functions.BASE_URL = upstream.base_url
+        functions.MONTH_CACHE = MonthCache()
+        url, stop = start_service({"max_concurrent": args.max_concurrent,
+                                   "max_waiting": args.max_waiting})
+        try:
+            for name in ("cold", "warm"):
+                report(name, *asyncio.run(load(url, requests, args.clients)))
+        finally:
+            stop()
+        print(f"upstream: {upstream.request_count} pages downloaded, over "
+              f"{upstream.connection_count} connections")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Benchmark suite: every step of a lookup, offline, compared to a baseline.
+
+Notes
+-----
+Run from this folder (same as the GUI script): python run_benchmarks.py
+The pages come from moon_module/fixtures/synthetic_pages, served by the
+local stand-in server, so it runs without internet & the timings aren't
+at the mercy of the website. Those pages are synthetic (they only mirror
+the website's layout), so fast_moon_table parses the recorded, real ones
+instead if there are any (see moon_module/fixture_pages.py). Each kind
+of pages ("synthetic" or "recorded") has its own baseline in
+baseline.json, & a run is only compared to its own kind's. For every case
+it reports:
+1. ops/sec
+2. p50/p95/p99 latency of one op
+3. peak memory of one op (tracemalloc, in a separate pass)
+Then it compares them to the baseline (made with --save-baseline), &
+with --check, exits with 1 if any case got more than --tolerance slower.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+import itertools
+import statistics
+import tracemalloc
+
+sys.path.append('../')
+from moon_module import functions
+from moon_module.month_cache import MonthCache
+from moon_module.fixture_pages import page_corpus, serve_pages
+from moon_module.page_archive import PageArchive, pack_archive
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "baseline.json")
+
+# (city, year, month, day) of every synthetic page.
+QUERIES = [("San Diego", 2006, 1, 7), ("San Diego", 2006, 7, 16),
+           ("Sacramento", 2016, 1, 12), ("Concord", 2022, 6, 8),
+           ("Chicago", 2019, 4, 10), ("Seattle", 2013, 10, 11),
+           ("Dallas", 2010, 12, 27), ("Phoenix", 2027, 7, 27),
+           ("San Diego", 2000, 1, 5), ("San Diego", 2020, 5, 12)]
+
+
+def cycle_of(items):
+    """A function that gives the next item of items, round & round."""
+    return itertools.cycle(items).__next__
+
+
+def case_dic_interpreter():
+    """dic_interpreter over the whole synodic month."""
+    next_dic = cycle_of([day / 10 for day in range(296)])
+    return lambda: functions.dic_interpreter(next_dic()), 100
+
+
+def case_dic_calculator():
+    """dic_calculator over every 37th day from 2000 to 2100."""
+    next_date = cycle_of([(2000 + count % 100, count % 12 + 1,
+                           count % 28 + 1) for count in range(0, 36500, 37)])
+    return lambda: functions.dic_calculator(*next_date()), 100
+
+
+def case_check_date():
+    """check_date (validation + lunation index), from str like the GUI."""
+    next_date = cycle_of([(str(1900 + count % 200), str(count % 12 + 1),
+                           str(count % 28 + 1)) for count in range(1000)])
+    return lambda: functions.check_date(*next_date()), 100
+
+
+def case_city_format():
+    """city_format on the cities of the tests (odd spellings included)."""
+    next_city = cycle_of(["San Diego", "Sacr@amen@to", "Coeur d’Alene",
+                          "St. Louis", "PHO!!enix", "SeaTTle"])
+    return lambda: functions.city_format(next_city()), 100
+
+
+def case_fast_moon_table():
+    """The fast HTML extraction step of moon_scraper (with FAST_TABLE on),
+    on every page of page_corpus."""
+    next_page = cycle_of(page_corpus()[1])
+    return lambda: functions.fast_moon_table(next_page()), 1
+
+
+def case_date_check_cold():
+    """date_check end-to-end, downloading the page every time."""
+    next_query = cycle_of([[str(part) for part in query]
+                           for query in QUERIES])
+
+    def cold_date_check():
+        functions.MONTH_CACHE = MonthCache()
+        return functions.date_check(*next_query())
+
+    return cold_date_check, 1
+
+
+def case_date_check_warm():
+    """date_check end-to-end, with every month already in MONTH_CACHE."""
+    functions.MONTH_CACHE = MonthCache()
+    next_query = cycle_of([[str(part) for part in query]
+                           for query in QUERIES])
+    for query in QUERIES:
+        functions.date_check(*map(str, query))
+    return lambda: functions.date_check(*next_query()), 10
+
+
+def case_date_check_replay():
+    """date_check end-to-end, replaying every page from a PageArchive."""
+    path = os.path.join(tempfile.mkdtemp(), "pages.zip")
+    for city, year, month, _ in QUERIES:
+        pack_archive(path, [city], [year])
+    functions.PAGE_ARCHIVE = PageArchive(path)
+    next_query = cycle_of([[str(part) for part in query]
+                           for query in QUERIES])
+
+    def replay_date_check():
+        functions.MONTH_CACHE = MonthCache()
+        return functions.date_check(*next_query())
+
+    return replay_date_check, 1
+
+
+CASES = {
+    "dic_interpreter": case_dic_interpreter,
+    "dic_calculator": case_dic_calculator,
+    "check_date": case_check_date,
+    "city_format": case_city_format,
+    "fast_moon_table": case_fast_moon_table,
+    "date_check_cold": case_date_check_cold,
+    "date_check_warm": case_date_check_warm,
+    "date_check_replay": case_date_check_replay,
+}
+
+
+def measure(op, batch: int, seconds: float):
+    """Time op for about `seconds`, `batch` calls per sample.
+
+    Returns
+    -------
+    result : dict
+        ops_per_sec, & p50/p95/p99 of one call in microseconds.
+    """
+    # Warm up (first calls load modules, fill caches, etc.)
+    for _ in range(batch * 3):
+        op()
+
+    samples = []
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline or len(samples) < 20:
+        sample_start = time.perf_counter()
+        for _ in range(batch):
+            op()
+        samples.append((time.perf_counter() - sample_start) / batch)
+        calls += batch
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(samples, n=100)
+    return {"ops_per_sec": calls / elapsed,
+            "p50_us": percentiles[49] * 1e6,
+            "p95_us": percentiles[94] * 1e6,
+            "p99_us": percentiles[98] * 1e6}
+
+
+def peak_memory(op, calls: int = 50):
+    """Most bytes allocated at once during any one of `calls` calls."""
+    peak = 0
+    tracemalloc.start()
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        op()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return peak
+
+
+def run_suite(names, seconds: float):
+    """Run the named cases, printing each one as it finishes."""
+    results = {}
+    with serve_pages() as server:
+        functions.BASE_URL = server.base_url
+        for name in names:
+            op, batch = CASES[name]()
+            result = measure(op, batch, seconds)
+            result["peak_kib"] = peak_memory(op) / 1024
+            results[name] = result
+            functions.PAGE_ARCHIVE = None
+            print(f"{name:17} {result['ops_per_sec']:12,.0f} ops/sec  "
+                  f"p50 {result['p50_us']:9.2f}  p95 {result['p95_us']:9.2f}"
+                  f"  p99 {result['p99_us']:9.2f} us  "
+                  f"peak {result['peak_kib']:8.1f} KiB")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Print each case's speed vs. the baseline, & give the slower ones."""
+    regressions = []
+    print(f"\nvs. {BASELINE_PATH} ({baseline['meta']['python']}, "
+          f"{baseline['meta']['machine']}, {baseline['meta']['saved']})")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:17} (not in the baseline)")
+            continue
+        ratio = result["ops_per_sec"] / before["ops_per_sec"]
+        slower = ratio < 1 - tolerance
+        if slower:
+            regressions.append(name)
+        print(f"{name:17} {ratio:6.2f}x ops/sec  "
+              f"p99 {before['p99_us']:9.2f} -> {result['p99_us']:9.2f} us"
+              f"{'  <- SLOWER' if slower else ''}")
+    return regressions
+
+
+def main(argv=None):
+    """Run the suite, then save or compare to the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*",
+                        help=f"which cases to run (default: all of "
+                             f"{', '.join(CASES)})")
+    parser.add_argument("--seconds", type=float, default=1.0,
+                        help="time spent measuring each case")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with 1 if a case got slower")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="how much slower counts as slower (0.25=25%%)")
+    args = parser.parse_args(argv)
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"no such case: {', '.join(sorted(unknown))}")
+
+    pages = page_corpus()[0]
+    print(f"fast_moon_table on {pages} pages, date_check on synthetic "
+          f"pages\n")
+    results = run_suite(args.cases or list(CASES), args.seconds)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as baseline_file:
+            baselines = json.load(baseline_file)
+
+    if args.save_baseline:
+        # Only this kind of pages' baseline is replaced.
+        baselines[pages] = {"meta": {"python": platform.python_version(),
+                                     "machine": platform.machine(),
+                                     "saved": time.strftime("%Y-%m-%d")},
+                            "results": results}
+        with open(BASELINE_PATH, "w") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"\nsaved the {pages} pages' baseline in {BASELINE_PATH}")
+        return 0
+
+    if pages not in baselines:
+        print(f"\nno baseline on {pages} pages yet (run with "
+              f"--save-baseline)")
+        return 0
+    regressions = compare(results, baselines[pages], args.tolerance)
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
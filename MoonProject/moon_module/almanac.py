@@ -0,0 +1,334 @@
+"""This contains the almanac: a year (or decade) of lookups, precomputed.
+
+Notes
+-----
+For a fixed set of cities, every lookup can be worked out once & saved,
+so answering one needs no download, no parsing & no phase math at all:
+(1) build_almanac downloads the month tables of every city & month at the
+    same time (through almanac_month_table, so MONTH_CACHE/PAGE_ARCHIVE
+    work as usual), takes each month's phases from the lunation index (so
+    they match check_date), & writes one fixed-width binary file. A page
+    that comes back as an error (like a 503) stops the build, rather than
+    being saved for good as an "invalid city".
+(2) The file is a header, a city index (every slug, NUL padded to the
+    same width) & then RECORD.size bytes per city per day, city by city:
+    a MoonResult (phase code, status code, moonrise & moonset as minutes
+    since midnight).
+(3) Almanac mmaps the file, so a lookup is an offset computed from the
+    city & date, & one 6 byte unpack. Every process that opens the same
+    file shares the same pages of it (the OS's page cache).
+(4) functions.lookup_month_table asks Almanac.month_table first, so every
+    month lookup (date_range, compare, the service...) answers from it.
+
+To have date_check (& the rest) use it, either set the MOON_ALMANAC_PATH
+environment variable before importing functions, or do:
+functions.ALMANAC = Almanac("top_cities.almanac")
+1. UpstreamError
+2. almanac_month_table
+3. almanac_records
+4. build_almanac
+5. Almanac
+"""
+import os
+import mmap
+import calendar
+import struct
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import functions
+    from .month_cache import MISSING
+    from .results import (INVALID_CITY, INVALID_DATE, NO_PHASE, NO_TIME,
+                          MoonResult)
+    from .date_range import months_in_span
+except ImportError:
+    import functions
+    from month_cache import MISSING
+    from results import (INVALID_CITY, INVALID_DATE, NO_PHASE, NO_TIME,
+                         MoonResult)
+    from date_range import months_in_span
+
+# Magic, number of cities, bytes per city slug, the first day (as a
+# date.toordinal()) & the number of days.
+HEADER = struct.Struct("<4sHHii")
+MAGIC = b"ALMN"
+
+# One city's day, in MoonResult's order. (6 bytes)
+RECORD = struct.Struct("<bbhh")
+
+# What a page without a moon table can come back as, & still mean the
+# city (or month) really doesn't have one. (Anything else is an error)
+NO_TABLE_STATUSES = (200, 404)
+
+
+class UpstreamError(OSError):
+    """A month page came back as an error (like a 503), not as a table.
+
+    Notes
+    -----
+    It's an OSError, like every error of requests, so it's handled the
+    same way as "couldn't reach the website".
+    """
+
+
+def almanac_month_table(key: tuple):
+    """Get a month table like month_table does, but never guess on errors.
+
+    Parameter
+    ---------
+    key : tuple
+        (formatted city, year, month) (Example: ("san-diego", 2020, 5))
+
+    Returns
+    -------
+    month_rows : dict or None
+        Same as month_table. None only if the page really has no table.
+
+    Raises
+    ------
+    UpstreamError
+        If the page has no table & its status isn't in NO_TABLE_STATUSES.
+        (Nothing is saved in MONTH_CACHE/MONTH_STORE then)
+    """
+    month_rows = functions.cached_month_table(key)
+    if month_rows is not MISSING:
+        return month_rows
+
+    page = functions.fetch(functions.month_link(*key))
+    month_rows = functions.parse_moon_table(page.content)
+    if month_rows is None and page.status_code not in NO_TABLE_STATUSES:
+        raise UpstreamError(f"HTTP {page.status_code} for {key}")
+    functions.save_month_table(key, month_rows, page.status_code)
+    return month_rows
+
+
+def almanac_records(month_rows, year: int, month: int):
+    """The RECORD bytes of every day of one city's month.
+
+    Parameters
+    ----------
+    month_rows : dict or None
+        What month_table gave. (None for an invalid city)
+    year, month : int
+        Speaks for itself.
+
+    Returns
+    -------
+    records : bytes
+        RECORD.size bytes per day, day 1 first.
+    """
+    records = bytearray()
+    phases = functions.month_phases(year, month)
+    for day, moon_phase in enumerate(phases, start=1):
+        if month_rows is None or day not in month_rows:
+            rise_and_set = functions.NO_TABLE
+        else:
+            rise_and_set = month_rows[day]
+        records += RECORD.pack(*MoonResult.from_output([*rise_and_set,
+                                                        moon_phase]))
+    return bytes(records)
+
+
+def build_almanac(path: str, cities, first_date: dt.date,
+                  last_date: dt.date, workers: int = 16):
+    """Look up every city & day from first_date to last_date, & save them.
+
+    Parameters
+    ----------
+    path : str
+        The almanac file. (Replaced all at once, so anyone reading the old
+        one keeps reading it until they open it again)
+    cities : list of str
+        US cities. (Spellings of the same city are only kept once)
+    first_date, last_date : dt.date
+        The first & last day. (Both included)
+    workers : int
+        The most month pages downloading at the same time.
+
+    Returns
+    -------
+    slugs : list of str
+        The almanac's cities, in the order they're saved.
+
+    Raises
+    ------
+    OSError
+        If a page couldn't be downloaded, or came back as an error
+        (UpstreamError). path is left as it was, so try again later.
+
+    Notes
+    -----
+    An invalid city (or one timeanddate doesn't know) is saved anyway,
+    with every day's status being "invalid city", like date_check gives.
+    """
+    lookups = {}
+    for city in cities:
+        slug = functions.canonical_city(city)
+        if slug is None:
+            raise ValueError(f"{city!r} isn't a US city")
+        lookups.setdefault(slug, city)
+    if not lookups or last_date < first_date:
+        raise ValueError("give at least one city & one day")
+
+    months = months_in_span(first_date, last_date)
+    keys = [(slug, year, month) for slug in lookups
+            for year, month in months]
+
+    def city_month(key):
+        _, year, month = key
+        return almanac_records(almanac_month_table(key), year, month)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(keys))),
+                            thread_name_prefix="moon-almanac") as pool:
+        month_records = pool.map(city_month, keys)
+
+        # Only the days from first_date (in its month) to last_date.
+        skip = (first_date.day - 1) * RECORD.size
+        days = last_date.toordinal() - first_date.toordinal() + 1
+        name_width = max(len(slug.encode()) for slug in lookups)
+        temporary = f"{path}.tmp"
+        try:
+            with open(temporary, "wb") as almanac_file:
+                almanac_file.write(HEADER.pack(MAGIC, len(lookups),
+                                               name_width,
+                                               first_date.toordinal(), days))
+                for slug in lookups:
+                    almanac_file.write(
+                        slug.encode().ljust(name_width, b"\0"))
+                for slug in lookups:
+                    city_records = b"".join(next(month_records)
+                                            for _ in months)
+                    almanac_file.write(
+                        city_records[skip:skip + days * RECORD.size])
+        except BaseException:
+            # Don't download the rest, & don't leave half a file around.
+            pool.shutdown(wait=False, cancel_futures=True)
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    os.replace(temporary, path)
+    return list(lookups)
+
+
+class Almanac:
+    """Read-only, mmapped almanac that build_almanac saved.
+
+    Parameter
+    ---------
+    path : str
+        The almanac file.
+
+    Notes
+    -----
+    Use it as "with Almanac(path) as almanac:", or close() it when done.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as almanac_file:
+            self._map = mmap.mmap(almanac_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+        magic, city_count, name_width, self.first_ordinal, self.days = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} isn't an almanac")
+
+        self.cities = [
+            self._map[HEADER.size + count * name_width:
+                      HEADER.size + (count + 1) * name_width]
+            .rstrip(b"\0").decode() for count in range(city_count)]
+        self._index = {slug: count for count, slug in enumerate(self.cities)}
+        self._records_at = HEADER.size + city_count * name_width
+        self._city_size = self.days * RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """How many (city, day) records it has."""
+        return len(self.cities) * self.days
+
+    @property
+    def first_date(self):
+        return dt.date.fromordinal(self.first_ordinal)
+
+    @property
+    def last_date(self):
+        return dt.date.fromordinal(self.first_ordinal + self.days - 1)
+
+    def city_number(self, us_city: str):
+        """Where a city is in the city index, or None if it isn't in it.
+
+        Notes
+        -----
+        The city goes through canonical_city first, like every lookup, so
+        "Concord, CA" & "concord-ca" find the same city, & "Concord"
+        doesn't find a "concord-ca" it wouldn't have been looked up as.
+        """
+        return self._index.get(functions.canonical_city(us_city))
+
+    def lookup(self, us_city: str, year: int, month: int, day: int):
+        """Get the saved MoonResult of a city & date, in O(1).
+
+        Returns
+        -------
+        result : MoonResult or None
+            None if the city or date isn't in the almanac. (An impossible
+            date, like Feb 30th, is an "invalid date" MoonResult)
+        """
+        number = self.city_number(us_city)
+        if number is None:
+            return None
+        try:
+            offset = dt.date(int(year), int(month), int(day)).toordinal() \
+                - self.first_ordinal
+        except ValueError:
+            return MoonResult(NO_PHASE, INVALID_DATE, NO_TIME, NO_TIME)
+        if not 0 <= offset < self.days:
+            return None
+
+        return MoonResult._make(RECORD.unpack_from(
+            self._map, self._records_at + number * self._city_size
+            + offset * RECORD.size))
+
+    def month_table(self, key: tuple):
+        """Get a whole month of a city, like functions.month_table gives.
+
+        Parameter
+        ---------
+        key : tuple
+            (formatted city, year, month) (Example: ("san-diego", 2020, 5))
+
+        Returns
+        -------
+        month_rows : dict or None or MISSING
+            {day: ("moonrise", "moonset")}, or None for an invalid city.
+            MISSING if the city or any day of the month isn't in it.
+        """
+        slug, year, month = key
+        number = self._index.get(slug)
+        if number is None:
+            return MISSING
+        offset = dt.date(year, month, 1).toordinal() - self.first_ordinal
+        days = calendar.monthrange(year, month)[1]
+        if offset < 0 or offset + days > self.days:
+            return MISSING
+
+        at = self._records_at + number * self._city_size + offset * RECORD.size
+        month_rows = {}
+        for day in range(1, days + 1):
+            result = MoonResult._make(RECORD.unpack_from(
+                self._map, at + (day - 1) * RECORD.size))
+            if result.status != INVALID_CITY:
+                month_rows[day] = tuple(result.to_output()[:2])
+        return month_rows or None
+
+    def close(self):
+        self._map.close()
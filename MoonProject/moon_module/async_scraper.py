@@ -0,0 +1,224 @@
+"""This contains the asyncio versions of moon_scraper & date_check.
+
+Notes
+-----
+moon_scraper blocks its thread for the whole download, so answering many
+cities at once costs a thread per lookup. AsyncMoonClient does the same
+lookups as coroutines on one event loop instead:
+1. One aiohttp session (& connection pool) for every lookup
+2. At most `limit` downloads at the same time
+3. Lookups for the same city/month share one download
+   (& a stale month table is served at once, while it downloads again)
+4. Same MONTH_CACHE/MONTH_STORE/PAGE_ARCHIVE & parsing as moon_scraper,
+   so the outputs are exactly the same (MONTH_STORE's SQLite,
+   PAGE_ARCHIVE's zip file & the parsing run on the loop's default
+   executor, so they never hold up the other lookups)
+run_date_checks is the shortcut for calling it from normal (sync) code.
+"""
+import asyncio
+
+import aiohttp
+
+try:
+    from . import functions
+except ImportError:
+    import functions
+
+
+class PageParseError(ValueError):
+    """A month page was downloaded, but parsing it failed."""
+
+
+class AsyncMoonClient:
+    """Async moon_scraper/date_check, sharing one session & limit.
+
+    Parameters
+    ----------
+    limit : int
+        The most month pages to be downloading at the same time.
+    timeout : float
+        Seconds before giving up on a download.
+
+    Notes
+    -----
+    Use it as "async with AsyncMoonClient() as client:".
+    """
+
+    def __init__(self, limit: int = 32, timeout: float = 30.0):
+        self.limit = limit
+        self.timeout = timeout
+        self.session = None
+        self._semaphore = asyncio.Semaphore(limit)
+        self._in_flight = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.limit)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    @staticmethod
+    def _parse_and_save(key: tuple, link: str, content: bytes,
+                        status_code: int):
+        """parse_moon_table & save_month_table, for the executor."""
+        try:
+            month_rows = functions.parse_moon_table(content)
+        except Exception as error:
+            raise PageParseError(f"couldn't parse {link}: {error!r}") \
+                from error
+        functions.save_month_table(key, month_rows, status_code)
+        return month_rows
+
+    async def _download(self, key: tuple):
+        """Download, parse & save one month table."""
+        city, year, month = key
+        link = functions.month_link(city, year, month)
+        loop = asyncio.get_running_loop()
+        archive = functions.PAGE_ARCHIVE
+        page = None
+        if archive is not None and (
+                link in archive or (archive.mode == "replay"
+                                    and archive.on_miss == "error")):
+            # Reads the zip file (or raises ArchiveMiss).
+            page = await loop.run_in_executor(None, archive.fetch, link)
+
+        if page is not None:
+            content, status_code = page.content, page.status_code
+        else:
+            metrics = functions.METRICS
+            async with self._semaphore:
+                started = metrics and metrics.clock()
+                try:
+                    async with self.session.get(link) as page:
+                        content = await page.read()
+                        status_code = page.status
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if metrics is not None:
+                        metrics.count("upstream_errors")
+                    raise
+            if metrics is not None:
+                metrics.observe("fetch", started)
+                metrics.count("bytes_downloaded", len(content))
+                if status_code >= 500:
+                    metrics.count("upstream_errors")
+            if archive is not None and archive.mode == "record":
+                await loop.run_in_executor(None, archive.record, link,
+                                           status_code, content)
+
+        return await loop.run_in_executor(None, self._parse_and_save, key,
+                                          link, content, status_code)
+
+    def _download_once(self, key: tuple):
+        """The task downloading key, started only if there isn't one."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    async def month_lookup(self, us_city: str, year: (str, int),
+                           month: (str, int)):
+        """Async version of functions.month_lookup."""
+        metrics = functions.METRICS
+        city = functions.canonical_city(us_city)
+        if city is None:
+            if metrics is not None:
+                metrics.count("invalid_cities")
+            return functions.MonthLookup(None, functions.FRESH)
+        key = (city, int(year), int(month))
+
+        if functions.MONTH_STORE is None:
+            month_rows, freshness = functions.lookup_month_table(key)
+        else:
+            # A MONTH_CACHE miss reads SQLite.
+            month_rows, freshness = await asyncio.get_running_loop() \
+                .run_in_executor(None, functions.lookup_month_table, key)
+        if freshness is functions.STALE:
+            if metrics is not None:
+                metrics.count("stale_hits")
+            # Nobody waits on the refresh, so a failed one is only
+            # retrieved (the stale copy is still good for now).
+            self._download_once(key).add_done_callback(
+                lambda task: task.cancelled() or task.exception())
+        elif month_rows is not functions.MISSING:
+            if metrics is not None:
+                metrics.count("cache_hits")
+        else:
+            if metrics is not None:
+                metrics.count("cache_misses")
+            # Someone else is already downloading it, so wait on theirs.
+            month_rows = await asyncio.shield(self._download_once(key))
+            freshness = functions.FRESH
+
+        if month_rows is None and metrics is not None:
+            metrics.count("invalid_cities")
+        return functions.MonthLookup(month_rows, freshness)
+
+    async def month_table(self, us_city: str, year: (str, int),
+                          month: (str, int)):
+        """Async version of functions.month_table."""
+        return (await self.month_lookup(us_city, year, month)).month_rows
+
+    async def moon_scraper(self, us_city: str, year: (str, int),
+                           month: (str, int), day: (str, int)):
+        """Async version of functions.moon_scraper."""
+        month_rows = await self.month_table(us_city, year, month)
+
+        if month_rows is None or int(day) not in month_rows:
+            return list(functions.NO_TABLE)
+
+        return list(month_rows[int(day)])
+
+    async def date_check(self, str_city: str, str_year: str, str_month: str,
+                         str_day: str):
+        """Async version of functions.date_check."""
+        date, moon_phase = functions.check_date(str_year, str_month, str_day)
+
+        if date is not None:
+            moon_rise_and_set = await self.moon_scraper(str_city, *date)
+        else:
+            moon_rise_and_set = ["Invalid Date", "Invalid Date"]
+
+        moon_rise_and_set.append(moon_phase)
+        return moon_rise_and_set
+
+    async def date_checks(self, queries):
+        """date_check every (city, year, month, day) at the same time.
+
+        Returns
+        -------
+        list_outputs : list
+            One ["moonrise","moonset","moon phase"] per query, in order.
+        """
+        return await asyncio.gather(*(self.date_check(*query)
+                                      for query in queries))
+
+
+async def _run_date_checks(queries, limit: int):
+    """Open a client & date_check every query."""
+    async with AsyncMoonClient(limit=limit) as client:
+        return await client.date_checks(queries)
+
+
+def run_date_checks(queries, limit: int = 32):
+    """date_check many (city, year, month, day) queries on one event loop.
+
+    Parameters
+    ----------
+    queries : iterable
+        (str_city, str_year, str_month, str_day) tuples, like date_check's.
+    limit : int
+        The most month pages to be downloading at the same time.
+
+    Returns
+    -------
+    list_outputs : list
+        One ["moonrise","moonset","moon phase"] per query, in order.
+    """
+    return asyncio.run(_run_date_checks(list(queries), limit))
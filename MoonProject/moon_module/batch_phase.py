@@ -0,0 +1,398 @@
+"""This contains the vectorized (batch) version of the moon phase math.
+
+Notes
+-----
+dic_calculator & dic_interpreter handle one date at a time, which is
+fine for the GUI, but slow when you have millions of dates. These do the
+exact same math on NumPy arrays, so that every date is computed at once.
+There are two engines, & they don't always agree:
+(1) batch_dic_calculator is dic_calculator's math (mean synodic months
+    from Jan 6, 2000), so it only works from 2000-01-06 on, & it drifts
+    from the real moon. (It disagrees with check_date on ~12% of the days
+    from 2000 to 2100)
+(2) batch_phase_on is lunation_index's math, the one check_date, the month
+    view & the almanac use, so it gives check_date's phase for every day
+    from 1900-01-01 to 2100-12-31 (& NO_PHASE for any other day).
+    batch_phase_meeus is the same math, but works the quarters out itself
+    rather than reading them from the index, so it goes on past 1900-2100.
+1. PHASE_LABELS
+2. dates_to_ymd
+3. batch_julian_day
+4. batch_dic_interpreter
+5. batch_dic_calculator
+6. batch_phase_on
+7. batch_phase_meeus
+8. iter_phase_chunks (huge spans, in chunks, on a process pool, with
+   batch_phase_meeus)
+"""
+import math
+import datetime as dt
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+
+# The index of each phase in here is its phase code.
+# Ordered the same way the moon goes through them (new -> new).
+PHASE_LABELS = ("New Moon", "Waxing Crescent", "First Quarter",
+                "Waxing Gibbous", "Full Moon", "Waning Gibbous",
+                "Third Quarter", "Waning Crescent")
+
+# The phase code of a day that doesn't have a phase.
+NO_PHASE = -1
+
+# iter_phase_chunks's chunk size, when it isn't given: about
+# CHUNKS_PER_WORKER chunks per worker, but never more than MAX_CHUNK_DAYS
+# (memory) or fewer than MIN_CHUNK_DAYS (each chunk costs a round trip to
+# a process).
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_DAYS = 2_000
+MAX_CHUNK_DAYS = 100_000
+
+
+def dates_to_ymd(dates):
+    """Split an array of dates into year/month/day integer arrays.
+
+    Parameter
+    ---------
+    dates : array-like
+        Anything np.asarray(..., dtype="datetime64[D]") understands.
+        (Example: np.array(["2020-05-28", "2020-05-29"], dtype="datetime64"))
+
+    Returns
+    -------
+    years, months, days : np.ndarray
+        Three int64 arrays with the same shape as dates.
+    """
+    days_arr = np.asarray(dates, dtype="datetime64[D]")
+    month_arr = days_arr.astype("datetime64[M]")
+    year_arr = days_arr.astype("datetime64[Y]")
+
+    years = year_arr.astype(np.int64) + 1970
+    months = (month_arr - year_arr).astype(np.int64) + 1
+    days = (days_arr - month_arr).astype(np.int64) + 1
+
+    return years, months, days
+
+
+def batch_julian_day(years, months, days):
+    """Given arrays of year/month/day, calculate the Julian Day (JD) of each.
+
+    Parameters
+    ----------
+    years, months, days : array-like
+        Integer arrays that broadcast against each other.
+
+    Returns
+    -------
+    julian_day : np.ndarray
+        float64 array of Julian Days.
+
+    Notes
+    -----
+    Same formula (& same order of operations) as dic_calculator,
+    so the floats come out bit-for-bit identical.
+    """
+    int_year = np.asarray(years, dtype=np.int64)
+    int_month = np.asarray(months, dtype=np.int64)
+    int_day = np.asarray(days, dtype=np.int64)
+
+    # "If the month is January or February,
+    #  subtract 1 from the year and add 12 to the month" (SubsySTEMs)
+    early = int_month <= 2
+    int_year = np.where(early, int_year - 1, int_year)
+    int_month = np.where(early, int_month + 12, int_month)
+
+    component_1 = 2 - (int_year/100) + ((int_year/100)/4)
+    component_2 = 365.25 * (int_year+4716)
+    component_3 = 30.6001 * (int_month+1)
+    julian_day = component_1 + int_day + component_2 + component_3 - 1524.5
+
+    return julian_day
+
+
+def batch_dic_interpreter(days_into_cycle):
+    """Given an array of days into cycle (dic), determine the phase codes.
+
+    Parameter
+    ---------
+    days_into_cycle : array-like
+        Days into the current synodic period of the moon.
+
+    Returns
+    -------
+    phase_codes : np.ndarray
+        uint8 array of indexes into PHASE_LABELS.
+
+    Notes
+    -----
+    The thresholds (& which side is inclusive) are copied one-for-one
+    from dic_interpreter, so both agree on every boundary.
+    """
+    dic = np.asarray(days_into_cycle, dtype=np.float64)
+
+    conditions = [(dic <= 2.03) | (dic >= 28.68),
+                  (2.03 < dic) & (dic < 6.01),
+                  (6.01 <= dic) & (dic < 9.27),
+                  (9.27 <= dic) & (dic < 13.55),
+                  (13.55 <= dic) & (dic < 16.68),
+                  (16.68 <= dic) & (dic < 21.00),
+                  (21.00 <= dic) & (dic < 24.07),
+                  (24.07 <= dic) & (dic < 28.68)]
+    phase_codes = np.select(conditions, range(len(PHASE_LABELS)))
+
+    return phase_codes.astype(np.uint8)
+
+
+def batch_dic_calculator(years, months=None, days=None):
+    """Given arrays of dates, calculate JD, days into cycle & phase of each.
+
+    Parameters
+    ----------
+    years : array-like
+        Either integer years (with months & days given too),
+        or an array of datetime64 dates (with months & days left out).
+    months, days : array-like, optional
+        Integer months & days, when years is integer years.
+
+    Returns
+    -------
+    julian_day : np.ndarray
+        float64 Julian Day of each date.
+    days_into_cycle : np.ndarray
+        float64 days into the synodic period of each date.
+    phase_codes : np.ndarray
+        uint8 indexes into PHASE_LABELS.
+        np.array(PHASE_LABELS)[phase_codes] gives the labels themselves.
+
+    Raises
+    ------
+    ValueError
+        If any date is before January 6th, 2000.
+
+    Notes
+    -----
+    Follows the same steps (& the same limitations) as dic_calculator,
+    which isn't what check_date gives. (Use batch_phase_on for that)
+    """
+    if months is None and days is None:
+        years, months, days = dates_to_ymd(years)
+
+    # np.trunc (below) rounds toward zero, just like int() does in
+    # dic_calculator, so any day before January 6th, 2000 comes out wrong.
+    if np.any(np.asarray(years, dtype=np.int64) * 10000
+              + np.asarray(months, dtype=np.int64) * 100
+              + np.asarray(days, dtype=np.int64) < 20000106):
+        raise ValueError("dic_calculator can't go before 2000-01-06")
+
+    julian_day = batch_julian_day(years, months, days)
+
+    # 2451549.5 is the Julian Day for January 6th, 2000.
+    days_since_new = julian_day - 2451549.5
+    new_moon_cycles = days_since_new / 29.53059
+    fraction_of_current_synodic_period = (new_moon_cycles
+                                          - np.trunc(new_moon_cycles))
+    days_into_cycle = fraction_of_current_synodic_period * 29.53059
+
+    return julian_day, days_into_cycle, batch_dic_interpreter(days_into_cycle)
+
+
+def batch_phase_on(dates):
+    """Given an array of dates, get the phase code check_date gives each.
+
+    Parameter
+    ---------
+    dates : array-like
+        Anything np.asarray(..., dtype="datetime64[D]") understands.
+
+    Returns
+    -------
+    phase_codes : np.ndarray
+        int8 indexes into PHASE_LABELS, with the same shape as dates.
+        NO_PHASE for a day that isn't from 1900-01-01 to 2100-12-31.
+
+    Notes
+    -----
+    Same steps (& the same floats) as LunationIndex.phase_on, with a
+    np.searchsorted in place of its bisect.
+    """
+    try:
+        from .lunation_index import (FIRST_DATE, LAST_DATE, ORDINAL_JD,
+                                     SYNODIC_MONTH, get_lunation_index)
+    except ImportError:
+        from lunation_index import (FIRST_DATE, LAST_DATE, ORDINAL_JD,
+                                    SYNODIC_MONTH, get_lunation_index)
+
+    index = get_lunation_index()
+    instants = np.asarray(index.minutes, dtype=np.float64)
+    days_arr = np.asarray(dates, dtype="datetime64[D]")
+
+    # Days since 1970 -> date.toordinal() -> minutes, like to_minutes,
+    # then the 0:00 UT right after the date.
+    ordinals = days_arr.astype(np.int64) + dt.date(1970, 1, 1).toordinal()
+    minutes = (ordinals + ORDINAL_JD - index.epoch) * 1440 + 1440
+
+    positions = np.searchsorted(instants, minutes, side="right") - 1
+    valid = ((days_arr >= np.datetime64(FIRST_DATE))
+             & (days_arr <= np.datetime64(LAST_DATE))
+             & (positions >= 0) & (positions + 1 < len(instants)))
+    positions = np.clip(positions, 0, len(instants) - 2)
+
+    start, end = instants[positions], instants[positions + 1]
+    quarters = ((index.first_quarter + positions) % 4
+                + (minutes - start) / (end - start))
+    phase_codes = batch_dic_interpreter(
+        quarters * SYNODIC_MONTH / 4).astype(np.int8)
+    phase_codes[~valid] = NO_PHASE
+    return phase_codes
+
+
+def batch_phase_meeus(dates):
+    """Given an array of dates from any year, get the phase code of each.
+
+    Parameter
+    ---------
+    dates : array-like
+        Anything np.asarray(..., dtype="datetime64[D]") understands.
+
+    Returns
+    -------
+    phase_codes : np.ndarray
+        int8 indexes into PHASE_LABELS, with the same shape as dates.
+
+    Notes
+    -----
+    Same steps as batch_phase_on, but the quarters around the dates are
+    worked out on the spot (with quarter_instants, like build_index does),
+    so from 1900 to 2100 it gives check_date's phases, & it keeps going
+    past that. Further out, it's only as good as Meeus's formulas & the
+    long-term TT - UT (long_delta_t): the further from 2000, the likelier
+    a day right next to a phase change comes out on the other side of it.
+    """
+    try:
+        from .lunar_engine import UNIX_EPOCH_JD, long_delta_t
+        from .lunation_index import SYNODIC_MONTH, quarter_instants
+    except ImportError:
+        from lunar_engine import UNIX_EPOCH_JD, long_delta_t
+        from lunation_index import SYNODIC_MONTH, quarter_instants
+
+    days_arr = np.asarray(dates, dtype="datetime64[D]")
+    if days_arr.size == 0:
+        return np.zeros(days_arr.shape, dtype=np.int8)
+
+    # The 0:00 UT right after each date, in minutes since 1970.
+    day_numbers = days_arr.astype(np.int64)
+    minutes = (day_numbers + 1) * 1440.0
+
+    # Every quarter from a lunation before the first date to a lunation
+    # after the last one. (k = 0 is the new moon of Jan 6, 2000)
+    first_k = math.floor((day_numbers.min() + UNIX_EPOCH_JD - 2451550.09766)
+                         / 29.530588861) - 1
+    last_k = math.ceil((day_numbers.max() + 1 + UNIX_EPOCH_JD - 2451550.09766)
+                       / 29.530588861) + 1
+    numbers = np.arange(4 * first_k, 4 * last_k + 1)
+    terrestrial = quarter_instants(numbers)
+    universal = terrestrial - long_delta_t(terrestrial) / 86400
+    # Whole minutes, like the lunation index saves them.
+    instants = np.rint((universal - UNIX_EPOCH_JD) * 1440)
+
+    positions = np.searchsorted(instants, minutes, side="right") - 1
+    start, end = instants[positions], instants[positions + 1]
+    quarters = numbers[positions] % 4 + (minutes - start) / (end - start)
+    return batch_dic_interpreter(quarters * SYNODIC_MONTH / 4).astype(np.int8)
+
+
+class PhaseChunk(NamedTuple):
+    """One chunk of iter_phase_chunks: its dates & their phase codes."""
+    dates: np.ndarray
+    phase_codes: np.ndarray
+
+
+def _chunk_phase_codes(first_day: int, day_count: int):
+    """Phase codes of day_count days from first_day (days since 1970).
+    (What each process of iter_phase_chunks runs)"""
+    dates = np.arange(first_day, first_day + day_count, dtype=np.int64)
+    return batch_phase_meeus(dates.astype("datetime64[D]"))
+
+
+def iter_phase_chunks(start_date, end_date, chunk_days: int = None,
+                      workers: int = 1, max_pending: int = None):
+    """Phase codes of every day from start_date to end_date, chunk by chunk.
+
+    Parameters
+    ----------
+    start_date, end_date : dt.date or str or np.datetime64
+        The first & last day. (Both included, from any year)
+    chunk_days : int
+        Days per chunk. Each chunk is one batch_phase_meeus call.
+        (Default: CHUNKS_PER_WORKER chunks per worker, from
+        MIN_CHUNK_DAYS to MAX_CHUNK_DAYS days each)
+    workers : int
+        Processes computing chunks at the same time. (1 = all in this
+        process, without a pool)
+    max_pending : int
+        The most chunks computed ahead of the one being read. (Default:
+        2 per worker) Nothing more is started until the caller reads on,
+        so memory stays around (max_pending + 1) chunks however long the
+        span is.
+
+    Yields
+    ------
+    chunk : PhaseChunk
+        dates (datetime64[D]) & phase_codes (int8, indexes of
+        PHASE_LABELS), in order, chunk_days long (the last one can be
+        shorter). Same as batch_phase_meeus on the whole span (so
+        check_date, from 1900 to 2100).
+
+    Raises
+    ------
+    ValueError
+        If chunk_days or workers is below 1.
+
+    Notes
+    -----
+    Only the first day & length of a chunk go to a process, & only its
+    phase codes (1 byte a day) come back, so the pool spends its time
+    computing rather than copying. Stopping early (break/close()) cancels
+    whatever hasn't started yet.
+    """
+    if (chunk_days is not None and chunk_days < 1) or workers < 1:
+        raise ValueError("chunk_days & workers must be at least 1")
+    first_day = int(np.datetime64(start_date, "D").astype(np.int64))
+    last_day = int(np.datetime64(end_date, "D").astype(np.int64))
+    if chunk_days is None:
+        chunk_days = min(MAX_CHUNK_DAYS, max(MIN_CHUNK_DAYS, math.ceil(
+            (last_day + 1 - first_day) / (CHUNKS_PER_WORKER * workers))))
+    chunks = [(day, min(chunk_days, last_day + 1 - day))
+              for day in range(first_day, last_day + 1, chunk_days)]
+
+    def made(first, phase_codes):
+        dates = np.arange(first, first + len(phase_codes),
+                          dtype=np.int64).astype("datetime64[D]")
+        return PhaseChunk(dates, phase_codes)
+
+    if workers == 1:
+        for first, day_count in chunks:
+            yield made(first, _chunk_phase_codes(first, day_count))
+        return
+
+    max_pending = max_pending or 2 * workers
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for first, day_count in chunks:
+            pending.append((first, pool.submit(_chunk_phase_codes, first,
+                                               day_count)))
+            # Backpressure: wait for (& hand over) the oldest chunk
+            # before starting any more.
+            if len(pending) >= max_pending:
+                first, future = pending.popleft()
+                yield made(first, future.result())
+        while pending:
+            first, future = pending.popleft()
+            yield made(first, future.result())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
@@ -0,0 +1,290 @@
+"""This contains the headless (no GUI) way to look up lots of dates at once.
+
+Notes
+-----
+scripts/moon_cli.py runs main(). Queries stream straight through, so the
+memory used is the same for 10 queries or 10 million of them:
+(1) read_queries reads (city, date) queries one at a time, from CSV or
+    JSONL, on stdin or in a file.
+(2) stream_answers answers them in chunks on a thread (or process) pool,
+    with at most max_in_flight chunks handed to it at once, & gives the
+    answers back in the same order as the queries.
+(3) main writes every answer out as one line of JSON, as soon as it (&
+    everything before it) is done.
+--phase-only never touches the network, only check_date.
+1. read_queries
+2. answer_query
+3. stream_answers
+4. main
+"""
+import sys
+import csv
+import json
+import argparse
+import itertools
+import collections
+
+try:
+    from . import functions
+except ImportError:
+    import functions
+
+# CSV columns, when the file has no header. (A "date" column works too)
+FIELDS = ("city", "year", "month", "day")
+
+MODES = ("online", "offline", "phase")
+
+
+def read_queries(stream, query_format: str = "auto"):
+    """Read queries lazily, one per line of CSV or JSONL.
+
+    Parameters
+    ----------
+    stream : iterable of str
+        An open file (or sys.stdin).
+    query_format : str
+        "csv", "jsonl", or "auto" (JSONL if the first line starts with "{").
+
+    Returns
+    -------
+    records : generator
+        A dict per CSV row, or the text of each JSON line. (answer_query
+        does the parsing, so a bad line only costs its own answer)
+
+    Notes
+    -----
+    CSV rows are city,year,month,day (or city,date with YYYY-MM-DD),
+    with or without a header naming the columns.
+    """
+    lines = iter(stream)
+    if query_format == "auto":
+        first = next((line for line in lines if line.strip()), None)
+        if first is None:
+            return
+        query_format = "jsonl" if first.lstrip().startswith("{") else "csv"
+        lines = itertools.chain([first], lines)
+
+    if query_format == "jsonl":
+        yield from (line for line in lines if line.strip())
+        return
+
+    rows = (row for row in csv.reader(lines) if row)
+    first_row = next(rows, None)
+    if first_row is None:
+        return
+    if "city" in (cell.strip().lower() for cell in first_row):
+        fields = [cell.strip().lower() for cell in first_row]
+    else:
+        fields = FIELDS if len(first_row) != 2 else ("city", "date")
+        rows = itertools.chain([first_row], rows)
+
+    for row in rows:
+        yield dict(zip(fields, row))
+
+
+def parse_query(record):
+    """Get (city, year, month, day), as str, out of one query record."""
+    if isinstance(record, str):
+        record = json.loads(record)
+
+    if record.get("date"):
+        date = str(record["date"]).strip().split("-")
+        if len(date) != 3:
+            raise ValueError(f"date isn't YYYY-MM-DD: {record['date']!r}")
+        year, month, day = date
+    else:
+        year, month, day = record["year"], record["month"], record["day"]
+
+    return (str(record.get("city") or "").strip(), str(year).strip(),
+            str(month).strip(), str(day).strip())
+
+
+def answer_query(record, mode: str = "online"):
+    """Answer one query, the same way the GUI would.
+
+    Parameters
+    ----------
+    record : dict or str
+        What read_queries gave for it.
+    mode : str
+        "online" (date_check), "offline" (date_check(..., offline=True))
+        or "phase" (only the moon phase, no moonrise/moonset).
+
+    Returns
+    -------
+    answer : dict
+        {"city", "date", "phase"} (& "moonrise", "moonset" unless it's
+        "phase" mode), or {"error"} if the query couldn't be read, has no
+        city (unless it's "phase" mode) or the lookup failed.
+    """
+    try:
+        city, year, month, day = parse_query(record)
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        return {"error": f"bad query: {error}"}
+    if not city and mode != "phase":
+        return {"error": "bad query: no city"}
+
+    date, moon_phase = functions.check_date(year, month, day)
+    answer = {"city": city,
+              "date": (f"{date[0]:04d}-{date[1]:02d}-{date[2]:02d}"
+                       if date else f"{year}-{month}-{day}"),
+              "phase": moon_phase}
+    if mode == "phase" or date is None:
+        if mode != "phase":
+            answer["moonrise"] = answer["moonset"] = "Invalid Date"
+        return answer
+
+    try:
+        if mode == "offline":
+            # Imported here, so NumPy only loads for people who use it.
+            try:
+                from .lunar_engine import offline_moon_scraper
+            except ImportError:
+                from lunar_engine import offline_moon_scraper
+            moonrise, moonset = offline_moon_scraper(city, *date)
+        else:
+            moonrise, moonset = functions.moon_scraper(city, *date)
+    # Not only requests' OSErrors (timeouts, no connection...): anything
+    # that goes wrong only costs this query its answer, not the whole run.
+    except Exception as error:
+        return {"city": city, "date": answer["date"],
+                "error": f"lookup failed: {error}"}
+
+    answer["moonrise"] = moonrise
+    answer["moonset"] = moonset
+    return answer
+
+
+def answer_chunk(records: list, mode: str = "online"):
+    """answer_query for every record of a chunk. (One pool task)"""
+    return [answer_query(record, mode) for record in records]
+
+
+def chunked(records, chunk_size: int):
+    """Split an iterable into lists of up to chunk_size, lazily."""
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_answers(records, mode: str = "online", workers: int = 8,
+                   executor: str = "thread", max_in_flight: int = None,
+                   chunk_size: int = 1):
+    """Answer every record, in order, without reading ahead too far.
+
+    Parameters
+    ----------
+    records : iterable
+        What read_queries gives.
+    mode : str
+        Same as answer_query.
+    workers : int
+        Threads (or processes) in the pool, or 0 to answer them right here.
+    executor : str
+        "thread" (good for scraping, which mostly waits on the network) or
+        "process" (good for "offline", which is all CPU).
+    max_in_flight : int
+        Most chunks handed to the pool at once. (Default: 4 * workers)
+    chunk_size : int
+        Queries per pool task.
+
+    Returns
+    -------
+    answers : generator
+        One answer_query dict per record, in the same order.
+    """
+    chunks = chunked(records, chunk_size)
+    if workers <= 0:
+        for chunk in chunks:
+            yield from answer_chunk(chunk, mode)
+        return
+
+    # Imported here, so --phase-only (with no pool) starts up faster.
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    max_in_flight = max_in_flight or 4 * workers
+    pool_type = ProcessPoolExecutor if executor == "process" \
+        else ThreadPoolExecutor
+    pool = pool_type(max_workers=workers)
+    pending = collections.deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.submit(answer_chunk, chunk, mode))
+            # Wait on the oldest before reading more, so memory stays flat.
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def build_parser():
+    """The command-line options of main."""
+    parser = argparse.ArgumentParser(
+        prog="moon_cli.py",
+        description="Look up the moon phase & moonrise/moonset of "
+                    "(city, date) queries, & print them as JSON lines.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="CSV or JSONL file of queries (default: stdin)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="where the JSON lines go (default: stdout)")
+    parser.add_argument("--format", choices=("auto", "csv", "jsonl"),
+                        default="auto", dest="query_format")
+    parser.add_argument("--phase-only", action="store_true",
+                        help="only the moon phase (never uses the network)")
+    parser.add_argument("--offline", action="store_true",
+                        help="compute moonrise/moonset with lunar_engine "
+                             "instead of scraping them")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="pool size (default: 8, or 0 for --phase-only)")
+    parser.add_argument("--executor", choices=("thread", "process"),
+                        default="thread")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="most chunks in the pool at once "
+                             "(default: 4 * workers)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="queries per pool task (default: 1 for "
+                             "threads, 256 for processes)")
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """Run the command line. (Example: main(["--phase-only", "q.csv"]))
+
+    Returns
+    -------
+    exit_code : int
+        0, once every query has an answer line.
+    """
+    args = build_parser().parse_args(argv)
+    mode = "phase" if args.phase_only else \
+        "offline" if args.offline else "online"
+    workers = args.workers if args.workers is not None else \
+        0 if mode == "phase" else 8
+    chunk_size = args.chunk_size or (256 if args.executor == "process"
+                                     else 1)
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    in_file = stdin if args.input == "-" else \
+        open(args.input, newline="", encoding="utf-8")
+    out_file = stdout if args.output == "-" else \
+        open(args.output, "w", encoding="utf-8")
+
+    try:
+        answers = stream_answers(read_queries(in_file, args.query_format),
+                                 mode, workers, args.executor,
+                                 args.max_in_flight, chunk_size)
+        for answer in answers:
+            out_file.write(json.dumps(answer) + "\n")
+    finally:
+        if in_file is not stdin:
+            in_file.close()
+        if out_file is not stdout:
+            out_file.close()
+
+    return 0
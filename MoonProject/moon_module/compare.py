@@ -0,0 +1,124 @@
+"""This contains the multi-city comparison: one date, many cities.
+
+Notes
+-----
+Calling date_check once per city costs one round-trip to the website
+after another. compare_cities answers every city in about the time of
+one download instead:
+(1) The date is checked & its moon phase computed once, since the phase
+    doesn't depend on the city.
+(2) Every city goes through canonical_city (so city_format, or the
+    gazetteer), & spellings of the same city share one month table.
+(3) The distinct month tables (that aren't cached already) download at
+    the same time, on up to `workers` threads sharing transport.py's
+    pooled session.
+1. CityRow
+2. Comparison
+3. distinct_cities
+4. compare_cities
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple
+
+try:
+    from . import functions
+except ImportError:
+    import functions
+
+
+class CityRow(NamedTuple):
+    """One city's line of a Comparison."""
+    city: str
+    slug: str
+    moonrise: str
+    moonset: str
+    error: str = None
+
+
+class Comparison(NamedTuple):
+    """What compare_cities gives back: one phase & a row per city."""
+    date: tuple
+    phase: str
+    rows: List[CityRow]
+
+    def table(self):
+        """The rows as lists of str, with a header first. (For printing)"""
+        return [["City", "Moonrise", "Moonset"]] + [
+            [row.city, row.moonrise, row.moonset] if row.error is None
+            else [row.city, "Couldn't reach the website", ""]
+            for row in self.rows]
+
+
+def distinct_cities(cities):
+    """Each city's canonical slug, & one spelling per slug to look up.
+
+    Returns
+    -------
+    slugs, lookups : list, dict
+        slugs has one slug (or None, if invalid) per city, in order.
+        lookups is {slug: the first city spelled that way}.
+    """
+    slugs = [functions.canonical_city(city) for city in cities]
+    lookups = {}
+    for city, slug in zip(cities, slugs):
+        if slug is not None:
+            lookups.setdefault(slug, city)
+    return slugs, lookups
+
+
+def compare_cities(cities, str_year: str, str_month: str, str_day: str,
+                   workers: int = 16):
+    """Get the moonrise & moonset of many US cities on the same date.
+
+    Parameters
+    ----------
+    cities : list of str
+        Cities in the United States. (Repeats are fine)
+    str_year, str_month, str_day : str
+        Same as date_check.
+    workers : int
+        The most month pages downloading at the same time.
+
+    Returns
+    -------
+    comparison : Comparison
+        date is (year, month, day) or None if invalid, & phase is the same
+        as date_check's. Every row is one of cities, in order, with the
+        same moonrise/moonset moon_scraper gives (or "Invalid Date"). A
+        city whose page couldn't be downloaded has its error instead.
+    """
+    cities = list(cities)
+    date, moon_phase = functions.check_date(str_year, str_month, str_day)
+    slugs, lookups = distinct_cities(cities)
+    if date is None:
+        return Comparison(None, moon_phase, [
+            CityRow(city, slug, "Invalid Date", "Invalid Date")
+            for city, slug in zip(cities, slugs)])
+
+    year, month, day = date
+    tables, errors = {}, {}
+
+    def look_up(slug):
+        try:
+            tables[slug] = functions.month_table(lookups[slug], year, month)
+        except OSError as error:
+            errors[slug] = repr(error)
+
+    if lookups:
+        with ThreadPoolExecutor(max_workers=min(workers, len(lookups)),
+                                thread_name_prefix="moon-compare") as pool:
+            # list(), so an unexpected error is raised here too.
+            list(pool.map(look_up, lookups))
+
+    rows = []
+    for city, slug in zip(cities, slugs):
+        month_rows = tables.get(slug)
+        if slug in errors:
+            rows.append(CityRow(city, slug, None, None, errors[slug]))
+            continue
+        if month_rows is None or day not in month_rows:
+            moonrise, moonset = functions.NO_TABLE
+        else:
+            moonrise, moonset = month_rows[day]
+        rows.append(CityRow(city, slug, moonrise, moonset))
+    return Comparison(date, moon_phase, rows)
@@ -0,0 +1,40 @@
+"""This contains the fixtures shared by more than one test file.
+
+Notes
+-----
+pytest finds these on its own, so test files use them without importing.
+1. fetches
+2. loose_cities
+"""
+import pytest
+
+import functions
+from fixture_pages import fake_page
+from month_cache import MonthCache
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Serve the fixture pages instead of the website, & record every link.
+
+    Returns
+    -------
+    links : list of str
+        Every link functions.fetch was called with, in order.
+    """
+    links = []
+
+    def fake_fetch(link, **_):
+        links.append(link)
+        return fake_page(link)
+
+    monkeypatch.setattr(functions, "fetch", fake_fetch)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    return links
+
+
+@pytest.fixture
+def loose_cities(monkeypatch):
+    """Turn STRICT_CITIES off, so cities the gazetteer doesn't know (like
+    "Hyrule") get looked up on the website too."""
+    monkeypatch.setattr(functions, "STRICT_CITIES", False)
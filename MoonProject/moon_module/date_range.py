@@ -0,0 +1,86 @@
+"""This contains the moonrise/moonset lookup over a span of dates.
+
+Notes
+-----
+Looping moon_scraper over a span costs one blocking lookup per day.
+Since one month page holds every day of the month, moon_range instead
+fetches each distinct month once, all at the same time (up to
+max_workers at once), & then hands the days back in order.
+1. months_in_span
+2. moon_range
+"""
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import functions
+except ImportError:
+    import functions
+
+
+def months_in_span(start_date: dt.date, end_date: dt.date):
+    """Get every (year, month) from start_date to end_date, in order.
+
+    Parameters
+    ----------
+    start_date, end_date : dt.date
+        The first & last day of the span. (Both included)
+
+    Returns
+    -------
+    months : list
+        Example: [(2020, 11), (2020, 12), (2021, 1)]
+    """
+    months = []
+    if start_date > end_date:
+        return months
+
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def moon_range(us_city: str, start_date: dt.date, end_date: dt.date,
+               max_workers: int = 8):
+    """Get the moonrise & moonset of every day from start_date to end_date.
+    (1) Work out the distinct months in the span.
+    (2) Get each month table at the same time, in a bounded thread pool.
+    (3) Yield every day of the span, in date order.
+
+    Parameters
+    ----------
+    us_city : str
+        A city in the United States.
+    start_date, end_date : dt.date
+        The first & last day of the span. (Both included)
+    max_workers : int
+        The most month pages to be fetching at the same time.
+
+    Yields
+    ------
+    date, moon_outputs : dt.date, list
+        Same moon_outputs as moon_scraper. (Example: ["moonrise","moonset"])
+    """
+    months = months_in_span(start_date, end_date)
+    if not months:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(months)))
+    try:
+        futures = [executor.submit(functions.month_table, us_city, *month)
+                   for month in months]
+
+        date = start_date
+        for (year, month), future in zip(months, futures):
+            month_rows = future.result()
+            while date <= end_date and date.month == month:
+                if month_rows is None or date.day not in month_rows:
+                    yield date, list(functions.NO_TABLE)
+                else:
+                    yield date, list(month_rows[date.day])
+                date += dt.timedelta(days=1)
+    finally:
+        # If the caller stops early, don't wait on months nobody wants.
+        executor.shutdown(wait=False, cancel_futures=True)
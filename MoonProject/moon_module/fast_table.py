@@ -0,0 +1,155 @@
+"""This contains the fast way of pulling the moon table out of a month page.
+
+Notes
+-----
+BeautifulSoup builds a tree of the whole ~60KB page, just so that
+soup.find(id="tb-7dmn") can throw almost all of it away. Instead:
+(1) Find where the "tb-7dmn" table starts & ends with a plain byte search.
+    (Counting any <table>s inside it, so its own </table> is the end)
+(2) Only feed that slice into a tiny html.parser, which keeps the text of
+    the cells of each <tbody> row & nothing else.
+The rows come out the same way BeautifulSoup's row.contents would give
+them (text between the cells included), so moon_scraper's logic works
+on them unchanged. A table that doesn't look like that (a table inside
+it, or a day row without enough cells) raises TableMismatch, rather than
+giving rows that might not be what BeautifulSoup would give.
+1. TableMismatch
+2. find_table
+3. extract_rows
+"""
+import re
+from html.parser import HTMLParser
+
+TABLE_ID = re.compile(rb"""id\s*=\s*["']?tb-7dmn["'\s>]""")
+TABLE_TAG = re.compile(rb"<(/?)table[\s>]", re.IGNORECASE)
+
+# What a day row's contents are, at least: the day & the 5 items after it.
+DAY_ROW_ITEMS = 6
+
+# BeautifulSoup squashes text that's only these into "\n" or " ".
+ASCII_SPACES = " \n\t\x0c\r"
+
+
+class TableMismatch(ValueError):
+    """The moon table isn't laid out the way extract_rows expects."""
+
+
+def find_table(content: bytes):
+    """Get the bytes of the "tb-7dmn" table, or None if there isn't one.
+
+    Parameter
+    ---------
+    content : bytes
+        The HTML of a timeanddate month page.
+
+    Returns
+    -------
+    table : bytes or None
+        Everything from its "<table" to its own "</table>". (None if it
+        never ends, too)
+    """
+    id_match = TABLE_ID.search(content)
+    if id_match is None:
+        return None
+
+    start = content.rfind(b"<table", 0, id_match.start())
+    if start == -1:
+        return None
+    depth = 1
+    for tag_match in TABLE_TAG.finditer(content, id_match.end()):
+        depth += -1 if tag_match.group(1) else 1
+        if depth == 0:
+            return content[start:content.index(b">", tag_match.end() - 1)
+                           + 1]
+    return None
+
+
+class _RowParser(HTMLParser):
+    """Collects the contents of every <tbody> row, as text."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._in_tbody = False
+        self._row = None
+        self._cell = None
+        self._text_last = False
+        self.tables = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.tables += 1
+        elif tag == "tbody":
+            self._in_tbody = True
+        elif tag == "tr" and self._in_tbody:
+            self._row = []
+            self._text_last = False
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._row.append("".join(self._cell))
+            self._cell = None
+            self._text_last = False
+        elif tag == "tr" and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+        elif tag == "tbody":
+            self._in_tbody = False
+
+    def handle_data(self, data):
+        if not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+
+        if self._cell is not None:
+            self._cell.append(data)
+        elif self._row is not None:
+            # Text between cells is its own item in row.contents.
+            if self._text_last:
+                self._row[-1] += data
+            else:
+                self._row.append(data)
+                self._text_last = True
+
+
+def extract_rows(content: bytes):
+    """Get the cells of every day row of the moon table in a month page.
+
+    Parameter
+    ---------
+    content : bytes
+        The HTML of a timeanddate month page.
+
+    Returns
+    -------
+    month_cells : dict or None
+        {day: [text of row.contents[1] ... row.contents[5]]},
+        or None if the page has no table.
+
+    Raises
+    ------
+    TableMismatch
+        If the table has another table inside it, or a day row has fewer
+        than DAY_ROW_ITEMS items.
+    """
+    table = find_table(content)
+    if table is None:
+        return None
+
+    parser = _RowParser()
+    parser.feed(table.decode("utf-8", errors="replace"))
+    parser.close()
+    if parser.tables > 1:
+        raise TableMismatch("there's a table inside the moon table")
+
+    month_cells = {}
+    for row in parser.rows:
+        # Skip anything that isn't a day row. (Like a footnote row)
+        if not row or not row[0].strip().isdigit():
+            continue
+        if len(row) < DAY_ROW_ITEMS:
+            raise TableMismatch(f"day {row[0].strip()} has {len(row)} items")
+        month_cells[int(row[0].strip())] = row[1:DAY_ROW_ITEMS]
+
+    return month_cells
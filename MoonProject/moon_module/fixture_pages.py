@@ -0,0 +1,208 @@
+"""This serves the month pages of the offline tests.
+
+Notes
+-----
+There are 2 kinds of pages:
+(1) The synthetic pages in fixtures/synthetic_pages, made up by
+    fixtures/build_pages.py (only their asserted rows are real). Every
+    test runs on these. They're named "<formatted city>-<year>-<month>.html"
+    & any city/month without one gets the not-found page, just like
+    timeanddate does for a city it doesn't know.
+(2) Recorded pages: real timeanddate pages, in a PageArchive zip file at
+    RECORDED_ARCHIVE (or MOON_RECORDED_PAGES, if set). They aren't in the
+    repo, so record them first (with internet) from the MoonProject
+    folder:
+        python scripts/pack_archive.py \
+            moon_module/fixtures/recorded_pages.zip --years 2019 2020
+    Tests & benchmarks that check against the real website use these, &
+    are skipped (or say they ran on synthetic pages) without them.
+1. page_path
+2. load_page
+3. page_for_link
+4. fake_page (a page_for_link that looks like what transport.fetch gives)
+5. serve_pages (a local stand-in for the website, in a thread)
+6. recorded_pages
+7. page_corpus (pages to parse, for benchmarks)
+"""
+import os
+import re
+import time
+import types
+import zipfile
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures")
+SYNTHETIC_PAGES_DIR = os.path.join(FIXTURES_DIR, "synthetic_pages")
+NOT_FOUND_PAGE = os.path.join(SYNTHETIC_PAGES_DIR, "not-found.html")
+RECORDED_ARCHIVE = os.environ.get(
+    "MOON_RECORDED_PAGES", os.path.join(FIXTURES_DIR, "recorded_pages.zip"))
+
+LINK_PATTERN = re.compile(r"/moon/usa/([^/?]+)\?month=(\d+)&year=(\d+)")
+
+
+def page_path(city: str, year: (str, int), month: (str, int)):
+    """Get the file name of the synthetic page for a formatted city &
+    month."""
+    return os.path.join(SYNTHETIC_PAGES_DIR,
+                        f"{city}-{int(year)}-{int(month)}.html")
+
+
+def load_page(city: str, year: (str, int), month: (str, int)):
+    """Get the synthetic page for a formatted city & month.
+
+    Returns
+    -------
+    status, content : int, bytes
+        200 & the month page, or 404 & the not-found page.
+    """
+    file_name = page_path(city, year, month)
+    status = 200
+    if not os.path.exists(file_name):
+        file_name = NOT_FOUND_PAGE
+        status = 404
+
+    with open(file_name, "rb") as page_file:
+        return status, page_file.read()
+
+
+def page_for_link(link: str):
+    """Same as load_page, but from a month_link() (or its path & query)."""
+    match = LINK_PATTERN.search(link)
+    if match is None:
+        return load_page("", 0, 0)
+    return load_page(match.group(1), match.group(3), match.group(2))
+
+
+def fake_page(link: str, **_):
+    """page_for_link, with status_code & content, like transport.fetch.
+    (So it can be monkeypatched in for functions.fetch)"""
+    status, content = page_for_link(link)
+    return types.SimpleNamespace(status_code=status, content=content)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers GET /moon/usa/<city>?month=..&year=.. with a synthetic
+    page."""
+
+    # Keep-alive, like the real website. Without TCP_NODELAY, the headers
+    # & body going out as 2 writes stall keep-alive clients for ~40ms.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        """Count the connections, to see if they're being reused."""
+        super().setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def do_GET(self):
+        """Send the page (after the server's made-up latency)."""
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            server.paths.append(self.path)
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight,
+                                        server.in_flight)
+            failing = server.failures > 0
+            server.failures -= failing
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.in_flight -= 1
+
+        status, content = page_for_link(self.path)
+        if failing:
+            status, content = 503, b"Service Unavailable"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        """Don't print a line for every request."""
+
+
+@contextlib.contextmanager
+def serve_pages(latency: float = 0.0):
+    """Run a stand-in for timeanddate.com on localhost while in the block.
+
+    Parameter
+    ---------
+    latency : float
+        Seconds to wait before answering each request.
+
+    Yields
+    ------
+    server : ThreadingHTTPServer
+        server.base_url goes in functions.BASE_URL.
+        server.request_count & server.paths say what has been asked for
+        so far, over server.connection_count connections.
+        server.peak_in_flight is the most requests it had at once.
+        Set server.failures to answer that many requests with a 503.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.paths = []
+    server.in_flight = 0
+    server.peak_in_flight = 0
+    server.failures = 0
+    server.connection_count = 0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def recorded_pages(path: str = RECORDED_ARCHIVE):
+    """Get every page of a recorded archive. (See the notes up top)
+
+    Returns
+    -------
+    pages : list of (str, int, bytes)
+        (link without the website, status, content) of every page, in the
+        order they were recorded, or [] if there's no archive at path.
+    """
+    if not os.path.exists(path):
+        return []
+    pages = []
+    with zipfile.ZipFile(path) as zip_file:
+        for info in zip_file.infolist():
+            # PageArchive keeps "<status> <link>" in the entry's comment.
+            status, key = info.comment.decode("utf-8").split(" ", 1)
+            pages.append((key, int(status), zip_file.read(info)))
+    return pages
+
+
+def page_corpus():
+    """Get the recorded pages if there are any, or else the synthetic ones.
+
+    Returns
+    -------
+    kind, pages : str, list of bytes
+        "recorded" or "synthetic", & the content of every page. (Say
+        which, next to any numbers measured on them)
+    """
+    recorded = [content for _, _, content in recorded_pages()]
+    if recorded:
+        return "recorded", recorded
+
+    synthetic = []
+    for page_name in sorted(os.listdir(SYNTHETIC_PAGES_DIR)):
+        with open(os.path.join(SYNTHETIC_PAGES_DIR, page_name),
+                  "rb") as page_file:
+            synthetic.append(page_file.read())
+    return "synthetic", synthetic
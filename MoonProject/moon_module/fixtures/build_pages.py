@@ -0,0 +1,172 @@
+"""This builds the synthetic (made-up) month pages of the offline tests.
+
+Notes
+-----
+Run from this folder: python build_pages.py
+These are NOT recorded timeanddate pages. Every page mirrors the layout
+of a timeanddate.com/moon/usa/<city> page (as of when this was written):
+a big page around a "tb-7dmn" table, with one minified <tr> per day.
+Each row is: day | moonrise | moonset | moonrise | meridian | km | illum.
+A moonrise/moonset is a time cell + a direction cell, or one "-" cell
+that spans both (that's why moon_scraper checks for "-", "am" & "pm").
+
+Only the rows asserted in test_functions.py (KNOWN_ROWS) are real, copied
+in exactly. The rest of each month is made up, by stepping the moon
+LUNAR_DAY (~50 minutes more than a day) later every day from those rows,
+& so are the meridian, distance & illumination columns. So don't use
+these to check a parser against the real website (see RECORDED_ARCHIVE
+in fixture_pages.py for that), & don't quote timings on them as real
+timeanddate pages.
+"""
+import os
+import calendar
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "synthetic_pages")
+
+# Moonrise/moonset repeat every ~24h 50m, in minutes.
+LUNAR_DAY = 1490.5
+MERIDIAN_OFFSET = 372
+
+# (city, year, month) : {day: (moonrise minutes, moonset minutes)}
+# None means there is no moonrise (or moonset) on that day.
+KNOWN_ROWS = {
+    ("san-diego", 2000, 1): {5: (354, 981), 6: (404, 1030)},
+    ("san-diego", 2006, 1): {7: (715, 35)},
+    ("san-diego", 2006, 7): {16: (1430, 722)},
+    ("san-diego", 2020, 5): {12: (23, 638)},
+    ("sacramento", 2016, 1): {12: (544, 1224)},
+    ("concord", 2022, 6): {8: (817, 110)},
+    ("chicago", 2019, 4): {10: (587, None)},
+    ("seattle", 2013, 10): {11: (862, None)},
+    ("dallas", 2010, 12): {27: (None, 701)},
+    ("phoenix", 2027, 7): {27: (None, 850)},
+}
+
+
+def clock(minutes: float):
+    """Format minutes past midnight the way timeanddate does. (9:04 am)"""
+    minutes = int(minutes) % 1440
+    hour, minute = divmod(minutes, 60)
+    suffix = "am" if hour < 12 else "pm"
+    return f"{(hour % 12) or 12}:{minute:02d} {suffix}"
+
+
+def event_on_day(anchor: float, day: int):
+    """Minutes past midnight of the event on `day`, or None if it skips it.
+
+    anchor is minutes since the start of the month of a known event.
+    """
+    day_start = (day - 1) * 1440
+    cycles = (day_start - anchor) // LUNAR_DAY + 1
+    event = anchor + cycles * LUNAR_DAY
+    if event < day_start + 1440:
+        return event - day_start
+    return None
+
+
+def month_rows(days_in_month: int, known: dict):
+    """Moonrise/moonset minutes of every day of the month."""
+    anchor_day = min(known)
+    anchor_rise, anchor_set = known[anchor_day]
+    if anchor_rise is None:
+        anchor_rise = anchor_set + 720
+    if anchor_set is None:
+        anchor_set = anchor_rise + 720
+    rise_anchor = (anchor_day - 1) * 1440 + anchor_rise
+    set_anchor = (anchor_day - 1) * 1440 + anchor_set
+
+    rows = {}
+    for day in range(1, days_in_month + 1):
+        rows[day] = (event_on_day(rise_anchor, day),
+                     event_on_day(set_anchor, day))
+    rows.update(known)
+    return rows
+
+
+def time_cells(minutes: float, direction: int):
+    """The 2 cells of a moonrise/moonset, or the 1 "-" cell if None."""
+    if minutes is None:
+        return '<td class="pdr0" colspan="2">-</td>'
+    return (f'<td class="pdr0">{clock(minutes)}</td>'
+            f'<td class="sep"><span class="comp sa{direction // 45}" '
+            f'title="Direction">↑</span> ({direction}°)</td>')
+
+
+def row_html(day: int, rise: float, moonset: float):
+    """One minified table row (no whitespace between the cells)."""
+    if rise is not None and moonset is not None and rise > moonset:
+        # Moonset first, so the moonrise goes in the 2nd moonrise column.
+        slots = (None, moonset, rise)
+    else:
+        slots = (rise, moonset, None)
+
+    known = rise if rise is not None else moonset + 720
+    meridian = clock(known + MERIDIAN_OFFSET)
+    distance = 356500 + (day * 7919) % 50000
+    illumination = (day * 3.3) % 100
+
+    return (f'<tr data-day="{day}"><th>{day}</th>'
+            f'{time_cells(slots[0], 110)}'
+            f'{time_cells(slots[1], 250)}'
+            f'{time_cells(slots[2], 110)}'
+            f'<td>{meridian}</td><td>{distance:,}</td>'
+            f'<td>{illumination:.1f}%</td></tr>')
+
+
+def filler(tag: str, count: int):
+    """Navigation/article bulk, like the rest of a real page."""
+    items = "".join(f'<li><a href="/moon/usa/{tag}-{i}">Moon {tag} {i}</a>'
+                    f'</li>\n' for i in range(count))
+    return f'<nav class="{tag}"><ul>\n{items}</ul></nav>\n'
+
+
+def page_html(city: str, year: int, month: int, rows: dict):
+    """A whole month page, with the tb-7dmn table in the middle."""
+    month_name = calendar.month_name[month]
+    body_rows = "\n".join(row_html(day, *rows[day]) for day in sorted(rows))
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>Moonrise, Moonset, and Moon Phase in {city}, {month_name} "
+        f"{year}</title>\n<script>var TAD={{}};</script></head>\n<body>\n"
+        f"{filler('header', 400)}"
+        '<section class="fixed"><div class="tb-scroll">\n'
+        '<table id="tb-7dmn" class="tb-sm zebra fw tb-hover">\n<thead>\n'
+        '<tr><th rowspan="2">'
+        f"{month_name[:3]}</th><th colspan=\"2\">Moonrise</th>"
+        '<th colspan="2">Moonset</th><th colspan="2">Moonrise</th>'
+        '<th colspan="3">Meridian Passing</th></tr>\n'
+        "<tr><th>Time</th><th></th><th>Time</th><th></th><th>Time</th>"
+        "<th></th><th>Time</th><th>Distance (km)</th><th>Illumination</th>"
+        "</tr>\n</thead>\n<tbody>\n"
+        f"{body_rows}\n</tbody>\n</table>\n</div></section>\n"
+        f"{filler('footer', 400)}</body></html>\n"
+    )
+
+
+def not_found_html():
+    """What timeanddate sends back for a city it doesn't know."""
+    return ("<!DOCTYPE html>\n<html><head><title>Unknown address</title>"
+            "</head>\n<body>\n" + filler("header", 400)
+            + "<h1>Unknown address</h1><p>Sorry, we could not find the page"
+            " you requested.</p>\n" + filler("footer", 400)
+            + "</body></html>\n")
+
+
+def main():
+    """Write every month page (& the not-found page) into PAGES_DIR."""
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for (city, year, month), known in KNOWN_ROWS.items():
+        days_in_month = calendar.monthrange(year, month)[1]
+        rows = month_rows(days_in_month, known)
+        file_name = os.path.join(PAGES_DIR, f"{city}-{year}-{month}.html")
+        with open(file_name, "w", encoding="utf-8") as page_file:
+            page_file.write(page_html(city, year, month, rows))
+
+    with open(os.path.join(PAGES_DIR, "not-found.html"), "w",
+              encoding="utf-8") as page_file:
+        page_file.write(not_found_html())
+
+
+if __name__ == "__main__":
+    main()
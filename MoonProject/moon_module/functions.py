@@ -9,12 +9,115 @@ within their own respective docstrings.
 3. city_format
 4. moon_scraper
 5. date_check
+
+moon_scraper is backed by these helpers, so that one download of a
+month page answers every day of that month (see MONTH_CACHE, and
+MONTH_STORE for sharing them with other processes on disk).
+- canonical_city (checks the city against gazetteer.py first)
+- fetch (transport.fetch, imported on first use, or PAGE_ARCHIVE)
+- month_link
+- rise_and_set
+- parse_moon_table (fast_moon_table if FAST_TABLE, or else
+  soup_moon_table, the slower original way)
+- lookup_month_table (& cached_month_table, for fresh ones only)
+- save_month_table
+- download_month_table
+- refresh_month_table (stale-while-revalidate, see MONTH_CACHE.max_stale)
+- month_lookup (& month_table, without the fresh/stale part)
+If ALMANAC is on, lookup_month_table (so every lookup) answers the cities
+& months it has from it, & moon_scraper the cities & days it has.
+date_check is split the same way, with check_date doing the date part
+(& month_phases doing a whole month of it).
+Each stage reports to METRICS (see metrics.py), if it's on.
 """
+import os
 import string
+import functools
+import threading
 import datetime as dt
+from typing import NamedTuple
+
+# Only the light stuff is imported up here, so that the moon phase math
+# (dic_calculator, check_date) loads fast. Scraping (requests), SQLite &
+# the table parser get imported the first time they're needed.
+try:
+    from .month_cache import FRESH, MISSING, STALE, MonthCache
+except ImportError:
+    from month_cache import FRESH, MISSING, STALE, MonthCache
+
+# Parsed month tables, keyed by (city slug, year, month).
+# Replace it with a differently sized MonthCache(...) to tune it.
+# (Example: MonthCache(max_stale=7 * 24 * 60 * 60) keeps serving a table
+# for a week past its ttl, while a new one downloads in the background.)
+MONTH_CACHE = MonthCache()
+
+# Keys being downloaded again in the background (see refresh_month_table).
+REFRESHING = set()
+_REFRESHING_LOCK = threading.Lock()
+
+# Optional SQLite copy of MONTH_CACHE that every process can share.
+# None (off) unless MOON_STORE_PATH is set, or a MonthStore is assigned.
+if os.environ.get("MOON_STORE_PATH"):
+    try:
+        from .month_store import MonthStore
+    except ImportError:
+        from month_store import MonthStore
+    MONTH_STORE = MonthStore(os.environ["MOON_STORE_PATH"])
+else:
+    MONTH_STORE = None
+
+# Optional record/replay zip file of month pages, that fetch goes through.
+# None (off) unless MOON_ARCHIVE_PATH is set (MOON_ARCHIVE_MODE is "replay"
+# by default, or "record"), or a PageArchive is assigned.
+if os.environ.get("MOON_ARCHIVE_PATH"):
+    try:
+        from .page_archive import PageArchive
+    except ImportError:
+        from page_archive import PageArchive
+    PAGE_ARCHIVE = PageArchive(os.environ["MOON_ARCHIVE_PATH"],
+                               os.environ.get("MOON_ARCHIVE_MODE", "replay"),
+                               os.environ.get("MOON_ARCHIVE_MISS", "error"))
+else:
+    PAGE_ARCHIVE = None
+
+# Optional precomputed almanac (see almanac.py), that lookup_month_table &
+# moon_scraper answer from first. None (off) unless MOON_ALMANAC_PATH is set, or an Almanac is
+# assigned.
+if os.environ.get("MOON_ALMANAC_PATH"):
+    try:
+        from .almanac import Almanac
+    except ImportError:
+        from almanac import Almanac
+    ALMANAC = Almanac(os.environ["MOON_ALMANAC_PATH"])
+else:
+    ALMANAC = None
+
+# Optional metrics.Metrics, that every stage of a lookup reports to.
+# None (off, & close to free) unless a Metrics() is assigned.
+METRICS = None
+
+# What moon_scraper gives back when there is no table to read from.
+NO_TABLE = ("Invalid City Name OR", "No Moonrise/set time exists")
 
-import requests
-from bs4 import BeautifulSoup
+# The moon phase of a date the lunation index doesn't have. (It also names
+# its picture, in moon_images/moon_phases)
+OUT_OF_RANGE = "Can't compute outside 1900-2100"
+
+# If True, parse_moon_table only parses the moon table (fast_moon_table)
+# rather than the whole page with BeautifulSoup (soup_moon_table). Off
+# unless MOON_FAST_TABLE is set, until test_fast_table.py has passed on
+# pages recorded from the real website, not only on the synthetic ones.
+# (See fixture_pages.py for recording them)
+FAST_TABLE = bool(os.environ.get("MOON_FAST_TABLE"))
+
+# If True, cities the gazetteer (data/us_cities.tsv) doesn't know are
+# invalid without a fetch, since most of those are typos. For a town that
+# isn't in it, add it to the file, or set MOON_LOOSE_CITIES (or
+# STRICT_CITIES = False) to look every unknown city up on the website.
+STRICT_CITIES = not os.environ.get("MOON_LOOSE_CITIES")
+
+# Where the month pages come from. (Pointed at a stand-in server in tests)
+BASE_URL = "https://www.timeanddate.com"
 
 
 def dic_interpreter(days_into_cycle: float):
@@ -95,6 +198,7 @@ def dic_calculator(int_year: int, int_month: int, int_day: int):
     There was no code copied from external sources.
     However, all of the formulas in this function are from SubsySTEMs.
     1/6/2000 is the earliest date this function can compute moon phase.
+    check_date uses lunation_index instead, which goes from 1900 to 2100.
     """
 
     # "If the month is January or February,
@@ -154,12 +258,397 @@ def city_format(us_city: str):
     return formatted_city
 
 
+def canonical_city(us_city: str):
+    """Get the timeanddate slug of a US city, checked against the gazetteer.
+
+    Parameter
+    ---------
+    us_city : str
+        A city in the United States, with or without its state.
+        (Example: "Concord, CA")
+
+    Returns
+    -------
+    slug : str or None
+        The gazetteer's slug for it (Example: "concord-ca"). For a city the
+        gazetteer doesn't know, None, or city_format(us_city) if
+        STRICT_CITIES is off. (Never "", so no link without a city)
+    """
+    # Imported here, since gazetteer.py imports city_format from here.
+    try:
+        from .gazetteer import get_gazetteer
+    except ImportError:
+        from gazetteer import get_gazetteer
+
+    city = get_gazetteer().resolve(us_city)
+    if city is not None:
+        return city.slug
+    if STRICT_CITIES:
+        return None
+    return city_format(us_city.strip()) or None
+
+
+def fetch(link: str):
+    """transport.fetch, imported the first time a page is downloaded.
+
+    Notes
+    -----
+    requests takes longer to import than everything else here put
+    together, so only code that scrapes pays for it.
+    If PAGE_ARCHIVE is on, the page goes through it instead (& replaying
+    never imports requests at all). Either way, METRICS gets the time it
+    took, its size, & whether it failed.
+    """
+    metrics = METRICS
+    started = metrics and metrics.clock()
+    try:
+        if PAGE_ARCHIVE is not None:
+            page = PAGE_ARCHIVE.fetch(link)
+        else:
+            try:
+                from .transport import fetch as transport_fetch
+            except ImportError:
+                from transport import fetch as transport_fetch
+            page = transport_fetch(link)
+    except OSError:
+        if metrics is not None:
+            metrics.count("upstream_errors")
+        raise
+
+    if metrics is not None:
+        metrics.observe("fetch", started)
+        metrics.count("bytes_downloaded", len(page.content))
+        if page.status_code >= 500:
+            metrics.count("upstream_errors")
+    return page
+
+
+def month_link(city: str, year: (str, int), month: (str, int)):
+    """Get the link of the website table for a formatted city & year/month.
+
+    Parameters
+    ----------
+    city : str
+        A city slug from canonical_city(). (Example: "san-diego")
+    year, month : str or int
+        Speaks for itself. (Example: 2020, 5)
+
+    Returns
+    -------
+    link : str
+        The timeanddate page with the moonrise/moonset of the whole month.
+    """
+    return (f"{BASE_URL}/moon/"
+            f"usa/{city}?month={int(month)}&year={int(year)}")
+
+
+def rise_and_set(cells: list):
+    """Given the text of the 5 cells after the day, get moonrise & moonset.
+
+    Parameter
+    ---------
+    cells : list
+        Text of row.contents[1] to row.contents[5] of a table row.
+
+    Returns
+    -------
+    moon_outputs : list
+        Returns a list of moonrise/moonset. (Example: ["moonrise","moonset"])
+    """
+    # The only data I want contains either "-","am",or "pm"
+    raw_list = [content_str for content_str in cells
+                if any(x in content_str for x in ("-", "am", "pm"))]
+
+    # If there is, the 4th element is always junk-data.
+    if len(raw_list) > 3:
+        raw_list.pop()
+
+    moon_outputs = []
+    # the website I'm scraping has 2 moonrise columns
+    # so raw_list[0] & raw_list[2] are moonrise 1 & 2
+    # (& raw_list[1] is moonset).
+    # raw_list[0] & raw_list[2] possible outputs are "-" or "XX:XX am/pm"
+    # hence comparing len is a very good idea to get the data I want.
+    if len(raw_list[0]) == len(raw_list[2]):
+        moon_outputs.append("No moonrise")
+    elif len(raw_list[0]) > len(raw_list[2]):
+        moon_outputs.append(raw_list[0])
+    elif len(raw_list[0]) < len(raw_list[2]):
+        moon_outputs.append(raw_list[2])
+
+    if "-" in raw_list[1]:
+        moon_outputs.append("No moonset")
+    elif "-" not in raw_list[1]:
+        moon_outputs.append(raw_list[1])
+
+    return moon_outputs
+
+
+def parse_moon_table(content: bytes):
+    """Parse the moonrise/moonset of every day out of a month page.
+
+    Parameter
+    ---------
+    content : bytes
+        The HTML of a timeanddate month page.
+
+    Returns
+    -------
+    month_rows : dict or None
+        {day: ("moonrise", "moonset")}, or None if the page has no table.
+        (No table means an invalid city OR no moonrise/set data.)
+
+    Notes
+    -----
+    fast_moon_table if FAST_TABLE is on, or else soup_moon_table.
+    """
+    metrics = METRICS
+    started = metrics and metrics.clock()
+    if FAST_TABLE:
+        month_rows = fast_moon_table(content)
+    else:
+        month_rows = soup_moon_table(content)
+
+    if metrics is not None:
+        metrics.observe("parse", started)
+    return month_rows
+
+
+def fast_moon_table(content: bytes):
+    """Same as soup_moon_table, but only the moon table gets parsed.
+
+    Notes
+    -----
+    See fast_table.extract_rows. (Parsing the whole page was the slowest
+    part of every lookup) A table it doesn't expect, like one with another
+    table inside it, goes to soup_moon_table instead.
+    """
+    try:
+        from .fast_table import TableMismatch, extract_rows
+    except ImportError:
+        from fast_table import TableMismatch, extract_rows
+
+    try:
+        month_cells = extract_rows(content)
+    except TableMismatch:
+        return soup_moon_table(content)
+    if month_cells is None:
+        return None
+    return {day: tuple(rise_and_set(cells))
+            for day, cells in month_cells.items()}
+
+
+def soup_moon_table(content: bytes):
+    """Parse the moonrise/moonset of every day, with BeautifulSoup on the
+    whole page.
+
+    Notes
+    -----
+    The original way, & the reference that fast_moon_table is tested
+    against.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # This is the specific table with the moonrise/moonset data.
+    table_moon = soup.find(id="tb-7dmn")
+    if table_moon is None:
+        return None
+
+    month_rows = {}
+    for row in table_moon.find("tbody").find_all("tr"):
+        # Skip anything that isn't a day row. (Like a footnote row)
+        if len(row.contents) < 6:
+            continue
+        day_str = row.contents[0].text.strip()
+        if not day_str.isdigit():
+            continue
+        cells = [row.contents[count].text for count in range(1, 6)]
+        month_rows[int(day_str)] = tuple(rise_and_set(cells))
+
+    return month_rows
+
+
+def lookup_month_table(key: tuple):
+    """Get a month table from ALMANAC, or else MONTH_CACHE, or else
+    MONTH_STORE. (The ones that are on)
+
+    Parameter
+    ---------
+    key : tuple
+        (formatted city, year, month) (Example: ("san-diego", 2020, 5))
+
+    Returns
+    -------
+    month_rows, freshness : dict or None or MISSING, str or None
+        Same as month_table & FRESH or STALE, or (MISSING, None) if
+        none of them has it. (STALE ones are only in MONTH_CACHE)
+    """
+    almanac = ALMANAC
+    if almanac is not None:
+        month_rows = almanac.month_table(key)
+        if month_rows is not MISSING:
+            return month_rows, FRESH
+
+    month_rows, freshness = MONTH_CACHE.lookup(key)
+    if month_rows is MISSING and MONTH_STORE is not None:
+        month_rows, age = MONTH_STORE.lookup(key)
+        if month_rows is not MISSING:
+            # Only for what's left of its ttl, not a whole new one.
+            MONTH_CACHE.put(key, month_rows, age)
+            freshness = FRESH
+
+    return month_rows, freshness
+
+
+def cached_month_table(key: tuple):
+    """lookup_month_table, but only if it's fresh. (MISSING otherwise)"""
+    month_rows, freshness = lookup_month_table(key)
+    return MISSING if freshness is STALE else month_rows
+
+
+def save_month_table(key: tuple, month_rows, status_code: int):
+    """Save a freshly scraped month table into MONTH_CACHE & MONTH_STORE.
+
+    Parameters
+    ----------
+    key : tuple
+        (formatted city, year, month)
+    month_rows : dict or None
+        What parse_moon_table gave for the page.
+    status_code : int
+        The HTTP status of the page.
+    """
+    # A server error isn't proof the city is invalid, so don't keep it.
+    if month_rows is None and status_code >= 500:
+        return
+
+    MONTH_CACHE.put(key, month_rows)
+    if MONTH_STORE is not None:
+        MONTH_STORE.put(key, month_rows)
+
+
+def download_month_table(key: tuple):
+    """Scrape (through fetch) & parse a month page, then save it.
+
+    Returns
+    -------
+    month_rows : dict or None
+        Same as month_table.
+    """
+    city, year, month = key
+    page = fetch(month_link(city, year, month))
+    month_rows = parse_moon_table(page.content)
+    save_month_table(key, month_rows, page.status_code)
+    return month_rows
+
+
+def _refresh(key: tuple):
+    """download_month_table, for refresh_month_table's thread."""
+    try:
+        download_month_table(key)
+    except OSError:
+        # The stale copy keeps being served until max_stale runs out,
+        # & the next lookup of it tries again. (METRICS counted it)
+        pass
+    finally:
+        with _REFRESHING_LOCK:
+            REFRESHING.discard(key)
+
+
+def refresh_month_table(key: tuple):
+    """Download a (stale) month table again, in a background thread.
+
+    Returns
+    -------
+    started : bool
+        False if key is already being downloaded again, since one
+        refresh per key at a time is enough.
+    """
+    with _REFRESHING_LOCK:
+        if key in REFRESHING:
+            return False
+        REFRESHING.add(key)
+    threading.Thread(target=_refresh, args=(key,), daemon=True,
+                     name=f"refresh {key}").start()
+    return True
+
+
+class MonthLookup(NamedTuple):
+    """What month_lookup found, & whether it was fresh or stale."""
+    month_rows: dict
+    freshness: str
+
+
+def month_lookup(us_city: str, year: (str, int), month: (str, int)):
+    """Get the moonrise/moonset table of a whole month for a US city.
+    (0) Check the city with canonical_city (no fetch if it's invalid).
+    (1) Look in ALMANAC (if there is one), then in MONTH_CACHE, for the
+        city's slug & year/month.
+    (2) If it isn't there, look in MONTH_STORE (if there is one).
+    (3) If it isn't there either, scrape (through transport.fetch, with
+        its pooled connections, timeouts & retries) & parse the month page,
+        then save it in both.
+    (4) If MONTH_CACHE only has a stale one, give that right away, &
+        refresh_month_table gets a new one in the background.
+
+    Parameters
+    ----------
+    us_city : str
+        A city in the United States.
+    year, month : str or int
+        Speaks for itself. (Example: "2020" or 2020)
+
+    Returns
+    -------
+    lookup : MonthLookup
+        month_rows is {day: ("moonrise", "moonset")}, or None for an
+        invalid city. (Those are cached too, so they don't keep costing a
+        fetch) freshness is STALE if it's past its ttl, or else FRESH.
+    """
+    metrics = METRICS
+    city = canonical_city(us_city)
+    if city is None:
+        if metrics is not None:
+            metrics.count("invalid_cities")
+        return MonthLookup(None, FRESH)
+    key = (city, int(year), int(month))
+
+    month_rows, freshness = lookup_month_table(key)
+    if month_rows is MISSING:
+        if metrics is not None:
+            metrics.count("cache_misses")
+        month_rows, freshness = download_month_table(key), FRESH
+    elif freshness is STALE:
+        if metrics is not None:
+            metrics.count("stale_hits")
+        refresh_month_table(key)
+    elif metrics is not None:
+        metrics.count("cache_hits")
+
+    if month_rows is None and metrics is not None:
+        metrics.count("invalid_cities")
+    return MonthLookup(month_rows, freshness)
+
+
+def month_table(us_city: str, year: (str, int), month: (str, int)):
+    """month_lookup, without saying whether it was fresh or stale.
+
+    Returns
+    -------
+    month_rows : dict or None
+        {day: ("moonrise", "moonset")}, or None for an invalid city.
+    """
+    return month_lookup(us_city, year, month).month_rows
+
+
 def moon_scraper(us_city: str, year: (str, int), month: (str, int), day: (str, int)):
     """Get the moonrise & moonset of a given US city & date.
-    (1) Obtain formatted US city & scrape website table given year/month.
+    (1) Obtain formatted US city & the month table given year/month.
+        (Scraped from the website, unless MONTH_CACHE already has it.)
     (2) If it doesn't work out, it'll let you know. Otherwise,
     (3) Access the table row corresponding to given day.
-    (4) Scrape the moonrise and moonset content, and save it in a list.
 
     Parameters
     ----------
@@ -198,79 +687,49 @@ def moon_scraper(us_city: str, year: (str, int), month: (str, int), day: (str, i
     However, the way I do it does not put any remotely significant load on
     the website, and how the user can interact with this is not in a way
     that would ever impact the website I am scraping. Additionally, the
-    data isn't being saved to a local file - running this wil require
-    internet access. Lastly, the robots.txt didn't seem to have anything
-    against crawling the specific part of the website that I did, so I
-    should be fine.
+    data is only saved to a local file if MONTH_STORE is turned on -
+    otherwise running this wil require internet access. Lastly, the
+    robots.txt didn't seem to have anything against crawling the specific
+    part of the website that I did, so I should be fine.
+    If ALMANAC is on & has the city & date, it answers without any of that.
+    (Without making the whole month table, like lookup_month_table does)
     """
-
-    city = city_format(us_city)
-    link = (f"https://www.timeanddate.com/moon/"
-            f"usa/{city}?month={month}&year={year}")
-    page = requests.get(link)
-    soup = BeautifulSoup(page.content, 'html.parser')
-
-    # This is the specific table with the moonrise/moonset data.
-    table_moon = soup.find(id="tb-7dmn")
-
-    moon_outputs = []
-    if table_moon is None:
-        moon_outputs = ["Invalid City Name OR", "No Moonrise/set time exists"]
+    almanac = ALMANAC
+    if almanac is not None:
+        result = almanac.lookup(us_city, year, month, day)
+        if result is not None:
+            return result.to_output()[:2]
+
+    month_rows = month_table(us_city, year, month)
+
+    metrics = METRICS
+    started = metrics and metrics.clock()
+    if month_rows is None or int(day) not in month_rows:
+        moon_outputs = list(NO_TABLE)
     else:
-        # Compacted to avoid R0914 in Pylint.
-        table_moon_rows = table_moon.find("tbody").find_all("tr")
-        for row in table_moon_rows:
-            # If we find the matching row day with the input day
-            if int(row.contents[0].text.strip()) == int(day):
-                content_counter = 1
-                raw_list = []
-                while content_counter <= 5:
-                    content_str = row.contents[content_counter].text
-                    # The only data I want contains either "-","am",or "pm"
-                    if any(x in content_str for x in ("-", "am", "pm")):
-                        raw_list.append(content_str)
-                    content_counter += 1
-                # If day is earlier in month, don't iterate through rest.
-                break
-
-        # If there is, the 4th element is always junk-data.
-        if len(raw_list) > 3:
-            raw_list.pop()
-
-        # the website I'm scraping has 2 moonrise columns
-        # so raw_list[0] & raw_list[2] are moonrise 1 & 2
-        # (& raw_list[1] is moonset).
-        # raw_list[0] & raw_list[2] possible outputs are "-" or "XX:XX am/pm"
-        # hence comparing len is a very good idea to get the data I want.
-        if len(raw_list[0]) == len(raw_list[2]):
-            moon_outputs.append("No moonrise")
-        elif len(raw_list[0]) > len(raw_list[2]):
-            moon_outputs.append(raw_list[0])
-        elif len(raw_list[0]) < len(raw_list[2]):
-            moon_outputs.append(raw_list[2])
-
-        if "-" in raw_list[1]:
-            moon_outputs.append("No moonset")
-        elif "-" not in raw_list[1]:
-            moon_outputs.append(raw_list[1])
+        # A copy, since date_check appends to it & the cache keeps it.
+        moon_outputs = list(month_rows[int(day)])
 
+    if metrics is not None:
+        metrics.observe("extract", started)
     return moon_outputs
 
 
-def date_check(str_city: str, str_year: str, str_month: str, str_day: str):
-    """Validate date & obtain moon phase, moon-rise, and moon-set.
+def check_date(str_year: str, str_month: str, str_day: str):
+    """Validate date & obtain moon phase. (See lunation_index.py)
 
     Parameters
     ----------
-    str_city, stry_year, str_month, str_day : str
-        These are meant to be str, because their input data is from the GUI.
-        And the GUI data, when accessed, are type string.
+    str_year, str_month, str_day : str
+        Same as date_check.
 
     Returns
     -------
-    list_output : list
-        The output will always be ["moonrise","moonset","moon phase"]
+    date, moon_phase : tuple or None, str
+        (year, month, day) as int, or None if the date isn't legitimate.
     """
+    metrics = METRICS
+    started = metrics and metrics.clock()
     valid_date = True
 
     try:
@@ -278,22 +737,87 @@ def date_check(str_city: str, str_year: str, str_month: str, str_day: str):
         month = int(str_month)
         day = int(str_day)
         # To confirm if the date is legitimate or not.
-        input_date = dt.datetime(year, month, day)
+        dt.datetime(year, month, day)
 
     # If any of these are produced, then input parameters are bad.
     except (SyntaxError, ValueError, TypeError):
         valid_date = False
 
-    # To hard-enforce limitation of dic_calculator() for accuracy-sake.
-    if valid_date and (input_date >= dt.datetime(2000, 1, 6)):
-        moon_phase = dic_calculator(year, month, day)
-        moon_rise_and_set = moon_scraper(str_city, year, month, day)
-    elif valid_date and (input_date <= dt.datetime(2000, 1, 6)):
-        moon_phase = "Can't compute before 1-6-2000"
-        moon_rise_and_set = moon_scraper(str_city, year, month, day)
+    if metrics is not None:
+        metrics.observe("validate", started)
+        started = metrics.clock()
+    if not valid_date:
+        # Cannot compute anything w/o the date.
+        return None, "Invalid Date"
+
+    # The lunation index has the real new moons & quarters, so (unlike
+    # dic_calculator) it works before 1-6-2000 & doesn't drift.
+    # Imported here, since lunation_index.py imports dic_interpreter.
+    try:
+        from .lunation_index import get_lunation_index
+    except ImportError:
+        from lunation_index import get_lunation_index
+
+    moon_phase = get_lunation_index().phase_on(year, month, day)
+    if moon_phase is None:
+        moon_phase = OUT_OF_RANGE
+
+    if metrics is not None:
+        metrics.observe("phase", started)
+    return (year, month, day), moon_phase
+
+
+@functools.lru_cache(maxsize=256)
+def month_phases(year: int, month: int):
+    """The moon phase of every day of a month, from one batch computation.
+
+    Returns
+    -------
+    phases : tuple
+        The phase of day 1, 2, ... (Same as check_date would give)
+    """
+    try:
+        from .lunation_index import get_lunation_index
+    except ImportError:
+        from lunation_index import get_lunation_index
+
+    return tuple(phase or OUT_OF_RANGE
+                 for phase in get_lunation_index().month_phases(year, month))
+
+
+def date_check(str_city: str, str_year: str, str_month: str, str_day: str,
+               offline: bool = False):
+    """Validate date & obtain moon phase, moon-rise, and moon-set.
+
+    Parameters
+    ----------
+    str_city, stry_year, str_month, str_day : str
+        These are meant to be str, because their input data is from the GUI.
+        And the GUI data, when accessed, are type string.
+    offline : bool
+        If True, compute the moon-rise & moon-set with lunar_engine,
+        instead of scraping them. (No internet needed)
+
+    Returns
+    -------
+    list_output : list
+        The output will always be ["moonrise","moonset","moon phase"]
+    """
+    metrics = METRICS
+    started = metrics and metrics.clock()
+    date, moon_phase = check_date(str_year, str_month, str_day)
+
+    if date is not None and offline:
+        # Imported here, so NumPy only loads for people who use it.
+        try:
+            from .lunar_engine import offline_moon_scraper
+        except ImportError:
+            from lunar_engine import offline_moon_scraper
+        moon_rise_and_set = offline_moon_scraper(str_city, *date)
+    elif date is not None:
+        moon_rise_and_set = moon_scraper(str_city, *date)
     else:
         # Cannot compute anything w/o the date.
-        moon_phase = "Invalid Date"
         moon_rise_and_set = ["Invalid Date", "Invalid Date"]
 
     moon_rise_and_set.append(moon_phase)
@@ -301,4 +825,7 @@ def date_check(str_city: str, str_year: str, str_month: str, str_day: str):
     # confused when moon_rise_and_set has the moon phase in it too.
     list_output = moon_rise_and_set
 
+    if metrics is not None:
+        metrics.count("requests")
+        metrics.observe("date_check", started)
     return list_output
@@ -0,0 +1,176 @@
+"""This contains the US cities the app knows about, & where they are.
+
+Notes
+-----
+data/us_cities.tsv has one city per line: name, state, timeanddate slug,
+latitude, longitude & IANA time zone. It gets read once (the first time
+get_gazetteer() is called), into one sorted list of keys, so that checking
+or completing a city is a couple of bisects instead of a fetch.
+Every city is findable by its formatted name ("concord"), its slug
+("concord") & its name plus state ("concord-nh"). When a name is shared,
+the slug without a state goes to the state capital, or else the biggest
+city (that's how timeanddate's "usa/concord" ends up in New Hampshire),
+& the others get the state tacked on ("concord-ca").
+1. City
+2. normalize
+3. Gazetteer
+4. get_gazetteer
+"""
+import os
+import bisect
+import threading
+from typing import NamedTuple
+
+try:
+    from .functions import city_format
+except ImportError:
+    from functions import city_format
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "data", "us_cities.tsv")
+
+
+class City(NamedTuple):
+    """One line of the gazetteer."""
+    name: str
+    state: str
+    slug: str
+    latitude: float
+    longitude: float
+    timezone: str
+
+    @property
+    def label(self):
+        """How the GUI shows it. (Example: "Concord, NH")"""
+        return f"{self.name}, {self.state}"
+
+
+def normalize(text: str):
+    """Format what a user typed the same way the gazetteer keys are.
+
+    Notes
+    -----
+    Same as city_format, except that a plain ' counts as a ’ (so
+    "Coeur d'Alene" works), a "-" counts as a space (so slugs & names like
+    "Winston-Salem" work), & runs of spaces/commas only give one "-".
+    (Example: " Portland,  ME " -> "portland-me")
+    """
+    formatted = city_format(text.replace("'", "’").replace("-", " "))
+    return "-".join(part for part in formatted.split("-") if part)
+
+
+class Gazetteer:
+    """Sorted-key index of US cities, for checking & completing names.
+
+    Parameter
+    ---------
+    cities : iterable of City
+        Every city to index.
+    """
+
+    def __init__(self, cities):
+        self.cities = list(cities)
+
+        entries = set()
+        for position, city in enumerate(self.cities):
+            for key in (normalize(city.name), city.slug,
+                        f"{normalize(city.name)}-{city.state.lower()}"):
+                # The city that owns a key as its slug gets listed first.
+                entries.add((key, key != city.slug, position))
+        entries = sorted(entries)
+
+        self._keys = [key for key, _, _ in entries]
+        self._positions = [position for _, _, position in entries]
+
+    @classmethod
+    def from_file(cls, path: str = DATA_PATH):
+        """Read a gazetteer from a tab-separated file like us_cities.tsv."""
+        cities = []
+        with open(path, encoding="utf-8") as tsv_file:
+            for line in tsv_file:
+                if line.startswith("#") or not line.strip():
+                    continue
+                name, state, slug, latitude, longitude, timezone = \
+                    line.rstrip("\n").split("\t")
+                cities.append(City(name, state, slug, float(latitude),
+                                   float(longitude), timezone))
+        return cls(cities)
+
+    def lookup(self, text: str):
+        """Get every city that a name exactly matches.
+
+        Parameter
+        ---------
+        text : str
+            A city, with or without its state. (Example: "Concord, CA")
+
+        Returns
+        -------
+        matches : list of City
+            The one timeanddate picks for the name first, then the rest.
+            (Empty if nothing matches)
+        """
+        key = normalize(text)
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key, lo=start)
+        return [self.cities[position]
+                for position in self._positions[start:end]]
+
+    def resolve(self, text: str):
+        """Get the city a name means, or None if the name isn't known."""
+        matches = self.lookup(text)
+        return matches[0] if matches else None
+
+    def complete(self, prefix: str, limit: int = 8):
+        """Get the cities whose name (or name plus state) starts with prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            What has been typed so far. (Example: "san d")
+        limit : int
+            The most cities to give back.
+
+        Returns
+        -------
+        matches : list of City
+            In alphabetical order of the key they matched.
+        """
+        key = normalize(prefix)
+        if not key:
+            return []
+        # A space after a word means the word is done. ("san " isn't "sandy")
+        if prefix[-1] in " ,-":
+            key += "-"
+
+        matches = []
+        seen = set()
+        index = bisect.bisect_left(self._keys, key)
+        while (index < len(self._keys) and len(matches) < limit
+               and self._keys[index].startswith(key)):
+            position = self._positions[index]
+            if position not in seen:
+                seen.add(position)
+                matches.append(self.cities[position])
+            index += 1
+
+        return matches
+
+    def __contains__(self, text: str):
+        return bool(self.lookup(text))
+
+    def __len__(self):
+        return len(self.cities)
+
+
+_GAZETTEER = None
+_GAZETTEER_LOCK = threading.Lock()
+
+
+def get_gazetteer():
+    """The Gazetteer of data/us_cities.tsv, read the first time it's needed."""
+    global _GAZETTEER
+    with _GAZETTEER_LOCK:
+        if _GAZETTEER is None:
+            _GAZETTEER = Gazetteer.from_file()
+    return _GAZETTEER
@@ -0,0 +1,115 @@
+"""This contains the background worker that keeps the moon GUI responsive.
+
+Notes
+-----
+Tk can only be touched from the thread running mainloop, & scraping a
+month page can take seconds, so the GUI hands lookups to a LookupWorker:
+(1) submit() queues a lookup & gives it a new generation number. If an
+    older lookup hasn't started yet, it's simply replaced.
+(2) One background thread runs the lookups & puts what they give back
+    (or raise) on a queue.
+(3) The GUI calls poll() from root.after(), which only hands over the
+    result of the newest lookup. Results of older (stale) lookups that
+    were already running when the user clicked again get dropped.
+1. LookupDone
+2. LookupWorker
+"""
+import queue
+import threading
+from typing import Any, NamedTuple
+
+
+class LookupDone(NamedTuple):
+    """What poll() gives back once the newest lookup finished."""
+    generation: int
+    result: Any
+    error: BaseException = None
+
+
+class LookupWorker:
+    """Runs lookups on one background thread, where the newest one wins.
+
+    Parameter
+    ---------
+    lookup : callable
+        What to run for every submit(*args). (Example: moon_scraper)
+    """
+
+    def __init__(self, lookup):
+        self._lookup = lookup
+        self._condition = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._done = queue.Queue()
+        self.generation = 0
+        self.busy = False
+
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="moon-lookup")
+        self._thread.start()
+
+    def submit(self, *args):
+        """Queue lookup(*args), making every earlier lookup stale.
+
+        Returns
+        -------
+        generation : int
+            The number the result will come back with.
+        """
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, args)
+            self.busy = True
+            self._condition.notify()
+            return self.generation
+
+    def cancel(self):
+        """Make every lookup so far stale, without starting a new one."""
+        with self._condition:
+            self.generation += 1
+            self._pending = None
+            self.busy = False
+
+    def poll(self):
+        """Get the newest lookup's result, if it's done. (Never blocks)
+
+        Returns
+        -------
+        done : LookupDone or None
+            None while the newest lookup is still going (or if there's
+            none), & stale results are thrown away.
+        """
+        newest = None
+        while True:
+            try:
+                done = self._done.get_nowait()
+            except queue.Empty:
+                break
+            with self._condition:
+                if done.generation == self.generation:
+                    newest = done
+                    self.busy = False
+        return newest
+
+    def close(self):
+        """Stop the background thread once its current lookup is done."""
+        with self._condition:
+            self._closed = True
+            self._pending = None
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                generation, args = self._pending
+                self._pending = None
+
+            try:
+                done = LookupDone(generation, self._lookup(*args))
+            except Exception as error:
+                done = LookupDone(generation, None, error)
+            self._done.put(done)
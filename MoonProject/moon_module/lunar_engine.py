@@ -0,0 +1,437 @@
+"""This computes moonrise & moonset locally, with no website involved.
+
+Notes
+-----
+(1) Work out where the moon is (right ascension, declination, distance)
+    with the main terms of the ELP-2000/82 lunar theory, as given in
+    Meeus's "Astronomical Algorithms" (2nd ed.), chapter 47.
+(2) Work out its altitude above a latitude/longitude for every 10 minutes
+    of each local day, all days at once with NumPy. (The position itself
+    is only worked out every hour & filled in between, since it barely
+    curves in an hour.)
+(3) Wherever the altitude crosses the rise/set altitude, close in on the
+    exact minute with a few secant steps.
+The rise/set altitude is 0.7275 * parallax - 0.5667 degrees (refraction
+& the moon's radius), which is the same "upper limb" rule the almanacs
+(& timeanddate) use.
+1. moon_position
+2. moon_altitude
+3. moon_rise_set
+4. city_place (latitude/longitude/time zone, from gazetteer.py)
+5. offline_month_table
+6. offline_moon_scraper
+"""
+import calendar
+import datetime as dt
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+try:
+    from . import functions
+    from .gazetteer import get_gazetteer
+except ImportError:
+    import functions
+    from gazetteer import get_gazetteer
+
+# Meeus table 47.A: multiples of D, M, M', F & the sine (longitude, in
+# 1e-6 degrees) & cosine (distance, in meters) coefficients.
+LONGITUDE_DISTANCE_TERMS = np.array([
+    (0, 0, 1, 0, 6288774, -20905355), (2, 0, -1, 0, 1274027, -3699111),
+    (2, 0, 0, 0, 658314, -2955968), (0, 0, 2, 0, 213618, -569925),
+    (0, 1, 0, 0, -185116, 48888), (0, 0, 0, 2, -114332, -3149),
+    (2, 0, -2, 0, 58793, 246158), (2, -1, -1, 0, 57066, -152138),
+    (2, 0, 1, 0, 53322, -170733), (2, -1, 0, 0, 45758, -204586),
+    (0, 1, -1, 0, -40923, -129620), (1, 0, 0, 0, -34720, 108743),
+    (0, 1, 1, 0, -30383, 104755), (2, 0, 0, -2, 15327, 10321),
+    (0, 0, 1, 2, -12528, 0), (0, 0, 1, -2, 10980, 79661),
+    (4, 0, -1, 0, 10675, -34782), (0, 0, 3, 0, 10034, -23210),
+    (4, 0, -2, 0, 8548, -21636), (2, 1, -1, 0, -7888, 24208),
+    (2, 1, 0, 0, -6766, 30824), (1, 0, -1, 0, -5163, -8379),
+    (1, 1, 0, 0, 4987, -16675), (2, -1, 1, 0, 4036, -12831),
+    (2, 0, 2, 0, 3994, -10445), (4, 0, 0, 0, 3861, -11650),
+    (2, 0, -3, 0, 3665, 14403), (0, 1, -2, 0, -2689, -7003),
+    (2, 0, -1, 2, -2602, 0), (2, -1, -2, 0, 2390, 10056),
+    (1, 0, 1, 0, -2348, 6322), (2, -2, 0, 0, 2236, -9884),
+    (0, 1, 2, 0, -2120, 5751), (0, 2, 0, 0, -2069, 0),
+    (2, -2, -1, 0, 2048, -4950), (2, 0, 1, -2, -1773, 4130),
+    (2, 0, 0, 2, -1595, 0), (4, -1, -1, 0, 1215, -3958),
+    (0, 0, 2, 2, -1110, 0), (3, 0, -1, 0, -892, 3258),
+    (2, 1, 1, 0, -810, 2616), (4, -1, -2, 0, 759, -1897),
+    (0, 2, -1, 0, -713, -2117), (2, 2, -1, 0, -700, 2354),
+    (2, 1, -2, 0, 691, 0), (2, -1, 0, -2, 596, 0),
+    (4, 0, 1, 0, 549, -1423), (0, 0, 4, 0, 537, -1117),
+    (4, -1, 0, 0, 520, -1571), (1, 0, -2, 0, -487, -1739),
+], dtype=np.float64)
+
+# Meeus table 47.B: multiples of D, M, M', F & the sine coefficient
+# (latitude, in 1e-6 degrees).
+LATITUDE_TERMS = np.array([
+    (0, 0, 0, 1, 5128122), (0, 0, 1, 1, 280602), (0, 0, 1, -1, 277693),
+    (2, 0, 0, -1, 173237), (2, 0, -1, 1, 55413), (2, 0, -1, -1, 46271),
+    (2, 0, 0, 1, 32573), (0, 0, 2, 1, 17198), (2, 0, 1, -1, 9266),
+    (0, 0, 2, -1, 8822), (2, -1, 0, -1, 8216), (2, 0, -2, -1, 4324),
+    (2, 0, 1, 1, 4200), (2, 1, 0, -1, -3359), (2, -1, -1, 1, 2463),
+    (2, -1, 0, 1, 2211), (2, -1, -1, -1, 2065), (0, 1, -1, -1, -1870),
+    (4, 0, -1, -1, 1828), (0, 1, 0, 1, -1794), (0, 0, 0, 3, -1749),
+    (0, 1, -1, 1, -1565), (1, 0, 0, 1, -1491), (0, 1, 1, 1, -1475),
+    (0, 1, 1, -1, -1410), (0, 1, 0, -1, -1344), (1, 0, 0, -1, -1335),
+    (0, 0, 3, 1, 1107), (4, 0, 0, -1, 1021), (4, 0, -1, 1, 833),
+], dtype=np.float64)
+
+# Minutes between altitude samples (& between the positions they're
+# filled in from), & secant steps to refine a crossing.
+STEP_MINUTES = 10
+POSITION_MINUTES = 60
+REFINE_STEPS = 4
+UNIX_EPOCH_JD = 2440587.5
+
+
+def delta_t_fit(year):
+    """TT - UT in seconds for a year. (Espenak & Meeus fits, 1900 to 2150)"""
+    year = np.asarray(year, dtype=np.float64)
+    t = year - 2000
+    u = (year - 1820) / 100
+    return np.select(
+        [year < 1920, year < 1941, year < 1961, year < 1986,
+         year < 2005, year < 2050],
+        [-2.79 + 1.494119 * (year - 1900) - 0.0598939 * (year - 1900) ** 2
+         + 0.0061966 * (year - 1900) ** 3 - 0.000197 * (year - 1900) ** 4,
+         21.20 + 0.84493 * (year - 1920) - 0.076100 * (year - 1920) ** 2
+         + 0.0020936 * (year - 1920) ** 3,
+         29.07 + 0.407 * (year - 1950) - (year - 1950) ** 2 / 233
+         + (year - 1950) ** 3 / 2547,
+         45.45 + 1.067 * (year - 1975) - (year - 1975) ** 2 / 260
+         - (year - 1975) ** 3 / 718,
+         63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3
+         + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5,
+         62.92 + 0.32217 * t + 0.005589 * t ** 2],
+        -20 + 32 * u ** 2 - 0.5628 * (2150 - year))
+
+
+# delta_t_fit is slow to do for every time, so it's tabulated per year.
+DELTA_T_YEARS = np.arange(1900, 2151)
+DELTA_T_TABLE = delta_t_fit(DELTA_T_YEARS)
+
+
+def delta_t(julian_day):
+    """TT - UT in seconds, for Julian Days (UT)."""
+    year = 2000 + (np.asarray(julian_day) - 2451544.5) / 365.25
+    return np.interp(year, DELTA_T_YEARS, DELTA_T_TABLE)
+
+
+def long_delta_t(julian_day):
+    """delta_t, for any year. (Outside of DELTA_T_YEARS, Espenak & Meeus's
+    long-term fit: -20 + 32u^2, with u in centuries since 1820)"""
+    year = 2000 + (np.asarray(julian_day) - 2451544.5) / 365.25
+    outside = (year < DELTA_T_YEARS[0]) | (year > DELTA_T_YEARS[-1])
+    return np.where(outside, -20 + 32 * ((year - 1820) / 100) ** 2,
+                    np.interp(year, DELTA_T_YEARS, DELTA_T_TABLE))
+
+
+def moon_position(julian_day):
+    """Where the moon is, seen from the center of the earth.
+
+    Parameter
+    ---------
+    julian_day : array-like
+        Julian Days (UT).
+
+    Returns
+    -------
+    right_ascension, declination, parallax : np.ndarray
+        In radians, for each julian_day.
+    """
+    julian_day = np.asarray(julian_day, dtype=np.float64)
+    t = (julian_day + delta_t(julian_day) / 86400 - 2451545.0) / 36525
+
+    mean_longitude = np.radians(218.3164477 + 481267.88123421 * t
+                                - 0.0015786 * t ** 2)
+    elongation = np.radians(297.8501921 + 445267.1114034 * t
+                            - 0.0018819 * t ** 2)
+    sun_anomaly = np.radians(357.5291092 + 35999.0502909 * t
+                             - 0.0001536 * t ** 2)
+    moon_anomaly = np.radians(134.9633964 + 477198.8675055 * t
+                              + 0.0087414 * t ** 2)
+    node_distance = np.radians(93.2720950 + 483202.0175233 * t
+                               - 0.0036539 * t ** 2)
+
+    arguments = np.stack([elongation, sun_anomaly, moon_anomaly,
+                          node_distance], axis=-1)
+
+    # Terms with M in them shrink with the earth's orbit's eccentricity.
+    # (Over a few centuries that's tiny, so the average one is used.)
+    mean_eccentricity = 1 - 0.002516 * np.mean(t)
+    terms = LONGITUDE_DISTANCE_TERMS
+    angles = arguments @ terms[:, :4].T
+    scale = mean_eccentricity ** np.abs(terms[:, 1])
+    sum_longitude = np.sin(angles) @ (scale * terms[:, 4])
+    sum_distance = np.cos(angles) @ (scale * terms[:, 5])
+
+    terms = LATITUDE_TERMS
+    angles = arguments @ terms[:, :4].T
+    scale = mean_eccentricity ** np.abs(terms[:, 1])
+    sum_latitude = np.sin(angles) @ (scale * terms[:, 4])
+
+    a1 = np.radians(119.75 + 131.849 * t)
+    a2 = np.radians(53.09 + 479264.290 * t)
+    a3 = np.radians(313.45 + 481266.484 * t)
+    sum_longitude += (3958 * np.sin(a1)
+                      + 1962 * np.sin(mean_longitude - node_distance)
+                      + 318 * np.sin(a2))
+    sum_latitude += (-2235 * np.sin(mean_longitude) + 382 * np.sin(a3)
+                     + 175 * np.sin(a1 - node_distance)
+                     + 175 * np.sin(a1 + node_distance)
+                     + 127 * np.sin(mean_longitude - moon_anomaly)
+                     - 115 * np.sin(mean_longitude + moon_anomaly))
+
+    # Nutation (main terms only) & the obliquity of the ecliptic.
+    ascending_node = np.radians(125.04452 - 1934.136261 * t)
+    sun_longitude = np.radians(280.4665 + 36000.7698 * t)
+    nutation_longitude = np.radians(
+        (-17.20 * np.sin(ascending_node) - 1.32 * np.sin(2 * sun_longitude)
+         - 0.23 * np.sin(2 * mean_longitude)
+         + 0.21 * np.sin(2 * ascending_node)) / 3600)
+    obliquity = np.radians(
+        23.4392911 - 0.0130042 * t
+        + (9.20 * np.cos(ascending_node) + 0.57 * np.cos(2 * sun_longitude)
+           + 0.10 * np.cos(2 * mean_longitude)
+           - 0.09 * np.cos(2 * ascending_node)) / 3600)
+
+    longitude = (mean_longitude + np.radians(sum_longitude / 1e6)
+                 + nutation_longitude)
+    latitude = np.radians(sum_latitude / 1e6)
+    distance = 385000.56 + sum_distance / 1000
+
+    right_ascension = np.arctan2(
+        np.sin(longitude) * np.cos(obliquity)
+        - np.tan(latitude) * np.sin(obliquity), np.cos(longitude))
+    declination = np.arcsin(
+        np.sin(latitude) * np.cos(obliquity)
+        + np.cos(latitude) * np.sin(obliquity) * np.sin(longitude))
+    parallax = np.arcsin(6378.14 / distance)
+
+    return right_ascension, declination, parallax
+
+
+def moon_altitude(julian_day, latitude: float, longitude: float,
+                  position: tuple = None):
+    """How far the moon is above its rise/set altitude, in radians.
+
+    Parameters
+    ----------
+    julian_day : array-like
+        Julian Days (UT).
+    latitude, longitude : float
+        In degrees. (North & east are +)
+    position : tuple, optional
+        moon_position(julian_day), if it's already known.
+
+    Returns
+    -------
+    altitude : np.ndarray
+        Above 0 means the moon is up, below 0 means it's down.
+    """
+    julian_day = np.asarray(julian_day, dtype=np.float64)
+    if position is None:
+        position = moon_position(julian_day)
+    right_ascension, declination, parallax = position
+
+    t = (julian_day - 2451545.0) / 36525
+    sidereal_time = np.radians(280.46061837
+                               + 360.98564736629 * (julian_day - 2451545.0)
+                               + 0.000387933 * t ** 2)
+    hour_angle = sidereal_time + np.radians(longitude) - right_ascension
+
+    phi = np.radians(latitude)
+    altitude = np.arcsin(np.sin(phi) * np.sin(declination)
+                         + np.cos(phi) * np.cos(declination)
+                         * np.cos(hour_angle))
+    horizon = 0.7275 * parallax - np.radians(0.5667)
+
+    return altitude - horizon
+
+
+def _sampled_position(starts: np.ndarray, offsets: np.ndarray):
+    """moon_position at starts + offsets, filled in from hourly positions."""
+    step = POSITION_MINUTES / 1440
+    hours = np.arange(0, offsets[-1] + step, step)
+    right_ascension, declination, parallax = moon_position(
+        starts[:, None] + hours[None, :])
+    right_ascension = np.unwrap(right_ascension, axis=1)
+
+    index = np.minimum((offsets / step).astype(int), len(hours) - 2)
+    fraction = offsets / step - index
+
+    def fill(values):
+        return (values[:, index] * (1 - fraction)
+                + values[:, index + 1] * fraction)
+
+    return fill(right_ascension), fill(declination), fill(parallax)
+
+
+def _crossings(grid: np.ndarray, rising: bool):
+    """Day & sample index of the first up (or down) crossing of each day."""
+    if rising:
+        crossed = (grid[:, :-1] < 0) & (grid[:, 1:] >= 0)
+    else:
+        crossed = (grid[:, :-1] >= 0) & (grid[:, 1:] < 0)
+
+    found = crossed.any(axis=1)
+    first = crossed.argmax(axis=1)
+    return found, first
+
+
+def _refine(low, high, f_low, f_high, latitude: float, longitude: float):
+    """Close in on where the altitude is 0, between low & high JDs."""
+    for _ in range(REFINE_STEPS):
+        middle = low - f_low * (high - low) / (f_high - f_low)
+        f_middle = moon_altitude(middle, latitude, longitude)
+        same_side = np.sign(f_middle) == np.sign(f_low)
+        low = np.where(same_side, middle, low)
+        f_low = np.where(same_side, f_middle, f_low)
+        high = np.where(same_side, high, middle)
+        f_high = np.where(same_side, f_high, f_middle)
+
+    return low - f_low * (high - low) / (f_high - f_low)
+
+
+def _day_bounds(dates: np.ndarray, timezone: str):
+    """Julian Day (UT) of the local midnights that start & end each date."""
+    zone = ZoneInfo(timezone)
+    starts = []
+    ends = []
+    for date in dates.tolist():
+        start = dt.datetime(date.year, date.month, date.day, tzinfo=zone)
+        end = start + dt.timedelta(days=1)
+        starts.append(start.timestamp())
+        end = dt.datetime(end.year, end.month, end.day, tzinfo=zone)
+        ends.append(end.timestamp())
+
+    return (np.array(starts) / 86400 + UNIX_EPOCH_JD,
+            np.array(ends) / 86400 + UNIX_EPOCH_JD)
+
+
+def moon_rise_set(latitude: float, longitude: float, timezone: str, dates):
+    """Get the moonrise & moonset of each date, at a latitude/longitude.
+
+    Parameters
+    ----------
+    latitude, longitude : float
+        In degrees. (North & east are +)
+    timezone : str
+        The IANA time zone of the place. (Example: "America/Los_Angeles")
+    dates : array-like
+        Local dates, anything np.asarray(..., "datetime64[D]") understands.
+
+    Returns
+    -------
+    rise_utc, set_utc : np.ndarray
+        Julian Day (UT) of the moonrise & moonset on each local date,
+        or NaN if there isn't one that day.
+    """
+    dates = np.atleast_1d(np.asarray(dates, dtype="datetime64[D]"))
+    starts, ends = _day_bounds(dates, timezone)
+
+    # Samples run a bit past the end, for days that are 25 hours long.
+    offsets = np.arange(0, 25 * 60 + STEP_MINUTES, STEP_MINUTES) / 1440
+    times = starts[:, None] + offsets[None, :]
+    grid = moon_altitude(times, latitude, longitude,
+                         _sampled_position(starts, offsets))
+
+    # Rises & sets get refined together, to halve the moon_position calls.
+    days = np.arange(len(dates))
+    found_rise, first_rise = _crossings(grid, rising=True)
+    found_set, first_set = _crossings(grid, rising=False)
+    rows = np.concatenate([days, days])
+    first = np.concatenate([first_rise, first_set])
+    # Days with no crossing get refined too (& thrown away), so hush them.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        events = _refine(times[rows, first], times[rows, first + 1],
+                         grid[rows, first], grid[rows, first + 1],
+                         latitude, longitude)
+    found = np.concatenate([found_rise, found_set]) & (events < ends[rows])
+    events = np.where(found, events, np.nan)
+
+    return events[:len(dates)], events[len(dates):]
+
+
+def clock_time(julian_day: float, timezone: str):
+    """Format a Julian Day (UT) as a local time, like timeanddate. (9:04 am)
+
+    Notes
+    -----
+    The seconds are dropped, not rounded, since that's what matches the
+    times timeanddate gives (every one asserted in test_functions.py).
+    """
+    if np.isnan(julian_day):
+        return None
+
+    seconds = (julian_day - UNIX_EPOCH_JD) * 86400
+    local = dt.datetime.fromtimestamp((seconds // 60) * 60,
+                                      tz=ZoneInfo(timezone))
+    return f"{(local.hour % 12) or 12}:{local.minute:02d} " \
+           f"{'am' if local.hour < 12 else 'pm'}"
+
+
+def city_place(us_city: str):
+    """Get (latitude, longitude, time zone) of a US city from the gazetteer.
+
+    Returns
+    -------
+    place : tuple or None
+        (Example: (32.7157, -117.1611, "America/Los_Angeles")), or None
+        if the gazetteer doesn't know the city.
+    """
+    city = get_gazetteer().resolve(us_city)
+    if city is None:
+        return None
+    return city.latitude, city.longitude, city.timezone
+
+
+def offline_month_table(us_city: str, year: (str, int), month: (str, int)):
+    """Same as functions.month_table, but computed instead of scraped.
+
+    Returns
+    -------
+    month_rows : dict or None
+        {day: ("moonrise", "moonset")}, or None for a city the gazetteer
+        doesn't have the latitude/longitude of.
+    """
+    place = city_place(us_city)
+    if place is None:
+        return None
+
+    latitude, longitude, timezone = place
+    days_in_month = calendar.monthrange(int(year), int(month))[1]
+    first = np.datetime64(f"{int(year):04d}-{int(month):02d}-01")
+    dates = first + np.arange(days_in_month)
+
+    rises, sets = moon_rise_set(latitude, longitude, timezone, dates)
+
+    month_rows = {}
+    for day, (rise, moonset) in enumerate(zip(rises, sets), start=1):
+        month_rows[day] = (clock_time(rise, timezone) or "No moonrise",
+                           clock_time(moonset, timezone) or "No moonset")
+    return month_rows
+
+
+def offline_moon_scraper(us_city: str, year: (str, int), month: (str, int),
+                         day: (str, int)):
+    """Same as functions.moon_scraper, but computed instead of scraped.
+
+    Returns
+    -------
+    moon_outputs : list
+        Returns a list of moonrise/moonset. (Example: ["moonrise","moonset"])
+    """
+    place = city_place(us_city)
+    if place is None:
+        return list(functions.NO_TABLE)
+
+    latitude, longitude, timezone = place
+    date = np.datetime64(f"{int(year):04d}-{int(month):02d}-{int(day):02d}")
+    rises, sets = moon_rise_set(latitude, longitude, timezone, [date])
+
+    return [clock_time(rises[0], timezone) or "No moonrise",
+            clock_time(sets[0], timezone) or "No moonset"]
@@ -0,0 +1,390 @@
+"""This contains the lunation index: every new moon & quarter, 1900 to 2100.
+
+Notes
+-----
+dic_calculator counts mean synodic months (29.53059 days) from the new
+moon of Jan 6, 2000, so it can't go back before it, & it drifts from the
+real moon (a real lunation is anywhere from ~29.3 to ~29.8 days). Instead:
+(1) build_index works out the instant of every new moon, first quarter,
+    full moon & third quarter from 1900 to 2100 with Meeus's
+    "Astronomical Algorithms" (2nd ed.), chapter 49, & saves them into
+    data/lunations.bin. (Whole minutes of UT, 4 bytes each, ~40KB)
+    scripts/build_lunations.py runs it again, if this file changes.
+(2) LunationIndex reads that file (no NumPy needed) & answers everything
+    with a bisect, so any date is O(log n).
+(3) For the phase of a date, the time between the two quarters around it
+    is stretched/squashed to a mean quarter (29.53059 / 4 days), so that
+    dic_interpreter's thresholds still work on it.
+1. quarter_instants
+2. build_index
+3. LunationIndex
+4. get_lunation_index
+"""
+import os
+import sys
+import array
+import bisect
+import calendar
+import struct
+import threading
+import datetime as dt
+
+try:
+    from .functions import dic_interpreter
+except ImportError:
+    from functions import dic_interpreter
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "data", "lunations.bin")
+
+# Magic, number of the first quarter (k = number / 4) & the JD (UT) that
+# the minutes count from.
+HEADER = struct.Struct("<4sid")
+MAGIC = b"LUNA"
+
+# The days phase_on answers for. (build_index's default years; the index
+# has one more lunation on both ends, only so these have quarters around)
+FIRST_DATE = dt.date(1900, 1, 1)
+LAST_DATE = dt.date(2100, 12, 31)
+
+PRIMARY_PHASES = ("New Moon", "First Quarter", "Full Moon", "Third Quarter")
+SYNODIC_MONTH = 29.53059
+
+# Julian Day of 0:00 UT on date.toordinal() == 0.
+ORDINAL_JD = 1721424.5
+
+# Meeus table 49.A terms: (coefficient, power of E, multiples of M, M',
+# F & the moon's node). The full moon shares all but the first 7.
+NEW_MOON_TERMS = (
+    (-0.40720, 0, 0, 1, 0, 0), (0.17241, 1, 1, 0, 0, 0),
+    (0.01608, 0, 0, 2, 0, 0), (0.01039, 0, 0, 0, 2, 0),
+    (0.00739, 1, -1, 1, 0, 0), (-0.00514, 1, 1, 1, 0, 0),
+    (0.00208, 2, 2, 0, 0, 0), (-0.00111, 0, 0, 1, -2, 0),
+    (-0.00057, 0, 0, 1, 2, 0), (0.00056, 1, 1, 2, 0, 0),
+    (-0.00042, 0, 0, 3, 0, 0), (0.00042, 1, 1, 0, 2, 0),
+    (0.00038, 1, 1, 0, -2, 0), (-0.00024, 1, -1, 2, 0, 0),
+    (-0.00017, 0, 0, 0, 0, 1), (-0.00007, 0, 2, 1, 0, 0),
+    (0.00004, 0, 0, 2, -2, 0), (0.00004, 0, 3, 0, 0, 0),
+    (0.00003, 0, 1, 1, -2, 0), (0.00003, 0, 0, 2, 2, 0),
+    (-0.00003, 0, 1, 1, 2, 0), (0.00003, 0, -1, 1, 2, 0),
+    (-0.00002, 0, -1, 1, -2, 0), (-0.00002, 0, 1, 3, 0, 0),
+    (0.00002, 0, 0, 4, 0, 0),
+)
+FULL_MOON_TERMS = (
+    (-0.40614, 0, 0, 1, 0, 0), (0.17302, 1, 1, 0, 0, 0),
+    (0.01614, 0, 0, 2, 0, 0), (0.01043, 0, 0, 0, 2, 0),
+    (0.00734, 1, -1, 1, 0, 0), (-0.00515, 1, 1, 1, 0, 0),
+    (0.00209, 2, 2, 0, 0, 0),
+) + NEW_MOON_TERMS[7:]
+QUARTER_TERMS = (
+    (-0.62801, 0, 0, 1, 0, 0), (0.17172, 1, 1, 0, 0, 0),
+    (-0.01183, 1, 1, 1, 0, 0), (0.00862, 0, 0, 2, 0, 0),
+    (0.00804, 0, 0, 0, 2, 0), (0.00454, 1, -1, 1, 0, 0),
+    (0.00204, 2, 2, 0, 0, 0), (-0.00180, 0, 0, 1, -2, 0),
+    (-0.00070, 0, 0, 1, 2, 0), (-0.00040, 0, 0, 3, 0, 0),
+    (-0.00034, 1, -1, 2, 0, 0), (0.00032, 1, 1, 0, 2, 0),
+    (0.00032, 1, 1, 0, -2, 0), (-0.00028, 2, 2, 1, 0, 0),
+    (0.00027, 1, 1, 2, 0, 0), (-0.00017, 0, 0, 0, 0, 1),
+    (-0.00005, 0, -1, 1, -2, 0), (0.00004, 0, 0, 2, 2, 0),
+    (-0.00004, 0, 1, 1, 2, 0), (0.00004, 0, -2, 1, 0, 0),
+    (0.00003, 0, 1, 1, -2, 0), (0.00003, 0, 3, 0, 0, 0),
+    (0.00002, 0, 0, 2, -2, 0), (0.00002, 0, -1, 1, 2, 0),
+    (-0.00002, 0, 1, 3, 0, 0),
+)
+# The 14 planetary arguments A1...A14: (degrees, degrees per k, days).
+PLANETARY_TERMS = (
+    (299.77, 0.107408, 0.000325), (251.88, 0.016321, 0.000165),
+    (251.83, 26.651886, 0.000164), (349.42, 36.412478, 0.000126),
+    (84.66, 18.206239, 0.000110), (141.74, 53.303771, 0.000062),
+    (207.14, 2.453732, 0.000060), (154.84, 7.306860, 0.000056),
+    (34.52, 27.261239, 0.000047), (207.19, 0.121824, 0.000042),
+    (291.34, 1.844379, 0.000040), (161.72, 24.198154, 0.000037),
+    (239.56, 25.513099, 0.000035), (331.55, 3.592518, 0.000023),
+)
+
+
+def quarter_instants(quarter_numbers):
+    """Work out when each quarter happens. (Meeus chapter 49)
+
+    Parameter
+    ---------
+    quarter_numbers : array-like of int
+        4 * Meeus's k, so 0 is the new moon of Jan 6, 2000, 1 the first
+        quarter after it, 2 the full moon & so on. (Negative is before)
+
+    Returns
+    -------
+    julian_days : np.ndarray
+        Julian Day (TT) of every one of them.
+    """
+    import numpy as np
+
+    k = np.asarray(quarter_numbers, dtype=np.float64) / 4
+    kind = np.asarray(quarter_numbers) % 4
+    t = k / 1236.85
+
+    julian_days = (2451550.09766 + 29.530588861 * k + 0.00015437 * t ** 2
+                   - 0.000000150 * t ** 3 + 0.00000000073 * t ** 4)
+    e = 1 - 0.002516 * t - 0.0000074 * t ** 2
+    sun_anomaly = np.radians(2.5534 + 29.10535670 * k
+                             - 0.0000014 * t ** 2 - 0.00000011 * t ** 3)
+    moon_anomaly = np.radians(201.5643 + 385.81693528 * k
+                              + 0.0107582 * t ** 2 + 0.00001238 * t ** 3
+                              - 0.000000058 * t ** 4)
+    latitude_argument = np.radians(160.7108 + 390.67050284 * k
+                                   - 0.0016118 * t ** 2
+                                   - 0.00000227 * t ** 3
+                                   + 0.000000011 * t ** 4)
+    node = np.radians(124.7746 - 1.56375588 * k + 0.0020672 * t ** 2
+                      + 0.00000215 * t ** 3)
+    arguments = (sun_anomaly, moon_anomaly, latitude_argument, node)
+
+    for phase, terms in ((0, NEW_MOON_TERMS), (1, QUARTER_TERMS),
+                         (2, FULL_MOON_TERMS), (3, QUARTER_TERMS)):
+        chosen = kind == phase
+        for coefficient, e_power, *multiples in terms:
+            angle = sum(multiple * argument[chosen]
+                        for multiple, argument in zip(multiples, arguments))
+            julian_days[chosen] += (coefficient * e[chosen] ** e_power
+                                    * np.sin(angle))
+
+    # The quarters get one more correction, + for first & - for third.
+    w = (0.00306 - 0.00038 * e * np.cos(sun_anomaly)
+         + 0.00026 * np.cos(moon_anomaly)
+         - 0.00002 * np.cos(moon_anomaly - sun_anomaly)
+         + 0.00002 * np.cos(moon_anomaly + sun_anomaly)
+         + 0.00002 * np.cos(2 * latitude_argument))
+    julian_days += np.select([kind == 1, kind == 3], [w, -w], 0)
+
+    for number, (start, per_k, coefficient) in enumerate(PLANETARY_TERMS):
+        degrees = start + per_k * k
+        if number == 0:
+            degrees = degrees - 0.009173 * t ** 2
+        julian_days += coefficient * np.sin(np.radians(degrees))
+
+    return julian_days
+
+
+def build_index(path: str = INDEX_PATH, first_year: int = 1900,
+                last_year: int = 2100):
+    """Work out every quarter from first_year to last_year & save them.
+
+    Notes
+    -----
+    Needs NumPy (& lunar_engine, for TT - UT). One extra lunation is kept
+    on both ends, so the first & last days still have a quarter around them.
+    """
+    import numpy as np
+
+    try:
+        from .lunar_engine import delta_t
+    except ImportError:
+        from lunar_engine import delta_t
+
+    first = 4 * (int(np.floor((first_year - 2000) * 12.3685)) - 1)
+    last = 4 * (int(np.ceil((last_year + 1 - 2000) * 12.3685)) + 1)
+    numbers = np.arange(first, last)
+
+    terrestrial = quarter_instants(numbers)
+    universal = terrestrial - delta_t(terrestrial) / 86400
+
+    epoch = float(np.floor(universal[0] - 0.5) + 0.5)
+    minutes = np.rint((universal - epoch) * 1440).astype("<u4")
+
+    with open(path, "wb") as index_file:
+        index_file.write(HEADER.pack(MAGIC, first, epoch))
+        index_file.write(minutes.tobytes())
+
+
+class LunationIndex:
+    """Every primary phase instant, sorted, for bisect lookups.
+
+    Parameters
+    ----------
+    first_quarter : int
+        Quarter number (see quarter_instants) of the first instant.
+    epoch : float
+        Julian Day (UT) the minutes count from.
+    minutes : sequence of int
+        Minutes from epoch to each instant, in order.
+    """
+
+    def __init__(self, first_quarter: int, epoch: float, minutes):
+        self.first_quarter = first_quarter
+        self.epoch = epoch
+        self.minutes = list(minutes)
+
+    @classmethod
+    def from_file(cls, path: str = INDEX_PATH):
+        """Read an index that build_index saved."""
+        with open(path, "rb") as index_file:
+            magic, first_quarter, epoch = HEADER.unpack(
+                index_file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} isn't a lunation index")
+            minutes = array.array("I")
+            minutes.frombytes(index_file.read())
+
+        if sys.byteorder == "big":
+            minutes.byteswap()
+        return cls(first_quarter, epoch, minutes)
+
+    def phase_kind(self, position: int):
+        """Which of PRIMARY_PHASES the instant at a position is."""
+        return PRIMARY_PHASES[(self.first_quarter + position) % 4]
+
+    def instant(self, position: int):
+        """The instant at a position, as an aware UTC datetime."""
+        # epoch is always a 0:00 UT, so it's a whole day.
+        start = dt.datetime.fromordinal(round(self.epoch - ORDINAL_JD))
+        return (start.replace(tzinfo=dt.timezone.utc)
+                + dt.timedelta(minutes=self.minutes[position]))
+
+    def to_minutes(self, when):
+        """Minutes from epoch to a date (its 0:00 UT) or datetime.
+        (A naive datetime counts as UTC)
+        """
+        if isinstance(when, dt.datetime):
+            if when.tzinfo is not None:
+                when = when.astimezone(dt.timezone.utc).replace(tzinfo=None)
+            day_minutes = when.hour * 60 + when.minute + when.second / 60
+        else:
+            day_minutes = 0
+        return ((when.toordinal() + ORDINAL_JD - self.epoch) * 1440
+                + day_minutes)
+
+    def _around(self, minutes: float):
+        """Position of the last instant at or before minutes, or None if
+        minutes isn't between the first & last instant."""
+        position = bisect.bisect_right(self.minutes, minutes) - 1
+        if position < 0 or position + 1 >= len(self.minutes):
+            return None
+        return position
+
+    def phase_on(self, year: int, month: int, day: int):
+        """Get the moon phase of a date, like dic_calculator does.
+
+        Returns
+        -------
+        phase : str or None
+            One of the 8 phases of dic_interpreter, or None if the date
+            isn't from FIRST_DATE to LAST_DATE.
+
+        Notes
+        -----
+        The phase is the one at 0:00 UT right after the date (the evening
+        of the date, all over the US). Every primary phase date of the
+        almanac in test_functions.py comes out right that way.
+        """
+        date = dt.date(year, month, day)
+        if not FIRST_DATE <= date <= LAST_DATE:
+            return None
+        minutes = self.to_minutes(date) + 1440
+        position = self._around(minutes)
+        if position is None:
+            return None
+        return self._phase_at(position, minutes)
+
+    def _phase_at(self, position: int, minutes: float):
+        """The phase at minutes, given the position _around gave for it."""
+        start, end = self.minutes[position], self.minutes[position + 1]
+        quarters = ((self.first_quarter + position) % 4
+                    + (minutes - start) / (end - start))
+        return dic_interpreter(quarters * SYNODIC_MONTH / 4)
+
+    def month_phases(self, year: int, month: int):
+        """phase_on of every day of a month, in one go.
+
+        Returns
+        -------
+        phases : list
+            The phase (or None) of day 1, 2, ... of the month.
+
+        Notes
+        -----
+        Only the first day needs a bisect: the days after it just step
+        forward through the (at most ~5) quarters of the month.
+        """
+        days = calendar.monthrange(year, month)[1]
+        first = self.to_minutes(dt.date(year, month, 1)) + 1440
+        position = self._around(first)
+        if position is None or \
+                not FIRST_DATE <= dt.date(year, month, 1) <= LAST_DATE or \
+                not FIRST_DATE <= dt.date(year, month, days) <= LAST_DATE:
+            # The month hangs off an end of the index.
+            return [self.phase_on(year, month, day)
+                    for day in range(1, days + 1)]
+
+        phases = []
+        for count in range(days):
+            minutes = first + count * 1440
+            while self.minutes[position + 1] <= minutes:
+                position += 1
+            phases.append(self._phase_at(position, minutes))
+        return phases
+
+    def moon_age(self, when):
+        """Days since the last new moon, at a date/datetime (or None)."""
+        minutes = self.to_minutes(when)
+        position = self._around(minutes)
+        if position is None:
+            return None
+
+        new_moon = position - (self.first_quarter + position) % 4
+        if new_moon < 0:
+            return None
+        return (minutes - self.minutes[new_moon]) / 1440
+
+    def next_phase(self, phase: str, after):
+        """When phase (like "Full Moon") next happens after a date/datetime.
+
+        Returns
+        -------
+        instant : datetime or None
+            In UTC, or None if it's past the end of the index.
+        """
+        position = bisect.bisect_right(self.minutes, self.to_minutes(after))
+        while position < len(self.minutes):
+            if self.phase_kind(position) == phase:
+                return self.instant(position)
+            position += 1
+        return None
+
+    def previous_phase(self, phase: str, before):
+        """When phase last happened before a date/datetime (or None)."""
+        position = bisect.bisect_left(self.minutes,
+                                      self.to_minutes(before)) - 1
+        while position >= 0:
+            if self.phase_kind(position) == phase:
+                return self.instant(position)
+            position -= 1
+        return None
+
+    def phases_between(self, phase: str, start, end):
+        """Every time phase happens from start up to (not incl.) end.
+
+        Returns
+        -------
+        instants : list of datetime
+            In UTC, in order. (Example: every new moon of 2020)
+        """
+        first = bisect.bisect_left(self.minutes, self.to_minutes(start))
+        last = bisect.bisect_left(self.minutes, self.to_minutes(end))
+        return [self.instant(position) for position in range(first, last)
+                if self.phase_kind(position) == phase]
+
+    def __len__(self):
+        return len(self.minutes)
+
+
+_LUNATION_INDEX = None
+_LUNATION_INDEX_LOCK = threading.Lock()
+
+
+def get_lunation_index():
+    """The LunationIndex of data/lunations.bin, read the first time."""
+    global _LUNATION_INDEX
+    with _LUNATION_INDEX_LOCK:
+        if _LUNATION_INDEX is None:
+            _LUNATION_INDEX = LunationIndex.from_file()
+    return _LUNATION_INDEX
@@ -0,0 +1,187 @@
+"""This contains the (optional) metrics of the lookup pipeline.
+
+Notes
+-----
+To see where a date_check's time goes, do:
+functions.METRICS = Metrics()
+& every lookup after that adds to:
+(1) A latency histogram per stage: "validate" & "phase" (check_date),
+    "fetch", "parse" & "extract" (moon_scraper), & "date_check" (all of it).
+(2) Counters: "requests", "cache_hits", "cache_misses", "upstream_errors",
+    "invalid_cities" & "bytes_downloaded".
+Metrics(callback=...) also hands every one of these to a function of yours
+(to send them to statsd, logs, etc.), & prometheus_text() gives them in
+the Prometheus text format, for a /metrics page.
+With functions.METRICS = None (the default), each stage only costs an
+"is not None" check. (See benchmarks/bench_metrics.py)
+1. Histogram
+2. Metrics
+"""
+import time
+import bisect
+import threading
+
+# Upper bounds (in seconds) of the histogram buckets. 10us to 10s.
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+COUNTERS = ("requests", "cache_hits", "stale_hits", "cache_misses",
+            "upstream_errors", "invalid_cities", "bytes_downloaded",
+            "prefetch_errors")
+
+HELP = {
+    "requests": "date_check lookups.",
+    "cache_hits": "Month tables found in MONTH_CACHE/MONTH_STORE.",
+    "stale_hits": "Stale month tables served while a new one downloads.",
+    "cache_misses": "Month tables that had to be downloaded.",
+    "upstream_errors": "Downloads that failed or got a 5xx answer.",
+    "invalid_cities": "Lookups of a city with no month table.",
+    "bytes_downloaded": "Bytes of month pages downloaded.",
+    "prefetch_errors": "Prefetches that failed, for any reason.",
+}
+
+
+class Histogram:
+    """Counts of how long something took, in buckets. (Like Prometheus')
+
+    Parameter
+    ---------
+    buckets : tuple
+        Upper bounds, in seconds, from small to big.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One more than buckets, for everything past the last one.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        """Add one measurement."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """(upper bound, count <= it) of every bucket, then ("+Inf", all)."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, fraction: float):
+        """Estimate a percentile (0.5 = median) as its bucket's upper bound.
+
+        Returns
+        -------
+        seconds : float or None
+            None if nothing was observed (or it's past the last bucket).
+        """
+        if not self.count:
+            return None
+        for bound, total in self.cumulative():
+            if total >= fraction * self.count:
+                return bound if bound != "+Inf" else None
+
+
+class Metrics:
+    """Per-stage histograms & counters, safe to share between threads.
+
+    Parameters
+    ----------
+    callback : callable
+        Called as callback(kind, name, value) for every measurement, with
+        kind "histogram" (value in seconds) or "counter" (value added).
+    buckets : tuple
+        Same as Histogram.
+    """
+
+    def __init__(self, callback=None, buckets: tuple = DEFAULT_BUCKETS):
+        self.callback = callback
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clock():
+        """When a stage starts. (Give it back to observe() when it ends)"""
+        return time.perf_counter()
+
+    def observe(self, stage: str, started: float):
+        """Add how long a stage took, from when clock() was called."""
+        seconds = time.perf_counter() - started
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        if self.callback is not None:
+            self.callback("histogram", stage, seconds)
+
+    def count(self, name: str, amount: int = 1):
+        """Add to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        if self.callback is not None:
+            self.callback("counter", name, amount)
+
+    def snapshot(self):
+        """Everything so far, as plain dicts.
+
+        Returns
+        -------
+        snapshot : dict
+            {"counters": {name: value}, "stages": {stage: {"count", "sum",
+            "p50", "p99"}}} (p50 & p99 are bucket upper bounds, in seconds)
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "stages": {stage: {"count": histogram.count,
+                                   "sum": histogram.sum,
+                                   "p50": histogram.quantile(0.5),
+                                   "p99": histogram.quantile(0.99)}
+                           for stage, histogram in self.histograms.items()},
+            }
+
+    def prometheus_text(self, prefix: str = "moon"):
+        """Everything so far, in the Prometheus text exposition format.
+
+        Returns
+        -------
+        text : str
+            Example: 'moon_requests_total 12\\n' & so on.
+        """
+        lines = []
+        with self._lock:
+            for name, value in self.counters.items():
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {metric} Time spent in each stage "
+                         "of a lookup.")
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in sorted(self.histograms.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{stage="{stage}",'
+                                 f'le="{bound}"}} {total}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} '
+                             f'{histogram.sum!r}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} '
+                             f'{histogram.count}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Start every histogram & counter over from 0."""
+        with self._lock:
+            self.histograms = {}
+            self.counters = dict.fromkeys(COUNTERS, 0)
@@ -0,0 +1,162 @@
+"""This contains the in-memory cache of scraped month tables.
+
+Notes
+-----
+The timeanddate page for a city/month holds the moonrise/moonset of
+every day of that month, so one download can answer ~30 lookups.
+MonthCache keeps those parsed month tables around, keyed by
+(formatted city, year, month), with:
+1. A size bound (least recently used entries get evicted first)
+2. A time-to-live, after which an entry counts as a miss
+3. Negative caching (a city with no table is remembered as None)
+4. Hit/miss/eviction counters, so the size can be tuned
+5. Stale-while-revalidate: past its ttl, a month table can still be
+   handed out (as STALE, by lookup()) for max_stale more seconds, while
+   month_table downloads a fresh one in the background
+"""
+import time
+import threading
+from collections import OrderedDict
+
+# Returned by MonthCache.get() on a miss, since None is a valid entry.
+MISSING = object()
+
+# What lookup() says about an entry it found.
+FRESH = "fresh"
+STALE = "stale"
+
+
+class MonthCache:
+    """LRU + TTL cache of month tables (or None for invalid cities).
+
+    Parameters
+    ----------
+    max_entries : int
+        How many city/months to keep before evicting the oldest-used.
+    ttl : float
+        Seconds a month table stays valid.
+    negative_ttl : float
+        Seconds an "invalid city" (None) entry stays valid.
+    clock : callable
+        Returns the current time in seconds. (Swappable for tests)
+    max_stale : float
+        Seconds past ttl that a month table can still be served as STALE
+        by lookup(). (0 = never, like before) Invalid cities never are.
+    freshness : callable
+        freshness(key, table) gives (ttl, max_stale) for one entry, for
+        when some keys should stay fresh longer than others. (Example:
+        months that are long over could get a much bigger ttl)
+
+    Notes
+    -----
+    get() only ever gives fresh entries, so code that doesn't know about
+    stale ones never sees them.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 6 * 60 * 60,
+                 negative_ttl: float = 10 * 60, clock=time.monotonic,
+                 max_stale: float = 0.0, freshness=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.max_stale = max_stale
+        self.freshness = freshness or self.default_freshness
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def default_freshness(self, key: tuple, table):
+        """(ttl, max_stale) of an entry, from the settings above."""
+        if table is None:
+            return self.negative_ttl, 0.0
+        return self.ttl, self.max_stale
+
+    def lookup(self, key: tuple):
+        """Get the entry for key, & whether it's still fresh.
+
+        Returns
+        -------
+        table, state : dict or None or MISSING, str or None
+            (table, FRESH), (table, STALE) if it's past its ttl but not
+            past max_stale, or (MISSING, None).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                fresh_until, stale_until, table = entry
+                now = self.clock()
+                if fresh_until > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return table, FRESH
+                if stale_until > now:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return table, STALE
+                del self._entries[key]
+            self.misses += 1
+            return MISSING, None
+
+    def get(self, key: tuple):
+        """Get the entry for key, or MISSING if it's absent or not fresh."""
+        table, state = self.lookup(key)
+        if state is STALE:
+            # Counted as a miss, since the caller will fetch it again.
+            with self._lock:
+                self.stale_hits -= 1
+                self.misses += 1
+            return MISSING
+        return table
+
+    def put(self, key: tuple, table, age: float = 0.0):
+        """Save the month table for key. (None = no table for the city)
+
+        Parameter
+        ---------
+        age : float
+            Seconds since the table was downloaded, taken off its ttl.
+            (Example: a copy of a MONTH_STORE entry that's a day old)
+        """
+        ttl, max_stale = self.freshness(key, table)
+        ttl -= age
+        if ttl + max_stale <= 0 or self.max_entries <= 0:
+            return
+
+        now = self.clock()
+        with self._lock:
+            self._entries[key] = (now + ttl, now + ttl + max_stale, table)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Forget every entry & reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Counters for sizing the cache.
+
+        Returns
+        -------
+        stats : dict
+            {"hits", "stale_hits", "misses", "evictions", "size",
+            "max_entries"}
+        """
+        with self._lock:
+            return {"hits": self.hits, "stale_hits": self.stale_hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._entries),
+                    "max_entries": self.max_entries}
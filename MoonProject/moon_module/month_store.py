@@ -0,0 +1,210 @@
+"""This contains the on-disk (SQLite) store of scraped month tables.
+
+Notes
+-----
+MONTH_CACHE only lives as long as the process does. MonthStore keeps the
+same month tables in a SQLite file, so every GUI/worker on the machine
+can share what any of them already scraped, even after a restart.
+1. WAL mode, so readers never block the (one at a time) writer
+2. Every thread gets its own connection (sqlite3 needs that)
+3. Entries expire, & the oldest months are dropped past max_months
+   (every prune_every writes, not on every one)
+4. lookup() says how old an entry is, so MONTH_CACHE only keeps a copy
+   of it for what's left of its ttl
+
+To turn it on, either set the MOON_STORE_PATH environment variable
+before importing functions, or do:
+functions.MONTH_STORE = MonthStore("moon_tables.sqlite3")
+"""
+import time
+import sqlite3
+import itertools
+import threading
+
+try:
+    from .month_cache import MISSING
+except ImportError:
+    from month_cache import MISSING
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS months (
+    city TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    valid INTEGER NOT NULL,
+    PRIMARY KEY (city, year, month)
+);
+CREATE INDEX IF NOT EXISTS months_fetched_at ON months (fetched_at);
+CREATE INDEX IF NOT EXISTS months_expires_at ON months (expires_at);
+CREATE TABLE IF NOT EXISTS moon_rows (
+    city TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    moonrise TEXT NOT NULL,
+    moonset TEXT NOT NULL,
+    PRIMARY KEY (city, year, month, day)
+) WITHOUT ROWID;
+"""
+
+
+class MonthStore:
+    """SQLite-backed month tables (or None for invalid cities).
+
+    Parameters
+    ----------
+    path : str
+        The SQLite database file. (Made if it doesn't exist yet)
+    ttl : float
+        Seconds a month table stays valid.
+    negative_ttl : float
+        Seconds an "invalid city" entry stays valid.
+    max_months : int
+        How many city/months to keep before dropping the oldest.
+    busy_timeout : float
+        Seconds to wait on another process's write before giving up.
+    clock : callable
+        Returns the current (wall clock) time, shared by every process.
+    prune_every : int
+        put()s between prunes. (So there can be up to that many months
+        past max_months, & expired ones, which get() skips anyway, stay
+        in the file a bit longer)
+    """
+
+    def __init__(self, path: str, ttl: float = 30 * 24 * 60 * 60,
+                 negative_ttl: float = 24 * 60 * 60, max_months: int = 20000,
+                 busy_timeout: float = 10.0, clock=time.time,
+                 prune_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_months = max_months
+        self.busy_timeout = busy_timeout
+        self.clock = clock
+        self.prune_every = max(1, prune_every)
+        self._writes = itertools.count(1)
+        self._local = threading.local()
+
+        # executescript() commits on its own, so it goes outside _write().
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None, so transactions are only the ones I begin.
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        """A write transaction, taking the write lock up front."""
+        return _WriteTransaction(self._connection())
+
+    def lookup(self, key: tuple):
+        """Get the month table for key, & how old it is.
+
+        Returns
+        -------
+        table, age : dict or None or MISSING, float or None
+            The table & the seconds since it was put(), or (MISSING, None)
+            if it's absent or expired.
+
+        Notes
+        -----
+        One SELECT (so one read transaction), so a put() of the same key
+        from another process can't land between reading the month & its
+        rows.
+        """
+        now = self.clock()
+        found = self._connection().execute(
+            "SELECT valid, fetched_at, day, moonrise, moonset FROM months "
+            "LEFT JOIN moon_rows USING (city, year, month) "
+            "WHERE city = ? AND year = ? AND month = ? AND expires_at > ?",
+            (*key, now)
+        ).fetchall()
+        if not found:
+            return MISSING, None
+        valid, fetched_at = found[0][:2]
+        age = max(0.0, now - fetched_at)
+        if not valid:
+            return None, age
+        return {day: (moonrise, moonset) for _, _, day, moonrise, moonset
+                in found if day is not None}, age
+
+    def get(self, key: tuple):
+        """Get the month table for key, or MISSING if absent or expired."""
+        return self.lookup(key)[0]
+
+    def put(self, key: tuple, table):
+        """Save the month table for key. (None = no table for the city)"""
+        now = self.clock()
+        ttl = self.negative_ttl if table is None else self.ttl
+
+        with self._write() as conn:
+            conn.execute("DELETE FROM moon_rows WHERE city = ? AND year = ? "
+                         "AND month = ?", key)
+            conn.execute("INSERT OR REPLACE INTO months VALUES "
+                         "(?, ?, ?, ?, ?, ?)",
+                         (*key, now, now + ttl, table is not None))
+            if table is not None:
+                conn.executemany(
+                    "INSERT INTO moon_rows VALUES (?, ?, ?, ?, ?, ?)",
+                    [(*key, day, *rise_set) for day, rise_set in table.items()]
+                )
+            if next(self._writes) % self.prune_every == 0:
+                self._prune(conn, now)
+
+    def prune(self):
+        """Drop expired months & the oldest ones past max_months, now."""
+        with self._write() as conn:
+            self._prune(conn, self.clock())
+
+    def _prune(self, conn, now: float):
+        """Drop expired months, then the oldest ones past max_months."""
+        dropped = conn.execute(
+            "SELECT city, year, month FROM months WHERE expires_at <= ? "
+            "UNION SELECT city, year, month FROM (SELECT city, year, month "
+            "FROM months ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+            (now, self.max_months)
+        ).fetchall()
+        for table_name in ("months", "moon_rows"):
+            conn.executemany(f"DELETE FROM {table_name} WHERE city = ? "
+                             f"AND year = ? AND month = ?", dropped)
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM months").fetchone()[0]
+
+    def clear(self):
+        """Forget every month."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM moon_rows")
+            conn.execute("DELETE FROM months")
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _WriteTransaction:
+    """BEGIN IMMEDIATE ... COMMIT (or ROLLBACK on an error)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,102 @@
+"""This contains what the GUI's month view shows, without any Tk.
+
+Notes
+-----
+One month page already has the moonrise/moonset of every day, so the
+month view never looks up day by day:
+(1) The phases of the whole month come from one functions.month_phases()
+    call on the lunation index (& are kept, so paging back costs nothing).
+(2) The moonrise/moonset come from one month_table() (so one download,
+    or none if MONTH_CACHE has it already).
+(3) month_days() puts the two together, one MonthDay per day.
+1. shift_month
+2. calendar_weeks
+3. cached_month
+4. month_days
+"""
+import calendar
+import datetime as dt
+from typing import NamedTuple
+
+try:
+    from . import functions
+    from .month_cache import MISSING
+except ImportError:
+    import functions
+    from month_cache import MISSING
+
+# Weeks start on Sunday, like US calendars.
+FIRST_WEEKDAY = calendar.SUNDAY
+
+# What the moonrise/moonset of a day says before its month is looked up.
+PENDING = "..."
+
+
+class MonthDay(NamedTuple):
+    """One day of the month view."""
+    date: dt.date
+    phase: str
+    moonrise: str
+    moonset: str
+
+
+def shift_month(year: int, month: int, step: int):
+    """(year, month) step months away. (Example: (2020, 12), 1 -> (2021, 1))
+    """
+    year, month_index = divmod(year * 12 + month - 1 + step, 12)
+    return year, month_index + 1
+
+
+def calendar_weeks(year: int, month: int):
+    """Every week of a month, Sunday first, as day numbers (0 = not in it).
+
+    Returns
+    -------
+    weeks : list
+        4 to 6 lists of 7. (Example: [[0, 0, 0, 0, 0, 1, 2], [3, ...]...])
+    """
+    return calendar.Calendar(FIRST_WEEKDAY).monthdayscalendar(year, month)
+
+
+def cached_month(us_city: str, year: int, month: int):
+    """month_table, but only if it won't have to download anything.
+
+    Returns
+    -------
+    month_rows : dict or None or MISSING
+        Same as month_table, or MISSING if it isn't cached yet.
+    """
+    city = functions.canonical_city(us_city)
+    if city is None:
+        return None
+    return functions.cached_month_table((city, year, month))
+
+
+def month_days(year: int, month: int, month_rows=MISSING):
+    """Every day of a month, with its phase & moonrise/moonset.
+
+    Parameters
+    ----------
+    year, month : int
+        Speaks for itself.
+    month_rows : dict or None or MISSING
+        What month_table gave (None for an invalid city), or MISSING if
+        it isn't there yet. (Then every moonrise/moonset is PENDING)
+
+    Returns
+    -------
+    days : list of MonthDay
+        Day 1 first.
+    """
+    days = []
+    phases = functions.month_phases(year, month)
+    for day, moon_phase in enumerate(phases, start=1):
+        if month_rows is MISSING:
+            moonrise = moonset = PENDING
+        elif month_rows is None or day not in month_rows:
+            moonrise, moonset = functions.NO_TABLE
+        else:
+            moonrise, moonset = month_rows[day]
+        days.append(MonthDay(dt.date(year, month, day), moon_phase,
+                             moonrise, moonset))
+    return days
@@ -0,0 +1,267 @@
+"""This contains the record/replay archive of downloaded month pages.
+
+Notes
+-----
+For runs that can't (or shouldn't) touch the website, like load tests,
+CI or a machine without internet, functions.fetch can go through a
+PageArchive instead:
+(1) "record" mode downloads pages as usual (through transport.fetch) &
+    keeps a compressed copy of every one of them in a zip file. New pages
+    are added checkpoint_every at a time (& on close), each time with a
+    new central directory, so the file is always a valid zip file & a
+    crash only loses the pages since the last checkpoint.
+(2) "replay" mode only answers from that zip file. A page that was never
+    recorded raises ArchiveMiss (on_miss="error"), or gets downloaded
+    after all (on_miss="fetch").
+Every page is stored under a hash of its link (without the website part,
+so the stand-in server of the tests works too), & the zip file's central
+directory is read once into a dict, so replaying a page is one dict
+lookup & one decompression, no matter how big the archive gets.
+
+To turn it on, either set the MOON_ARCHIVE_PATH (& MOON_ARCHIVE_MODE)
+environment variables before importing functions, or do:
+functions.PAGE_ARCHIVE = PageArchive("pages.zip", mode="replay")
+1. ArchivedPage
+2. ArchiveMiss
+3. archive_key
+4. PageArchive
+5. pack_archive
+"""
+import os
+import atexit
+import hashlib
+import zipfile
+import threading
+import urllib.parse
+from typing import NamedTuple
+
+MODES = ("record", "replay")
+MISS_POLICIES = ("error", "fetch")
+
+
+class ArchivedPage(NamedTuple):
+    """A replayed page, with the 2 parts of a requests.Response used."""
+    status_code: int
+    content: bytes
+
+
+class ArchiveMiss(OSError):
+    """A page isn't in the archive (& on_miss is "error").
+
+    Notes
+    -----
+    It's an OSError, like every error of requests, so whatever already
+    handles "couldn't reach the website" handles this too.
+    """
+
+
+def archive_key(link: str):
+    """Get what a link is stored under.
+
+    Parameter
+    ---------
+    link : str
+        A month_link(). (Example: "https://www.timeanddate.com/moon/usa/
+        san-diego?month=5&year=2020")
+
+    Returns
+    -------
+    key, name : str, str
+        The link without its website ("/moon/usa/san-diego?month=5&year=2020")
+        & the name of its file in the zip file. (A hash of the key)
+    """
+    parts = urllib.parse.urlsplit(link)
+    key = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    return key, hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+
+def transport_fetch(link: str):
+    """transport.fetch, imported only once something is downloaded."""
+    try:
+        from .transport import fetch
+    except ImportError:
+        from transport import fetch
+
+    return fetch(link)
+
+
+class PageArchive:
+    """A zip file of month pages, to record into or replay from.
+
+    Parameters
+    ----------
+    path : str
+        The zip file. (Made in "record" mode, if it doesn't exist yet)
+    mode : str
+        "record" or "replay".
+    on_miss : str
+        What replay does for a page it doesn't have: "error" (raise
+        ArchiveMiss) or "fetch" (download it, without recording it).
+    download : callable
+        What downloads a link. (transport.fetch by default)
+    checkpoint_every : int
+        In "record" mode, how many new pages are kept (in memory) before
+        they're added to the zip file.
+    """
+
+    def __init__(self, path: str, mode: str = "replay",
+                 on_miss: str = "error", download=transport_fetch,
+                 checkpoint_every: int = 25):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+        if on_miss not in MISS_POLICIES:
+            raise ValueError(f"on_miss must be one of {MISS_POLICIES}, "
+                             f"not {on_miss!r}")
+        self.path = path
+        self.mode = mode
+        self.on_miss = on_miss
+        self._download = download
+        self._lock = threading.Lock()
+        self.checkpoint_every = checkpoint_every
+        # Recorded pages that aren't in the zip file yet: {name: (info,
+        # content)}
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+        if mode == "record" and not os.path.exists(path):
+            zipfile.ZipFile(path, "w").close()
+        # zipfile reads the central directory into a dict right here.
+        # (Only ever to read: checkpoints append with a ZipFile of their own)
+        self._zip = zipfile.ZipFile(path)
+        if mode == "record":
+            atexit.register(self.close)
+
+    def get(self, link: str):
+        """Get a page from the archive.
+
+        Returns
+        -------
+        page : ArchivedPage or None
+            None if it was never recorded.
+        """
+        _, name = archive_key(link)
+        with self._lock:
+            if name in self._pending:
+                info, content = self._pending[name]
+            else:
+                try:
+                    info = self._zip.getinfo(name)
+                except KeyError:
+                    return None
+                content = self._zip.read(info)
+        # The status code is kept in the entry's comment.
+        return ArchivedPage(int(info.comment.split(b" ", 1)[0]), content)
+
+    def record(self, link: str, status_code: int, content: bytes):
+        """Add a page to the archive. (Unless it's a server error)"""
+        if status_code >= 500:
+            return
+        key, name = archive_key(link)
+        info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.comment = f"{status_code} {key}".encode("utf-8")
+        with self._lock:
+            if name not in self._zip.NameToInfo and \
+                    name not in self._pending:
+                self._pending[name] = (info, content)
+                if len(self._pending) >= self.checkpoint_every:
+                    self._checkpoint()
+
+    def checkpoint(self):
+        """Add every recorded page to the zip file now, so they all
+        survive a crash."""
+        with self._lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        """Append the pending pages & a new central directory, then read
+        that back in. (Hold _lock)"""
+        if not self._pending:
+            return
+        with zipfile.ZipFile(self.path, "a") as zip_file:
+            for info, content in self._pending.values():
+                zip_file.writestr(info, content, compresslevel=9)
+        self._pending.clear()
+        self._zip.close()
+        self._zip = zipfile.ZipFile(self.path)
+
+    def fetch(self, link: str):
+        """Same as transport.fetch, but through the archive.
+
+        Returns
+        -------
+        page : ArchivedPage or requests.Response
+            Both have .status_code & .content.
+
+        Raises
+        ------
+        ArchiveMiss
+            In replay mode, for a page that isn't there (& on_miss="error").
+        """
+        page = self.get(link)
+        if page is not None:
+            self.hits += 1
+            return page
+
+        self.misses += 1
+        if self.mode == "replay" and self.on_miss == "error":
+            raise ArchiveMiss(f"not in {self.path}: {archive_key(link)[0]}")
+
+        page = self._download(link)
+        if self.mode == "record":
+            self.record(link, page.status_code, page.content)
+        return page
+
+    def __contains__(self, link: str):
+        name = archive_key(link)[1]
+        return name in self._zip.NameToInfo or name in self._pending
+
+    def __len__(self):
+        return len(self._zip.NameToInfo) + len(self._pending)
+
+    def close(self):
+        """Add the pending pages to the zip file (if any) & close it."""
+        with self._lock:
+            if self._zip.fp is not None:
+                self._checkpoint()
+            self._zip.close()
+
+
+def pack_archive(path: str, cities, years, download=transport_fetch):
+    """Record every month of some cities & years into an archive.
+
+    Parameters
+    ----------
+    path : str
+        The zip file. (Months already in it aren't downloaded again)
+    cities : iterable of str
+        US cities. (Example: ["San Diego", "Concord, CA"])
+    years : iterable of int
+        Example: range(2020, 2031)
+    download : callable
+        Same as PageArchive.
+
+    Returns
+    -------
+    pages : int
+        How many pages the archive has now.
+    """
+    # Imported here, since functions.py imports this module when it's on.
+    try:
+        from . import functions
+    except ImportError:
+        import functions
+
+    archive = PageArchive(path, mode="record", download=download)
+    try:
+        for us_city in cities:
+            city = functions.canonical_city(us_city)
+            if city is None:
+                continue
+            for year in years:
+                for month in range(1, 13):
+                    archive.fetch(functions.month_link(city, year, month))
+        return len(archive)
+    finally:
+        archive.close()
@@ -0,0 +1,131 @@
+"""This contains the moon phase pictures of the GUI, decoded only once.
+
+Notes
+-----
+Opening & decoding a 300x300 PNG on every click adds up, & so did the
+new tk.Label each click used to stack on top of the old one. Instead:
+(1) PhaseImages decodes a phase's picture the first time it's asked for
+    (or all of them up front, with preload()), & keeps it.
+(2) Every click after that gets the very same image object back, which
+    the GUI puts into its one label_img with configure().
+1. tk_photo (& tk_thumbnail, for the month view)
+2. PhaseImages
+"""
+import os
+
+# moon_images/moon_phases, next to this folder.
+PHASE_IMAGES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "moon_images", "moon_phases")
+
+# The picture for anything that isn't a phase. (Like "Invalid Date")
+FALLBACK = "Invalid Date"
+
+
+def tk_photo(path: str):
+    """Decode a picture into something a tk.Label can show.
+
+    Citations
+    ---------
+    (0) Title: The Tkinter PhotoImage Class
+    Author: Unknown
+    Date: Unknown
+    Code Version: N/A
+    Availability: https://tinyurl.com/3bnlgx
+
+    (1) Title: Why do my Tkinter images not appear?
+    Author: Unknown
+    Date: Unknown
+    Code Version: N/A
+    Availability: https://tinyurl.com/v8p9b
+
+    Notes
+    -----
+    Tk 8.6 & up reads PNGs itself, so Pillow only gets imported (which is
+    slow) for an older Tk that can't. (And a Tk root window has to exist
+    before this is called)
+    (1) is why PhaseImages keeps every image: Tk shows a blank picture
+    once Python lets go of it.
+    """
+    import tkinter as tk
+
+    try:
+        return tk.PhotoImage(file=path)
+    except tk.TclError:
+        from PIL import Image, ImageTk
+
+        with Image.open(path) as image:
+            return ImageTk.PhotoImage(image)
+
+
+def tk_thumbnail(path: str, step: int = 6):
+    """Same as tk_photo, but every step-th pixel. (300x300 -> 50x50)"""
+    import tkinter as tk
+
+    try:
+        return tk.PhotoImage(file=path).subsample(step)
+    except tk.TclError:
+        from PIL import Image, ImageTk
+
+        with Image.open(path) as image:
+            return ImageTk.PhotoImage(image.reduce(step))
+
+
+class PhaseImages:
+    """Keeps every moon phase picture, decoded, for as long as it lives.
+
+    Parameters
+    ----------
+    folder : str
+        Where the "<phase>.png" pictures are.
+    make_image : callable
+        Turns a picture's path into the decoded image. (tk_photo for the
+        GUI, something without Tk for tests)
+    """
+
+    def __init__(self, folder: str = PHASE_IMAGES_DIR, make_image=tk_photo):
+        self.folder = folder
+        self._make_image = make_image
+        self._images = {}
+        self.decodes = 0
+
+    def names(self):
+        """Every phase that has a picture in the folder."""
+        return sorted(file_name[:-len(".png")]
+                      for file_name in os.listdir(self.folder)
+                      if file_name.endswith(".png"))
+
+    def get(self, phase: str):
+        """Get the decoded picture of a phase (or FALLBACK's, if none).
+
+        Parameter
+        ---------
+        phase : str
+            What date_check gives as the moon phase. (Example: "Full Moon")
+
+        Returns
+        -------
+        image
+            Whatever make_image gave, the same object every time.
+        """
+        image = self._images.get(phase)
+        if image is None:
+            path = os.path.join(self.folder, f"{phase}.png")
+            if os.path.exists(path):
+                image = self._make_image(path)
+                self.decodes += 1
+            elif phase == FALLBACK:
+                raise FileNotFoundError(path)
+            else:
+                image = self.get(FALLBACK)
+            self._images[phase] = image
+
+        return image
+
+    def preload(self):
+        """Decode every picture now, so no click has to wait on one."""
+        for phase in self.names():
+            self.get(phase)
+
+    def __len__(self):
+        return len(self._images)
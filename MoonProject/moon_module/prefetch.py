@@ -0,0 +1,189 @@
+"""This contains the background prefetcher behind the moon GUI.
+
+Notes
+-----
+People mostly step day by day or month by month for the same city, so
+once a lookup is done, the next step is very likely the month before or
+after it (or a city they looked up a bit ago). Prefetcher downloads those
+month tables into MONTH_CACHE ahead of time:
+(1) warm() is called once a lookup is done. It plans the next & previous
+    month of that city, then the same month of the most recently used
+    cities, & forgets whatever was planned before.
+(2) At most `workers` threads download at the same time, & they wait
+    while busy() says the GUI is looking something up itself, so a
+    prefetch never slows down what the user actually asked for.
+(3) cancel() (called when the input changes) drops everything planned.
+    A download that already started still finishes & gets cached.
+(4) Months already in MONTH_CACHE (or invalid cities) are skipped.
+(5) Any error is only counted (in stats & METRICS' prefetch_errors), &
+    the thread keeps going.
+1. neighbor_months
+2. Prefetcher
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+
+try:
+    from . import functions
+    from .month_cache import MISSING
+    from .month_view import cached_month, shift_month
+except ImportError:
+    import functions
+    from month_cache import MISSING
+    from month_view import cached_month, shift_month
+
+
+def neighbor_months(year: int, month: int):
+    """The next & previous (year, month), in the order to prefetch them."""
+    return [shift_month(year, month, 1), shift_month(year, month, -1)]
+
+
+class Prefetcher:
+    """Warms MONTH_CACHE with the months the user will likely ask for next.
+
+    Parameters
+    ----------
+    load : callable
+        load(city, year, month) downloads & caches one month table.
+        (Example: functions.month_table)
+    workers : int
+        The most month tables being prefetched at the same time.
+    recent : int
+        How many recently used cities to keep warm, besides the current one.
+    busy : callable
+        Returns True while the GUI is doing its own lookup, so the
+        prefetch waits. (Example: lambda: lookup_worker.busy)
+    idle_wait : float
+        Seconds between checks of busy().
+    """
+
+    def __init__(self, load=None, workers: int = 2, recent: int = 3,
+                 busy=None, idle_wait: float = 0.05):
+        self._load = load or functions.month_table
+        self.recent = recent
+        self._busy = busy or (lambda: False)
+        self.idle_wait = idle_wait
+        self._condition = threading.Condition()
+        self._planned = deque()
+        self._closed = False
+        self.generation = 0
+        self.recent_cities = OrderedDict()
+        self.stats = {"fetched": 0, "skipped": 0, "cancelled": 0,
+                      "failed": 0}
+
+        self._threads = [threading.Thread(target=self._run, daemon=True,
+                                          name=f"moon-prefetch-{count}")
+                         for count in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def plan(self, city: str, year: int, month: int):
+        """The (city, year, month) to prefetch after looking one up.
+
+        Returns
+        -------
+        planned : list
+            The city's next & previous month first, then the same month
+            of the recent cities (newest first).
+        """
+        slug = functions.canonical_city(city)
+        if slug is None:
+            return []
+
+        planned = [(city, *neighbor) for neighbor in
+                   neighbor_months(year, month)]
+        for other_slug, other in reversed(self.recent_cities.items()):
+            if other_slug != slug:
+                planned.append((other, year, month))
+        return planned
+
+    def warm(self, city: str, year: int, month: int):
+        """Prefetch around a lookup that just finished, replacing the
+        old plan. (city also becomes the most recently used one)
+
+        Returns
+        -------
+        generation : int
+            Goes up every warm() & cancel().
+        """
+        with self._condition:
+            planned = self.plan(city, year, month)
+            slug = functions.canonical_city(city)
+            if slug is not None:
+                # Keyed by slug, so "SAN DIEGO" & "San Diego" are one city.
+                self.recent_cities[slug] = city
+                self.recent_cities.move_to_end(slug)
+            while len(self.recent_cities) > self.recent + 1:
+                self.recent_cities.popitem(last=False)
+
+            self.generation += 1
+            self.stats["cancelled"] += len(self._planned)
+            self._planned = deque((self.generation, *key) for key in planned)
+            self._condition.notify_all()
+            return self.generation
+
+    def cancel(self):
+        """Drop everything planned. (Example: the user is typing again)"""
+        with self._condition:
+            self.generation += 1
+            self.stats["cancelled"] += len(self._planned)
+            self._planned.clear()
+
+    @property
+    def pending(self):
+        """How many month tables are still planned."""
+        with self._condition:
+            return len(self._planned)
+
+    def close(self):
+        """Stop every thread once its current download is done."""
+        with self._condition:
+            self._closed = True
+            self._planned.clear()
+            self._condition.notify_all()
+
+    def _next(self):
+        """Wait for the next planned month, or None once closed."""
+        with self._condition:
+            while not self._planned and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            return self._planned.popleft()
+
+    def _current(self, generation: int):
+        with self._condition:
+            return generation == self.generation and not self._closed
+
+    def _run(self):
+        while True:
+            planned = self._next()
+            if planned is None:
+                return
+            generation, city, year, month = planned
+
+            # Low priority: the user's own lookups go first.
+            while self._busy() and self._current(generation):
+                time.sleep(self.idle_wait)
+            if not self._current(generation):
+                with self._condition:
+                    self.stats["cancelled"] += 1
+                continue
+
+            try:
+                if cached_month(city, year, month) is not MISSING:
+                    outcome = "skipped"
+                else:
+                    self._load(city, year, month)
+                    outcome = "fetched"
+            except Exception:
+                # Only a guess that failed (a download, or a page that
+                # wouldn't parse...), so this thread keeps going & the
+                # next real lookup just tries again.
+                outcome = "failed"
+                metrics = functions.METRICS
+                if metrics is not None:
+                    metrics.count("prefetch_errors")
+            with self._condition:
+                self.stats[outcome] += 1
@@ -0,0 +1,277 @@
+"""This contains compact lookup results, one at a time or by the million.
+
+Notes
+-----
+date_check gives ["moonrise", "moonset", "moon phase"], a list of 3 str,
+with the errors ("Invalid Date", "No moonrise"...) in the same slots.
+That's fine for the GUI, but a batch job holding millions of them holds
+millions of lists of repeated strings. Instead:
+(1) MoonResult is a tuple of 4 small ints: a phase code (an index of
+    PHASES), a status code (an index of STATUSES), & the moonrise &
+    moonset as minutes since midnight (or NO_EVENT/NO_TIME).
+(2) MoonResults keeps a whole batch of them (& their city & date) in one
+    NumPy structured array, 16 bytes a row, & writes it as CSV (or
+    Parquet, if pyarrow is installed).
+1. parse_clock
+2. MoonResult
+3. moon_result
+4. MoonResults
+"""
+import re
+import csv
+import datetime as dt
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    from . import functions
+    from .batch_phase import NO_PHASE, PHASE_LABELS
+except ImportError:
+    import functions
+    from batch_phase import NO_PHASE, PHASE_LABELS
+
+# Phase codes are indexes of PHASES. (NO_PHASE if there's no phase)
+PHASES = PHASE_LABELS
+
+# Status codes are indexes of STATUSES.
+STATUSES = ("ok", "invalid date", "out of range", "invalid city")
+OK, INVALID_DATE, OUT_OF_RANGE, INVALID_CITY = range(len(STATUSES))
+
+# Moonrise/moonset minutes for "the moon doesn't rise/set that day", &
+# for "there's no time to give" (invalid date or city).
+NO_EVENT = -1
+NO_TIME = -2
+
+CLOCK_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*([ap]m)")
+
+# One row of MoonResults. (16 bytes)
+ROW_DTYPE = np.dtype([("date", "datetime64[D]"), ("city", np.uint16),
+                      ("phase", np.int8), ("status", np.int8),
+                      ("moonrise", np.int16), ("moonset", np.int16)])
+
+# How many distinct cities the "city" column can tell apart. (65536)
+MAX_CITIES = int(np.iinfo(ROW_DTYPE["city"]).max) + 1
+
+CSV_HEADER = ("city", "date", "phase", "status", "moonrise", "moonset")
+
+
+def parse_clock(text: str):
+    """Turn a moonrise/moonset str into minutes since midnight.
+
+    Parameter
+    ---------
+    text : str
+        What moon_scraper gives. (Example: "9:04 pm")
+
+    Returns
+    -------
+    minutes : int
+        Example: 1264. NO_EVENT for "No moonrise"/"No moonset", & NO_TIME
+        for anything else. (Like "Invalid Date")
+    """
+    match = CLOCK_PATTERN.search(text)
+    if match is None:
+        return NO_EVENT if text.startswith("No moon") else NO_TIME
+    hour, minute, meridiem = match.groups()
+    return (int(hour) % 12 + (12 if meridiem == "pm" else 0)) * 60 \
+        + int(minute)
+
+
+def format_minutes(minutes: int, no_event: str = "No moon event"):
+    """Turn minutes since midnight back into date_check's str. (9:04 pm)"""
+    if minutes == NO_EVENT:
+        return no_event
+    if minutes == NO_TIME:
+        return None
+    hour, minute = divmod(int(minutes), 60)
+    return f"{(hour % 12) or 12}:{minute:02d} {'am' if hour < 12 else 'pm'}"
+
+
+class MoonResult(NamedTuple):
+    """One lookup's result, as 4 ints. (No per-result strings at all)"""
+    phase: int
+    status: int
+    moonrise: int
+    moonset: int
+
+    @property
+    def phase_name(self):
+        """Example: "Full Moon" (or None)"""
+        return PHASES[self.phase] if self.phase != NO_PHASE else None
+
+    @property
+    def status_name(self):
+        """Example: "ok" or "invalid city" """
+        return STATUSES[self.status]
+
+    @property
+    def rise_time(self):
+        """The moonrise as a dt.time (or None)."""
+        return None if self.moonrise < 0 else dt.time(*divmod(self.moonrise,
+                                                              60))
+
+    @property
+    def set_time(self):
+        """The moonset as a dt.time (or None)."""
+        return None if self.moonset < 0 else dt.time(*divmod(self.moonset,
+                                                             60))
+
+    @classmethod
+    def from_output(cls, list_output: list):
+        """Make one out of date_check's ["moonrise","moonset","moon phase"].
+        """
+        moonrise, moonset, moon_phase = list_output
+        if moon_phase == "Invalid Date":
+            return cls(NO_PHASE, INVALID_DATE, NO_TIME, NO_TIME)
+
+        phase = PHASES.index(moon_phase) if moon_phase in PHASES \
+            else NO_PHASE
+        if [moonrise, moonset] == list(functions.NO_TABLE):
+            return cls(phase, INVALID_CITY, NO_TIME, NO_TIME)
+        return cls(phase, OK if phase != NO_PHASE else OUT_OF_RANGE,
+                   parse_clock(moonrise), parse_clock(moonset))
+
+    def to_output(self):
+        """date_check's ["moonrise","moonset","moon phase"] for it."""
+        if self.status == INVALID_DATE:
+            return ["Invalid Date"] * 3
+        moon_phase = self.phase_name or functions.OUT_OF_RANGE
+        if self.status == INVALID_CITY:
+            return [*functions.NO_TABLE, moon_phase]
+        return [format_minutes(self.moonrise, "No moonrise"),
+                format_minutes(self.moonset, "No moonset"), moon_phase]
+
+
+def moon_result(str_city: str, str_year: str, str_month: str, str_day: str,
+                offline: bool = False):
+    """Same as date_check, but gives a MoonResult."""
+    return MoonResult.from_output(functions.date_check(
+        str_city, str_year, str_month, str_day, offline=offline))
+
+
+class MoonResults:
+    """Lots of (city, date, MoonResult) rows, in one structured array.
+
+    Parameter
+    ---------
+    capacity : int
+        Rows to make room for up front. (It grows as needed)
+
+    Notes
+    -----
+    Each distinct city str is kept once, in .cities, & rows only keep
+    its index. (So up to MAX_CITIES distinct cities. append() raises a
+    ValueError for one more, rather than wrapping its index around)
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.rows = np.zeros(max(capacity, 1), dtype=ROW_DTYPE)
+        self.size = 0
+        self.cities = []
+        self._city_codes = {}
+
+    def _city_code(self, city: str):
+        code = self._city_codes.get(city)
+        if code is None:
+            if len(self.cities) >= MAX_CITIES:
+                raise ValueError(f"more than {MAX_CITIES} distinct cities "
+                                 f"(start a new MoonResults)")
+            code = self._city_codes[city] = len(self.cities)
+            self.cities.append(city)
+        return code
+
+    def append(self, city: str, date: (dt.date, str), result: MoonResult):
+        """Add one row. (date as a dt.date or "YYYY-MM-DD")"""
+        if self.size == len(self.rows):
+            self.rows = np.resize(self.rows, 2 * len(self.rows))
+        self.rows[self.size] = (np.datetime64(date, "D"),
+                                self._city_code(city), *result)
+        self.size += 1
+
+    def extend(self, rows):
+        """append() every (city, date, result) of an iterable."""
+        for city, date, result in rows:
+            self.append(city, date, result)
+
+    @property
+    def array(self):
+        """The filled rows, as a structured array. (A view, not a copy)"""
+        return self.rows[:self.size]
+
+    @property
+    def nbytes(self):
+        """Memory the filled rows use."""
+        return self.array.nbytes
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index: int):
+        """(city, date, MoonResult) of one row."""
+        row = self.array[index]
+        return (self.cities[row["city"]], row["date"].astype(dt.date),
+                MoonResult(int(row["phase"]), int(row["status"]),
+                           int(row["moonrise"]), int(row["moonset"])))
+
+    def __iter__(self):
+        return (self[index] for index in range(self.size))
+
+    def to_csv(self, path: str, chunk_size: int = 65536):
+        """Write every row as CSV, with names instead of codes.
+
+        Notes
+        -----
+        moonrise/moonset are written as HH:MM (24h), or blank if there's
+        none, & the rows are formatted chunk_size at a time, so 10M rows
+        never turn into 10M str at once.
+        """
+        phase_names = np.array(PHASES + ("",), dtype=object)
+        status_names = np.array(STATUSES, dtype=object)
+        cities = np.array(self.cities, dtype=object)
+
+        def clock_column(minutes):
+            text = np.char.add(np.char.zfill((minutes // 60).astype(str), 2),
+                               np.char.add(":", np.char.zfill(
+                                   (minutes % 60).astype(str), 2)))
+            return np.where(minutes >= 0, text, "")
+
+        with open(path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_HEADER)
+            for start in range(0, self.size, chunk_size):
+                chunk = self.array[start:start + chunk_size]
+                writer.writerows(zip(
+                    cities[chunk["city"]],
+                    np.datetime_as_string(chunk["date"], unit="D"),
+                    phase_names[chunk["phase"]],
+                    status_names[chunk["status"]],
+                    clock_column(chunk["moonrise"]),
+                    clock_column(chunk["moonset"])))
+
+    def to_arrow(self):
+        """The rows as a pyarrow.Table, with the city & phase & status as
+        dictionary columns. (Needs pyarrow)"""
+        import pyarrow as pa
+
+        array = self.array
+        return pa.table({
+            "city": pa.DictionaryArray.from_arrays(
+                pa.array(array["city"].astype(np.int32)),
+                pa.array(self.cities, pa.string())),
+            "date": pa.array(array["date"]),
+            "phase": pa.DictionaryArray.from_arrays(
+                pa.array(array["phase"], mask=array["phase"] < 0),
+                pa.array(PHASES, pa.string())),
+            "status": pa.DictionaryArray.from_arrays(
+                pa.array(array["status"]), pa.array(STATUSES, pa.string())),
+            "moonrise": pa.array(array["moonrise"],
+                                 mask=array["moonrise"] < 0),
+            "moonset": pa.array(array["moonset"], mask=array["moonset"] < 0),
+        })
+
+    def to_parquet(self, path: str):
+        """Write every row as Parquet. (Needs pyarrow)"""
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path)
@@ -0,0 +1,304 @@
+"""This contains the local HTTP/JSON service that answers moon lookups.
+
+Notes
+-----
+scripts/moon_service.py runs it. Every tool that wants moon data can ask
+this one process, instead of calling date_check with its own cold cache:
+(1) One MONTH_CACHE (& MONTH_STORE/PAGE_ARCHIVE, if they're on) & one
+    AsyncMoonClient (one pooled aiohttp session) for every client.
+(2) Lookups that need the same month page, from any number of requests,
+    share one download. POST /batch answers many queries in one request.
+(3) At most max_concurrent requests are answered at once & max_waiting
+    more wait their turn. Past that, it answers 503 right away, so a
+    flood can't pile up forever.
+The endpoints (GET, unless it says otherwise; dates are YYYY-MM-DD):
+    /phase?date=2020-05-12
+    /riseset?city=San Diego&date=2020-05-12
+    /range?city=San Diego&start=2020-05-01&end=2020-06-30
+    /compare?city=San Diego&city=Concord, CA&date=2020-05-12
+    POST /batch with {"queries": [{"city": ..., "date": ...}, ...]}
+    (Each answer says if its month table was "fresh" or "stale", since a
+    stale one is answered right away while it downloads again.)
+    /metrics (functions.METRICS, in the Prometheus text format)
+    /health
+1. MoonService
+2. make_app
+3. run_service
+"""
+import asyncio
+import datetime as dt
+
+import aiohttp
+from aiohttp import web
+
+try:
+    from . import functions
+    from .cli import parse_query
+    from .date_range import months_in_span
+    from .async_scraper import AsyncMoonClient, PageParseError
+except ImportError:
+    import functions
+    from cli import parse_query
+    from date_range import months_in_span
+    from async_scraper import AsyncMoonClient, PageParseError
+
+# The most a single request can ask for.
+MAX_RANGE_DAYS = 366
+MAX_CITIES = 50
+MAX_BATCH = 1000
+
+# Upstream failures (& pages that wouldn't parse), answered with a 502.
+UPSTREAM_ERRORS = (OSError, aiohttp.ClientError, asyncio.TimeoutError,
+                   PageParseError)
+
+
+class BadRequest(ValueError):
+    """Something about the request is wrong. (Answered with a 400)"""
+
+
+def parse_day(text: str, name: str = "date"):
+    """Get a dt.date out of a YYYY-MM-DD query parameter."""
+    try:
+        return dt.date.fromisoformat(str(text).strip())
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} isn't a YYYY-MM-DD date: {text!r}")
+
+
+def required(query, name: str):
+    """Get a query parameter that has to be there."""
+    value = query.get(name)
+    if value is None or not str(value).strip():
+        raise BadRequest(f"missing {name}")
+    return value
+
+
+class MoonService:
+    """The lookups behind every endpoint, sharing one client & limit.
+
+    Parameters
+    ----------
+    upstream_limit : int
+        The most month pages to be downloading at the same time.
+    max_concurrent : int
+        The most requests being answered at the same time.
+    max_waiting : int
+        The most requests waiting for their turn, past max_concurrent.
+    timeout : float
+        Seconds before giving up on a download.
+
+    Notes
+    -----
+    Use it as "async with MoonService() as service:" (make_app does).
+    """
+
+    def __init__(self, upstream_limit: int = 32, max_concurrent: int = 64,
+                 max_waiting: int = 256, timeout: float = 30.0):
+        self.client = AsyncMoonClient(limit=upstream_limit, timeout=timeout)
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.admitted = 0
+        self.served = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        await self.client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.__aexit__(*exc_info)
+
+    async def answer(self, city: str, date: dt.date):
+        """The moon phase, moonrise & moonset of one city & date, & whether
+        the month table was "fresh" or "stale"."""
+        month_rows, freshness = await self.client.month_lookup(
+            city, date.year, date.month)
+        if month_rows is None or date.day not in month_rows:
+            moonrise, moonset = functions.NO_TABLE
+        else:
+            moonrise, moonset = month_rows[date.day]
+        _, moon_phase = functions.check_date(date.year, date.month, date.day)
+        return {"city": city, "date": date.isoformat(), "phase": moon_phase,
+                "moonrise": moonrise, "moonset": moonset,
+                "freshness": freshness}
+
+    async def phase(self, query):
+        """GET /phase: the moon phase of a date. (Never downloads)"""
+        date = parse_day(required(query, "date"))
+        _, moon_phase = functions.check_date(date.year, date.month, date.day)
+        return {"date": date.isoformat(), "phase": moon_phase}
+
+    async def riseset(self, query):
+        """GET /riseset: the phase, moonrise & moonset of a city & date."""
+        return await self.answer(required(query, "city"),
+                                 parse_day(required(query, "date")))
+
+    async def range(self, query):
+        """GET /range: every day from start to end (both included)."""
+        city = required(query, "city")
+        start = parse_day(required(query, "start"), "start")
+        end = parse_day(required(query, "end"), "end")
+        if end < start or (end - start).days >= MAX_RANGE_DAYS:
+            raise BadRequest(f"start to end must be 1 to {MAX_RANGE_DAYS} "
+                             "days")
+
+        # Every month at the same time (each one is a single download).
+        months = months_in_span(start, end)
+        tables = dict(zip(months, await asyncio.gather(
+            *(self.client.month_table(city, *month) for month in months))))
+
+        days = []
+        date = start
+        while date <= end:
+            month_rows = tables[(date.year, date.month)]
+            if month_rows is None or date.day not in month_rows:
+                moonrise, moonset = functions.NO_TABLE
+            else:
+                moonrise, moonset = month_rows[date.day]
+            _, moon_phase = functions.check_date(date.year, date.month,
+                                                 date.day)
+            days.append({"date": date.isoformat(), "phase": moon_phase,
+                         "moonrise": moonrise, "moonset": moonset})
+            date += dt.timedelta(days=1)
+        return {"city": city, "days": days}
+
+    async def compare(self, query):
+        """GET /compare: one date, in every city=... of the query."""
+        cities = [city for city in query.getall("city", []) if city.strip()]
+        if not cities or len(cities) > MAX_CITIES:
+            raise BadRequest(f"give 1 to {MAX_CITIES} city parameters")
+        date = parse_day(required(query, "date"))
+        return {"date": date.isoformat(), "cities": await asyncio.gather(
+            *(self.answer(city, date) for city in cities))}
+
+    async def batch(self, body):
+        """POST /batch: many queries, answered in order.
+
+        Parameter
+        ---------
+        body : dict or list
+            {"queries": [...]} or just the list. Each query is a dict like
+            moon_cli.py's JSONL lines: {"city", "date"} (or "year",
+            "month", "day").
+
+        Returns
+        -------
+        answers : dict
+            {"answers": [...]}, with {"error"} for queries that couldn't
+            be read or looked up. (Like moon_cli.py)
+        """
+        queries = body.get("queries") if isinstance(body, dict) else body
+        if not isinstance(queries, list) or len(queries) > MAX_BATCH:
+            raise BadRequest(f"queries must be a list of up to {MAX_BATCH}")
+
+        async def one_answer(record):
+            try:
+                city, *date = parse_query(record)
+                date = dt.date(*map(int, date))
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                return {"error": f"bad query: {error}"}
+            try:
+                return await self.answer(city, date)
+            # Anything, so one query can't fail the whole batch.
+            except Exception as error:
+                return {"city": city, "date": date.isoformat(),
+                        "error": f"lookup failed: {error!r}"}
+
+        return {"answers": await asyncio.gather(*map(one_answer, queries))}
+
+    async def admit(self, lookup, *args):
+        """Run one request's lookup within the concurrency limit.
+
+        Returns
+        -------
+        status, body : int, dict
+            200 & the answer, or an error status & {"error"}. (500 for
+            an error that isn't the request's or the website's)
+        """
+        if self.admitted >= self.max_concurrent + self.max_waiting:
+            self.rejected += 1
+            return 503, {"error": "too many requests, try again soon"}
+
+        self.admitted += 1
+        try:
+            async with self._slots:
+                return 200, await lookup(*args)
+        except BadRequest as error:
+            return 400, {"error": str(error)}
+        except UPSTREAM_ERRORS as error:
+            return 502, {"error": f"lookup failed: {error!r}"}
+        except Exception as error:
+            return 500, {"error": f"internal error: {error!r}"}
+        finally:
+            self.admitted -= 1
+            self.served += 1
+
+
+# Where make_app keeps the app's MoonService. (app[SERVICE_KEY])
+SERVICE_KEY = web.AppKey("service", MoonService)
+
+
+def make_app(service: MoonService = None):
+    """The aiohttp web.Application with every endpoint of the service.
+
+    Parameter
+    ---------
+    service : MoonService
+        (A new MoonService() by default) It's opened & closed along with
+        the app.
+    """
+    service = service or MoonService()
+    app = web.Application()
+    app[SERVICE_KEY] = service
+
+    def endpoint(lookup, from_body: bool = False):
+        async def handle(request):
+            if from_body:
+                try:
+                    argument = await request.json()
+                except (ValueError, UnicodeDecodeError):
+                    return web.json_response({"error": "body isn't JSON"},
+                                             status=400)
+            else:
+                argument = request.query
+            status, body = await service.admit(lookup, argument)
+            return web.json_response(body, status=status)
+        return handle
+
+    async def metrics_page(request):
+        if functions.METRICS is None:
+            return web.Response(status=404, text="metrics are off\n")
+        return web.Response(text=functions.METRICS.prometheus_text(),
+                            content_type="text/plain")
+
+    async def health(request):
+        return web.json_response({"status": "ok",
+                                  "in_flight": service.admitted,
+                                  "served": service.served,
+                                  "rejected": service.rejected,
+                                  "cached_months": len(functions.MONTH_CACHE)})
+
+    app.router.add_get("/phase", endpoint(service.phase))
+    app.router.add_get("/riseset", endpoint(service.riseset))
+    app.router.add_get("/range", endpoint(service.range))
+    app.router.add_get("/compare", endpoint(service.compare))
+    app.router.add_post("/batch", endpoint(service.batch, from_body=True))
+    app.router.add_get("/metrics", metrics_page)
+    app.router.add_get("/health", health)
+
+    async def open_service(app):
+        await service.__aenter__()
+
+    async def close_service(app):
+        await service.__aexit__(None, None, None)
+
+    app.on_startup.append(open_service)
+    app.on_cleanup.append(close_service)
+    return app
+
+
+def run_service(host: str = "127.0.0.1", port: int = 8080, **settings):
+    """Serve until stopped (Ctrl+C). settings go to MoonService."""
+    web.run_app(make_app(MoonService(**settings)), host=host, port=port,
+                print=lambda text: print(text.splitlines()[0]))
+
@@ -0,0 +1,197 @@
+"""This contains tests for the precomputed, mmapped almanac.
+
+Notes
+-----
+These run offline: transport.fetch is swapped for a fake that serves the
+synthetic pages in fixtures/synthetic_pages & records every link.
+"""
+import os
+import types
+import asyncio
+import datetime as dt
+import multiprocessing
+
+import pytest
+
+import functions
+from almanac import HEADER, RECORD, Almanac, UpstreamError, build_almanac
+from month_cache import FRESH, MISSING, MonthCache
+from results import INVALID_DATE
+from compare import compare_cities
+from date_range import moon_range
+
+CITIES = ["San Diego", "Hyrule", "SAN DIEGO", "Concord"]
+
+
+@pytest.fixture
+def almanac_path(fetches, tmp_path, loose_cities):
+    """An almanac of CITIES, from Dec 20th, 2005 to July 31st, 2006."""
+    path = str(tmp_path / "test.almanac")
+    slugs = build_almanac(path, CITIES, dt.date(2005, 12, 20),
+                          dt.date(2006, 7, 31))
+    assert slugs == ["san-diego", "hyrule", "concord"]
+    # 3 cities x 8 months, each downloaded once.
+    assert len(fetches) == 24
+    return path
+
+
+def test_file_is_fixed_width(almanac_path):
+    """Asserts if the file is exactly header + index + a record a day."""
+    days = (dt.date(2006, 7, 31) - dt.date(2005, 12, 20)).days + 1
+    assert os.path.getsize(almanac_path) == \
+        HEADER.size + 3 * len("san-diego") + 3 * days * RECORD.size
+
+
+def test_lookups_match_date_check(almanac_path, fetches):
+    """Asserts if every saved day is what date_check gives."""
+    with Almanac(almanac_path) as almanac:
+        assert almanac.cities == ["san-diego", "hyrule", "concord"]
+        assert almanac.first_date == dt.date(2005, 12, 20)
+        assert almanac.last_date == dt.date(2006, 7, 31)
+        for city in ("San Diego", "san diego", "Hyrule"):
+            for year, month, day in ((2005, 12, 20), (2006, 1, 7),
+                                     (2006, 7, 16), (2006, 7, 31)):
+                result = almanac.lookup(city, year, month, day)
+                assert result.to_output() == functions.date_check(
+                    city, str(year), str(month), str(day))
+
+        assert almanac.lookup("Chicago", 2006, 1, 7) is None
+        assert almanac.lookup("San Diego", 2005, 12, 19) is None
+        assert almanac.lookup("San Diego", 2006, 8, 1) is None
+        assert almanac.lookup("San Diego", 2006, 2, 30).status == \
+            INVALID_DATE
+
+
+def test_moon_scraper_uses_almanac(almanac_path, fetches, monkeypatch):
+    """Asserts if ALMANAC answers without fetching, & falls back to
+    scraping for what it doesn't have."""
+    expected = functions.moon_scraper("San Diego", 2006, 1, 7)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    fetches.clear()
+
+    with Almanac(almanac_path) as almanac:
+        monkeypatch.setattr(functions, "ALMANAC", almanac)
+        assert functions.moon_scraper("San Diego", "2006", "1", "7") == \
+            expected
+        assert fetches == []
+        functions.moon_scraper("San Diego", 2020, 5, 12)
+        assert len(fetches) == 1
+
+
+def test_every_lookup_uses_almanac(almanac_path, fetches, monkeypatch):
+    """Asserts if month lookups, date ranges, compare, the async client &
+    the service all answer from ALMANAC, without any download."""
+    from async_scraper import run_date_checks
+    from service import MoonService
+
+    first, last = dt.date(2005, 12, 20), dt.date(2006, 2, 28)
+    expected_range = list(moon_range("San Diego", first, last))
+    expected_compare = compare_cities(CITIES, "2006", "1", "7")
+    expected_check = functions.date_check("Concord", "2006", "3", "9")
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    fetches.clear()
+
+    with Almanac(almanac_path) as almanac:
+        monkeypatch.setattr(functions, "ALMANAC", almanac)
+        assert functions.lookup_month_table(("san-diego", 2006, 1)) == \
+            (functions.month_table("San Diego", 2006, 1), FRESH)
+        assert functions.month_table("Hyrule", 2006, 1) is None
+        # December 2005 is only half in it, so it isn't answered from it.
+        assert almanac.month_table(("san-diego", 2005, 12)) is MISSING
+        assert almanac.month_table(("chicago", 2006, 1)) is MISSING
+
+        monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+        assert list(moon_range("San Diego", dt.date(2006, 1, 1), last)) == \
+            expected_range[12:]
+        assert compare_cities(CITIES, "2006", "1", "7") == expected_compare
+        assert run_date_checks([("Concord", "2006", "3", "9")]) == \
+            [expected_check]
+
+        async def answer():
+            async with MoonService() as service:
+                return await service.answer("San Diego", dt.date(2006, 1, 7))
+
+        answer = asyncio.run(answer())
+        assert [answer["moonrise"], answer["moonset"], answer["phase"]] == \
+            functions.date_check("San Diego", "2006", "1", "7")
+        assert fetches == []
+        assert len(functions.MONTH_CACHE) == 0
+
+
+def test_city_is_canonical_first(almanac_path, fetches):
+    """Asserts if a city is looked up as canonical_city has it, so the
+    almanac's "concord" is never given for "Concord, CA"."""
+    with Almanac(almanac_path) as almanac:
+        assert almanac.city_number("Concord") == \
+            almanac.city_number("concord") == 2
+        assert almanac.city_number("SAN-DIEGO") == 0
+        assert almanac.city_number("Concord, CA") is None
+        assert almanac.lookup("concord-ca", 2006, 1, 7) is None
+
+
+def lookup_in_child(path: str, queue):
+    """Open the almanac in another process & send back one lookup."""
+    with Almanac(path) as almanac:
+        queue.put(tuple(almanac.lookup("San Diego", 2006, 1, 7)))
+
+
+def test_shared_across_processes(almanac_path):
+    """Asserts if another process reads the same file, & replacing it
+    doesn't break an almanac that's already open."""
+    with Almanac(almanac_path) as almanac:
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        child = context.Process(target=lookup_in_child,
+                                args=(almanac_path, queue))
+        child.start()
+        assert queue.get(timeout=30) == \
+            tuple(almanac.lookup("San Diego", 2006, 1, 7))
+        child.join(30)
+
+        build_almanac(almanac_path, ["Concord"], dt.date(2022, 6, 1),
+                      dt.date(2022, 6, 30))
+        assert almanac.lookup("San Diego", 2006, 1, 7) is not None
+    with Almanac(almanac_path) as almanac:
+        assert almanac.cities == ["concord"]
+
+
+def test_bad_input(tmp_path, fetches, monkeypatch):
+    """Asserts if no cities, invalid cities & other files are refused."""
+    path = str(tmp_path / "bad.almanac")
+    with pytest.raises(ValueError):
+        build_almanac(path, [], dt.date(2006, 1, 1), dt.date(2006, 1, 2))
+    monkeypatch.setattr(functions, "STRICT_CITIES", True)
+    with pytest.raises(ValueError):
+        build_almanac(path, ["Hyrule"], dt.date(2006, 1, 1),
+                      dt.date(2006, 1, 2))
+
+    with open(path, "wb") as other_file:
+        other_file.write(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Almanac(path)
+
+
+def test_upstream_errors_are_not_saved(tmp_path, fetches, monkeypatch):
+    """Asserts if a 503 stops the build, without saving the almanac or an
+    "invalid city" for that month, & a later build works."""
+    path = str(tmp_path / "retry.almanac")
+    saved_fetch = functions.fetch
+
+    def unavailable_fetch(link, **_):
+        if "concord" in link:
+            return types.SimpleNamespace(status_code=503, content=b"")
+        return saved_fetch(link)
+
+    monkeypatch.setattr(functions, "fetch", unavailable_fetch)
+    with pytest.raises(UpstreamError):
+        build_almanac(path, ["San Diego", "Concord"], dt.date(2022, 6, 1),
+                      dt.date(2022, 6, 30), workers=1)
+    assert os.listdir(tmp_path) == []
+    assert functions.cached_month_table(("concord", 2022, 6)) is MISSING
+
+    monkeypatch.setattr(functions, "fetch", saved_fetch)
+    build_almanac(path, ["San Diego", "Concord"], dt.date(2022, 6, 1),
+                  dt.date(2022, 6, 30))
+    with Almanac(path) as almanac:
+        assert almanac.lookup("Concord", 2022, 6, 1).to_output() == \
+            functions.date_check("Concord", "2022", "6", "1")
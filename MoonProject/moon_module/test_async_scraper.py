@@ -0,0 +1,122 @@
+"""This contains tests for the asyncio versions of moon_scraper & date_check.
+
+Notes
+-----
+These run against serve_pages, a local stand-in for the website that
+serves the synthetic pages in fixtures/synthetic_pages, so no internet
+is needed.
+"""
+import asyncio
+import threading
+
+import pytest
+
+import functions
+from functions import date_check
+from fixture_pages import serve_pages
+from month_cache import MonthCache
+from month_store import MonthStore
+from page_archive import PageArchive
+from async_scraper import AsyncMoonClient, run_date_checks
+
+QUERIES = [
+    ("San Diego", "2000", "1", "5"),
+    ("San Diego", "2000", "1", "6"),
+    ("San Diego", "2020", "05", "12"),
+    ("San Diego", "10000", "5", "12"),
+    ("San Diegooo", "2020", "5", "12"),
+    ("Sacr@amen@to", "2016", "1", "12"),
+    ("Concord", "2022", "6", "8"),
+    ("ChIcAgO", "2019", "4", "10"),
+    ("SeaTTle", "2013", "10", "11"),
+    ("DaLLas", "2010", "12", "27"),
+    ("PHO!!enix", "2027", "7", "27"),
+]
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Point the scrapers at a stand-in server, with a cold cache."""
+    with serve_pages(latency=0.02) as server:
+        monkeypatch.setattr(functions, "BASE_URL", server.base_url)
+        monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+        yield server
+
+
+def test_run_date_checks_outputs(stand_in):
+    """Asserts if the async outputs are the same as test_date_check's."""
+    outputs = run_date_checks(QUERIES)
+
+    assert outputs[0] == ["5:54 am", "4:21 pm", "New Moon"]
+    assert outputs[1] == ["6:44 am", "5:10 pm", "New Moon"]
+    assert outputs[2] == ["12:23 am", "10:38 am", "Waning Gibbous"]
+    assert outputs[3] == ["Invalid Date", "Invalid Date", "Invalid Date"]
+    assert outputs[4] == ["Invalid City Name OR",
+                          "No Moonrise/set time exists", "Waning Gibbous"]
+    assert outputs[5][:2] == ["9:04 am", "8:24 pm"]
+    assert outputs[7][:2] == ["9:47 am", "No moonset"]
+    assert outputs[10][:2] == ["No moonrise", "2:10 pm"]
+
+
+def test_run_date_checks_matches_date_check(stand_in, monkeypatch):
+    """Asserts if every output is the same as the sync date_check's."""
+    async_outputs = run_date_checks(QUERIES)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+
+    assert async_outputs == [date_check(*query) for query in QUERIES]
+
+
+def test_async_limit_and_shared_downloads(stand_in, loose_cities):
+    """Asserts if the limit holds & one month is only downloaded once."""
+    queries = [("San Diego", "2006", "1", str(day)) for day in range(1, 32)]
+    queries += [(f"Nowhere {count}", "2020", "1", "1") for count in range(12)]
+
+    outputs = run_date_checks(queries, limit=4)
+
+    assert outputs[6] == ["11:55 am", "12:35 am", "First Quarter"]
+    assert stand_in.request_count == 13
+    assert stand_in.peak_in_flight <= 4
+
+
+def test_async_client_moon_scraper(stand_in):
+    """Asserts if the client's moon_scraper works on its own too."""
+    async def scrape():
+        async with AsyncMoonClient(limit=2) as client:
+            return await asyncio.gather(
+                client.moon_scraper("Hyrule", 2014, 2, 5),
+                client.moon_scraper("San Diego", 2006, 7, 16))
+
+    assert asyncio.run(scrape()) == [
+        ["Invalid City Name OR", "No Moonrise/set time exists"],
+        ["11:50 pm", "12:02 pm"]]
+
+
+def test_store_and_archive_stay_off_the_loop(stand_in, tmp_path,
+                                             monkeypatch):
+    """Asserts if MONTH_STORE, PAGE_ARCHIVE & the parsing are only used
+    from the executor's threads, never from the event loop's."""
+    expected = [date_check(*query) for query in QUERIES[:4]]
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    threads = []
+
+    def watched(method):
+        def call(*args):
+            threads.append((method.__name__, threading.current_thread()))
+            return method(*args)
+        return call
+
+    store = MonthStore(str(tmp_path / "months.db"))
+    store.lookup, store.put = watched(store.lookup), watched(store.put)
+    archive = PageArchive(str(tmp_path / "pages.zip"), "record")
+    archive.record = watched(archive.record)
+    monkeypatch.setattr(functions, "MONTH_STORE", store)
+    monkeypatch.setattr(functions, "PAGE_ARCHIVE", archive)
+    monkeypatch.setattr(functions, "parse_moon_table",
+                        watched(functions.parse_moon_table))
+
+    assert run_date_checks(QUERIES[:4]) == expected
+    assert {name for name, _ in threads} == {"lookup", "record",
+                                              "parse_moon_table", "put"}
+    assert threading.main_thread() not in {thread for _, thread in threads}
+    archive.close()
+    store.close()
@@ -0,0 +1,160 @@
+"""This contains tests for the batch (vectorized) moon phase math.
+
+Notes
+-----
+The batch functions are only worth anything if they agree with the
+scalar ones, so every test here compares against dic_calculator,
+dic_interpreter or check_date rather than against hard-coded answers.
+"""
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from functions import check_date, dic_calculator, dic_interpreter
+from batch_phase import (CHUNKS_PER_WORKER, MAX_CHUNK_DAYS, NO_PHASE,
+                         PHASE_LABELS, dates_to_ymd, iter_phase_chunks,
+                         batch_dic_interpreter, batch_dic_calculator,
+                         batch_phase_meeus, batch_phase_on)
+
+
+def every_day(start: dt.date, end: dt.date):
+    """Build a datetime64[D] array of every day in [start, end]."""
+    return np.arange(np.datetime64(start), np.datetime64(end) + 1,
+                     dtype="datetime64[D]")
+
+
+def test_dates_to_ymd():
+    """Asserts if datetime64 dates split into the right year/month/day."""
+    dates = np.array(["2000-01-06", "2020-02-29", "2100-12-31"],
+                     dtype="datetime64[D]")
+    years, months, days = dates_to_ymd(dates)
+
+    assert years.tolist() == [2000, 2020, 2100]
+    assert months.tolist() == [1, 2, 12]
+    assert days.tolist() == [6, 29, 31]
+
+
+def test_batch_dic_interpreter_boundaries():
+    """Asserts if every threshold lands on the same side as dic_interpreter.
+
+    Notes
+    -----
+    Checks right on, just under & just over each threshold.
+    """
+    thresholds = [2.03, 6.01, 9.27, 13.55, 16.68, 21.00, 24.07, 28.68]
+    values = [0.0, 29.53]
+    for threshold in thresholds:
+        values += [np.nextafter(threshold, 0), threshold,
+                   np.nextafter(threshold, 30)]
+
+    codes = batch_dic_interpreter(values)
+
+    for value, code in zip(values, codes):
+        assert PHASE_LABELS[code] == dic_interpreter(value)
+
+
+def test_batch_dic_calculator_2000_2100():
+    """Asserts if the batch phases equal dic_calculator from 2000 to 2100."""
+    dates = every_day(dt.date(2000, 1, 6), dt.date(2100, 12, 31))
+    _, _, codes = batch_dic_calculator(dates)
+    labels = np.array(PHASE_LABELS)[codes]
+
+    for date, label in zip(dates.tolist(), labels):
+        assert label == dic_calculator(date.year, date.month, date.day)
+
+
+def test_batch_dic_calculator_refuses_before_2000():
+    """Asserts if a day dic_calculator can't do is refused, not guessed."""
+    with pytest.raises(ValueError):
+        batch_dic_calculator(every_day(dt.date(2000, 1, 5),
+                                       dt.date(2000, 1, 6)))
+    with pytest.raises(ValueError):
+        batch_dic_calculator([1999], [12], [31])
+
+
+def test_batch_phase_on_1900_2100():
+    """Asserts if the batch phases equal check_date from 1900 to 2100, &
+    every day outside of that has NO_PHASE."""
+    dates = every_day(dt.date(1899, 12, 1), dt.date(2101, 1, 31))
+    codes = batch_phase_on(dates)
+    assert codes.shape == dates.shape
+
+    for date, code in zip(dates.tolist(), codes.tolist()):
+        _, moon_phase = check_date(date.year, date.month, date.day)
+        if dt.date(1900, 1, 1) <= date <= dt.date(2100, 12, 31):
+            assert PHASE_LABELS[code] == moon_phase
+        else:
+            assert code == NO_PHASE
+
+
+def test_batch_phase_meeus_any_year():
+    """Asserts if it's batch_phase_on from 1900 to 2100, & far from that,
+    the phases still go round in order, with a new moon every ~29.53
+    days."""
+    dates = every_day(dt.date(1900, 1, 1), dt.date(2100, 12, 31))
+    assert np.array_equal(batch_phase_meeus(dates), batch_phase_on(dates))
+
+    for first_year in (1, 1000, 9000):
+        dates = every_day(dt.date(first_year, 1, 1),
+                          dt.date(first_year + 99, 12, 31))
+        codes = batch_phase_meeus(dates)
+        steps = np.diff(codes) % len(PHASE_LABELS)
+        assert set(steps.tolist()) == {0, 1}
+        new_moons = np.flatnonzero((steps == 1) & (codes[1:] == 0))
+        assert np.mean(np.diff(new_moons)) == pytest.approx(29.53, abs=0.01)
+
+
+def test_batch_dic_calculator_int_arrays():
+    """Asserts if integer year/month/day arrays give the same output."""
+    dates = every_day(dt.date(2020, 1, 1), dt.date(2020, 12, 31))
+    from_dates = batch_dic_calculator(dates)
+    from_ints = batch_dic_calculator(*dates_to_ymd(dates))
+
+    for date_output, int_output in zip(from_dates, from_ints):
+        assert np.array_equal(date_output, int_output)
+
+
+def test_iter_phase_chunks_matches_one_batch():
+    """Asserts if the chunks, put together, are check_date's phases of the
+    whole span, in order, with or without a process pool."""
+    dates = every_day(dt.date(1900, 1, 1), dt.date(1919, 12, 28))
+    codes = batch_phase_on(dates)
+    assert [PHASE_LABELS[code] for code in codes[:30:7]] == \
+        [check_date(1900, 1, day)[1] for day in range(1, 30, 7)]
+
+    for workers in (1, 2):
+        chunks = list(iter_phase_chunks("1900-01-01", dt.date(1919, 12, 28),
+                                        chunk_days=1000, workers=workers,
+                                        max_pending=3))
+        assert [len(chunk.dates) for chunk in chunks] == \
+            [1000] * 7 + [len(dates) - 7000]
+        assert np.array_equal(np.concatenate([chunk.dates
+                                              for chunk in chunks]), dates)
+        assert np.array_equal(np.concatenate([chunk.phase_codes
+                                              for chunk in chunks]), codes)
+
+
+def test_iter_phase_chunks_default_size():
+    """Asserts if every worker gets several chunks by default, & a chunk
+    is never longer than MAX_CHUNK_DAYS."""
+    chunks = list(iter_phase_chunks("1900-01-01", "1999-12-31", workers=4))
+    assert len(chunks) == CHUNKS_PER_WORKER * 4
+    assert sum(len(chunk.dates) for chunk in chunks) == 36524
+
+    chunks = iter_phase_chunks("0001-01-01", "9999-12-31", workers=2)
+    assert len(next(chunks).dates) == MAX_CHUNK_DAYS
+    chunks.close()
+
+
+def test_iter_phase_chunks_stops_early():
+    """Asserts if breaking out early is fine, & bad settings are refused."""
+    for chunk in iter_phase_chunks("1900-01-01", "2100-12-31",
+                                   chunk_days=10, workers=2):
+        assert chunk.dates[0] == np.datetime64("1900-01-01")
+        break
+
+    for settings in ({"chunk_days": 0}, {"workers": 0}):
+        with pytest.raises(ValueError):
+            next(iter_phase_chunks("2000-01-01", "2000-01-02", **settings))
+    assert list(iter_phase_chunks("2000-01-02", "2000-01-01")) == []
@@ -0,0 +1,138 @@
+"""This contains tests for the headless command line (moon_module/cli.py).
+
+Notes
+-----
+Scraping is pointed at the synthetic pages (the fetches fixture, in
+conftest.py), so these run offline.
+"""
+import io
+import json
+import itertools
+import tracemalloc
+
+import functions
+from cli import answer_query, main, read_queries, stream_answers
+
+
+def test_read_queries_formats():
+    """Asserts if CSV (with/without a header) & JSONL all read the same."""
+    with_header = io.StringIO("city,year,month,day\nSan Diego,2020,5,12\n")
+    no_header = io.StringIO("San Diego,2020,5,12\n\n")
+    date_column = io.StringIO("San Diego,2020-05-12\n")
+    jsonl = io.StringIO('{"city": "San Diego", "date": "2020-05-12"}\n')
+
+    expected = {"city": "San Diego", "year": "2020", "month": "5",
+                "day": "12"}
+    assert list(read_queries(with_header)) == [expected]
+    assert list(read_queries(no_header)) == [expected]
+    assert list(read_queries(date_column)) == [{"city": "San Diego",
+                                                "date": "2020-05-12"}]
+    assert list(read_queries(jsonl)) == [
+        '{"city": "San Diego", "date": "2020-05-12"}\n']
+    assert list(read_queries(io.StringIO(""))) == []
+
+
+def test_answer_query(fetches):
+    """Asserts if answers match date_check, & bad queries don't crash."""
+    assert answer_query({"city": "San Diego", "date": "2020-05-12"}) == {
+        "city": "San Diego", "date": "2020-05-12", "phase": "Waning Gibbous",
+        "moonrise": "12:23 am", "moonset": "10:38 am"}
+    assert (answer_query('{"city": "X", "date": "2020-13-12"}')["moonrise"]
+            == "Invalid Date")
+    assert "error" in answer_query("{not json")
+    assert "error" in answer_query({"city": "San Diego", "date": "2020"})
+    for city in ('"city": "", ', '"city": "  ", ', ""):
+        assert answer_query(f'{{{city}"date": "2020-05-12"}}') == {
+            "error": "bad query: no city"}
+    assert fetches == [functions.month_link("san-diego", 2020, 5)]
+    assert answer_query({"date": "2020-05-12"}, "phase")["phase"] == \
+        "Waning Gibbous"
+
+
+def test_any_error_is_one_line(fetches, monkeypatch):
+    """Asserts if a lookup that fails in an unexpected way only costs its
+    own line, & every other line is still answered."""
+    def broken_parse(content):
+        raise AttributeError("unexpected page")
+
+    monkeypatch.setattr(functions, "parse_moon_table", broken_parse)
+    stdout = io.StringIO()
+    assert main(["--workers", "2"], stdin=io.StringIO(
+        "San Diego,2020,5,12\nSan Diego,2020,13,1\n"), stdout=stdout) == 0
+    answers = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert answers[0] == {"city": "San Diego", "date": "2020-05-12",
+                          "error": "lookup failed: unexpected page"}
+    assert answers[1]["moonrise"] == "Invalid Date"
+
+
+def test_phase_only_never_fetches(fetches):
+    """Asserts if --phase-only answers without any fetch."""
+    out = io.StringIO()
+    main(["--phase-only"], stdin=io.StringIO("San Diego,2020,5,12\n"
+                                             "Hyrule,1950,6,1\n"),
+         stdout=out)
+
+    answers = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert answers == [
+        {"city": "San Diego", "date": "2020-05-12", "phase": "Waning Gibbous"},
+        {"city": "Hyrule", "date": "1950-06-01", "phase": "Full Moon"}]
+    assert fetches == []
+
+
+def test_main_keeps_order_with_a_pool(fetches):
+    """Asserts if a thread pool still gives the answers in input order."""
+    queries = ["San Diego,2006,1,7", "Sacramento,2016,1,12",
+               "Chicago,2019,4,10", "Concord,2022,6,8"] * 5
+    out = io.StringIO()
+    main(["--workers", "4"], stdin=io.StringIO("\n".join(queries)),
+         stdout=out)
+
+    answers = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [answer["moonrise"] for answer in answers[:4]] == [
+        "11:55 am", "9:04 am", "9:47 am", "1:37 pm"]
+    assert answers[4:] == answers[:4] * 4
+
+
+def test_process_pool():
+    """Asserts if a process pool gives the same answers as no pool."""
+    records = [{"city": "Dallas", "year": "2010", "month": "12",
+                "day": str(day)} for day in range(1, 32)]
+
+    assert (list(stream_answers(records, "phase", workers=2,
+                                executor="process", chunk_size=8))
+            == list(stream_answers(records, "phase", workers=0)))
+
+
+def test_reads_ahead_only_max_in_flight():
+    """Asserts if the pool only pulls a bounded number of queries ahead."""
+    pulled = itertools.count()
+
+    def endless_queries():
+        while True:
+            next(pulled)
+            yield {"city": "", "date": "2020-05-12"}
+
+    answers = stream_answers(endless_queries(), "phase", workers=2,
+                             max_in_flight=3, chunk_size=10)
+    list(itertools.islice(answers, 5))
+    answers.close()
+
+    # 3 chunks of 10 in the pool, & 1 being read when the 1st came back.
+    assert next(pulled) <= 4 * 10 + 1
+
+
+def test_constant_memory():
+    """Asserts if 20,000 queries stream through in flat memory."""
+    records = ({"city": "San Diego", "year": "2020", "month": "5",
+                "day": str(count % 28 + 1)} for count in range(20_000))
+
+    tracemalloc.start()
+    for count, _ in enumerate(stream_answers(records, "phase", workers=0,
+                                             chunk_size=64)):
+        if count == 1000:
+            tracemalloc.reset_peak()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert count == 19_999
+    assert peak < 256 * 1024
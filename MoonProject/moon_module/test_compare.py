@@ -0,0 +1,83 @@
+"""This contains tests for comparing one date across many cities.
+
+Notes
+-----
+These run offline, with the synthetic pages in fixtures/synthetic_pages:
+either from a fake transport.fetch, or from serve_pages (a local
+stand-in for the website, that can be made slow on purpose).
+"""
+import time
+import types
+
+import functions
+from compare import Comparison, compare_cities, distinct_cities
+from fixture_pages import page_for_link, serve_pages
+from month_cache import MonthCache
+
+
+def test_distinct_cities():
+    """Asserts if spellings of the same city share one lookup."""
+    slugs, lookups = distinct_cities(["San Diego", "SAN DIEGO", "Chicago"])
+    assert slugs == ["san-diego", "san-diego", "chicago"]
+    assert lookups == {"san-diego": "San Diego", "chicago": "Chicago"}
+
+
+def test_compare_matches_date_check(fetches, loose_cities):
+    """Asserts if every row is what date_check gives, with one fetch per
+    distinct city & one phase."""
+    cities = ["San Diego", "Hyrule", "san diego", "Sacr@amen@to"]
+    comparison = compare_cities(cities, "2006", "1", "7")
+    assert len(fetches) == 3
+
+    assert comparison.date == (2006, 1, 7)
+    assert comparison.phase == functions.check_date("2006", "1", "7")[1]
+    for city, row in zip(cities, comparison.rows):
+        assert row.city == city and row.error is None
+        assert [row.moonrise, row.moonset, comparison.phase] == \
+            functions.date_check(city, "2006", "1", "7")
+    assert len(fetches) == 3
+    assert comparison.table()[1] == ["San Diego", "11:55 am", "12:35 am"]
+
+
+def test_compare_invalid_date(fetches):
+    """Asserts if an invalid date needs no fetch at all."""
+    comparison = compare_cities(["San Diego", "Chicago"], "2020", "2", "30")
+    assert comparison.date is None
+    assert [row.moonrise for row in comparison.rows] == ["Invalid Date"] * 2
+    assert fetches == []
+
+
+def test_compare_keeps_errors_per_city(monkeypatch):
+    """Asserts if one city that can't be downloaded doesn't sink the rest."""
+    def flaky_fetch(link, **_):
+        if "chicago" in link:
+            raise ConnectionError("no internet")
+        status, content = page_for_link(link)
+        return types.SimpleNamespace(status_code=status, content=content)
+
+    monkeypatch.setattr(functions, "fetch", flaky_fetch)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    comparison = compare_cities(["Chicago", "San Diego"], "2006", "1", "7")
+    assert comparison.rows[0].error.startswith("ConnectionError")
+    assert comparison.rows[1][2:] == ("11:55 am", "12:35 am", None)
+    assert comparison.table()[1][1] == "Couldn't reach the website"
+
+
+def test_compare_is_about_one_fetch_long(monkeypatch):
+    """Asserts if N cities take about as long as one slow download."""
+    latency = 0.3
+    cities = ["San Diego", "Chicago", "Seattle", "Dallas", "Phoenix",
+              "Concord", "Sacramento", "Denver"]
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    # Only the downloads are timed, not BeautifulSoup parsing 8 pages.
+    monkeypatch.setattr(functions, "FAST_TABLE", True)
+    with serve_pages(latency=latency) as server:
+        monkeypatch.setattr(functions, "BASE_URL", server.base_url)
+        start = time.perf_counter()
+        comparison = compare_cities(cities, "2006", "1", "7")
+        seconds = time.perf_counter() - start
+
+    assert isinstance(comparison, Comparison)
+    assert server.request_count == len(cities)
+    assert server.peak_in_flight == len(cities)
+    assert seconds < 2 * latency < len(cities) * latency
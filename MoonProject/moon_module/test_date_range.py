@@ -0,0 +1,88 @@
+"""This contains tests for the moonrise/moonset lookup over a span of dates.
+
+Notes
+-----
+These run offline: transport.fetch is swapped for a slow fake that
+serves the synthetic pages in fixtures/synthetic_pages & records how
+many fetches overlap.
+"""
+import time
+import types
+import threading
+import datetime as dt
+
+import pytest
+
+import functions
+from functions import moon_scraper
+from fixture_pages import page_for_link
+from month_cache import MonthCache
+from date_range import months_in_span, moon_range
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Serve synthetic pages slowly, & record every link & the peak overlap."""
+    record = {"links": [], "in_flight": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_fetch(link, **_):
+        with lock:
+            record["links"].append(link)
+            record["in_flight"] += 1
+            record["peak"] = max(record["peak"], record["in_flight"])
+        time.sleep(0.05)
+        with lock:
+            record["in_flight"] -= 1
+        status, content = page_for_link(link)
+        return types.SimpleNamespace(status_code=status, content=content)
+
+    monkeypatch.setattr(functions, "fetch", fake_fetch)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    return record
+
+
+def test_months_in_span():
+    """Asserts if the distinct months are found, across a new year too."""
+    assert (months_in_span(dt.date(2020, 11, 30), dt.date(2021, 2, 1))
+            == [(2020, 11), (2020, 12), (2021, 1), (2021, 2)])
+    assert months_in_span(dt.date(2020, 5, 1), dt.date(2020, 5, 31)) == [
+        (2020, 5)]
+    assert months_in_span(dt.date(2020, 5, 2), dt.date(2020, 5, 1)) == []
+
+
+def test_moon_range_one_year(fetches):
+    """Asserts if a year of days costs 12 overlapping fetches, in order."""
+    days = list(moon_range("San Diego", dt.date(2006, 1, 1),
+                           dt.date(2006, 12, 31), max_workers=4))
+
+    assert len(fetches["links"]) == 12
+    assert 1 < fetches["peak"] <= 4
+    assert [date for date, _ in days] == [
+        dt.date(2006, 1, 1) + dt.timedelta(days=count) for count in range(365)]
+    assert days[6] == (dt.date(2006, 1, 7), ["11:55 am", "12:35 am"])
+    assert days[196] == (dt.date(2006, 7, 16), ["11:50 pm", "12:02 pm"])
+    # No synthetic page for February, so it looks like an invalid city.
+    assert days[40][1] == ["Invalid City Name OR",
+                           "No Moonrise/set time exists"]
+
+
+def test_moon_range_matches_moon_scraper(fetches):
+    """Asserts if every day matches what moon_scraper gives for it."""
+    days = list(moon_range("Sacramento", dt.date(2016, 1, 10),
+                           dt.date(2016, 1, 20)))
+
+    assert len(days) == 11
+    for date, moon_outputs in days:
+        assert moon_outputs == moon_scraper("Sacramento", date.year,
+                                            date.month, date.day)
+    assert len(fetches["links"]) == 1
+
+
+def test_moon_range_stops_early(fetches):
+    """Asserts if stopping the generator early doesn't raise or hang."""
+    days = moon_range("San Diego", dt.date(2006, 1, 1), dt.date(2006, 12, 31),
+                      max_workers=1)
+    assert next(days)[0] == dt.date(2006, 1, 1)
+    days.close()
+    assert len(fetches["links"]) < 12
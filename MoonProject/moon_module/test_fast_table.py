@@ -0,0 +1,152 @@
+"""This contains tests for the fast moon table extraction.
+
+Notes
+-----
+fast_moon_table has to give exactly what soup_moon_table (BeautifulSoup
+on the whole page, the original way) gives, so every test compares the 2
+of them. The synthetic pages only mirror the website's layout, so the
+same check runs on real, recorded timeanddate pages too, if there are
+any. (See fixture_pages.py for how to record them; it's skipped
+otherwise) Until it has, parse_moon_table stays on soup_moon_table.
+"""
+import os
+
+import pytest
+
+import functions
+from functions import fast_moon_table, parse_moon_table, soup_moon_table
+from fast_table import TableMismatch, find_table, extract_rows
+from fixture_pages import RECORDED_ARCHIVE, SYNTHETIC_PAGES_DIR, \
+    recorded_pages
+
+PAGE_NAMES = sorted(os.listdir(SYNTHETIC_PAGES_DIR))
+RECORDED_PAGES = recorded_pages()
+
+ROW = ('<tr><th>{day}</th><td>9:04 am</td><td>↑ (110°)</td>'
+       '<td>8:24 pm</td><td>↑ (250°)</td><td>-</td><td>2:40 pm</td></tr>')
+
+
+def page(table: str):
+    """A small page around a table."""
+    return (f"<html><body><table><tr><td>other</td></tr></table>"
+            f"{table}<p>after</p></body></html>").encode("utf-8")
+
+
+@pytest.mark.parametrize("page_name", PAGE_NAMES)
+def test_synthetic_pages_match_soup(page_name):
+    """Asserts if every synthetic page parses the same both ways."""
+    with open(os.path.join(SYNTHETIC_PAGES_DIR, page_name),
+              "rb") as page_file:
+        content = page_file.read()
+
+    assert fast_moon_table(content) == soup_moon_table(content)
+
+
+@pytest.mark.skipif(not RECORDED_PAGES,
+                    reason=f"no recorded pages in {RECORDED_ARCHIVE}")
+def test_recorded_pages_match_soup():
+    """Asserts if every recorded (real) page parses the same both ways,
+    & that some of them really have a moon table."""
+    tables = 0
+    for link, _, content in RECORDED_PAGES:
+        month_rows = fast_moon_table(content)
+        assert month_rows == soup_moon_table(content), link
+        tables += month_rows is not None
+
+    assert tables > 0
+
+
+def test_no_table():
+    """Asserts if a page with no moon table gives None."""
+    assert find_table(page("<div>nothing</div>")) is None
+    assert extract_rows(page("<div>nothing</div>")) is None
+    assert fast_moon_table(page("")) is None
+    assert parse_moon_table(page("")) is None
+
+
+def test_parse_moon_table_is_soup_until_turned_on(monkeypatch):
+    """Asserts if parse_moon_table only uses fast_moon_table with
+    FAST_TABLE on."""
+    content = page('<table id="tb-7dmn"><tbody>' + ROW.format(day=12)
+                   + "</tbody></table>")
+    calls = []
+    monkeypatch.setattr(functions, "fast_moon_table",
+                        lambda content: calls.append(content) or {})
+
+    assert parse_moon_table(content) == soup_moon_table(content)
+    assert calls == []
+    monkeypatch.setattr(functions, "FAST_TABLE", True)
+    assert parse_moon_table(content) == {}
+    assert calls == [content]
+
+
+def test_markup_variants_match_soup():
+    """Asserts if odd-but-valid markup still parses the same both ways.
+
+    Notes
+    -----
+    1. Single-quoted & unquoted id
+    2. Whitespace between the cells
+    3. Entities in a cell
+    4. A footnote row & an empty row
+    """
+    body = ROW.format(day=1)
+    body += ROW.format(day=2).replace("</td><td>2:40", "</td>\n<td>2:40")
+    body += ROW.format(day=3).replace("8:24 pm", "8:24&nbsp;pm")
+    body += '<tr><td colspan="7">* Daylight saving time</td></tr><tr></tr>'
+    for table_id in ('id="tb-7dmn"', "id='tb-7dmn'", "id=tb-7dmn"):
+        content = page(f"<table {table_id} class=\"tb-sm\"><thead><tr><th>"
+                       f"Jan</th></tr></thead><tbody>{body}</tbody></table>")
+
+        assert fast_moon_table(content) == soup_moon_table(content)
+        assert sorted(fast_moon_table(content)) == [1, 2, 3]
+
+
+def test_table_inside_the_table():
+    """Asserts if a table inside the moon table doesn't cut it short, &
+    it goes to soup_moon_table."""
+    inner = "<table><tr><td>x</td></tr></table>"
+    row = ROW.format(day=2).replace("<td>-</td>", f"<td>-{inner}</td>")
+    content = page(f'<table id="tb-7dmn"><tbody>{ROW.format(day=1)}{row}'
+                   f'{ROW.format(day=3)}</tbody></TABLE >')
+
+    table = find_table(content)
+    assert table.startswith(b'<table id="tb-7dmn">')
+    assert table.endswith(b"</tbody></TABLE >")
+    with pytest.raises(TableMismatch):
+        extract_rows(content)
+    assert fast_moon_table(content) == soup_moon_table(content)
+    assert sorted(fast_moon_table(content)) == [1, 2, 3]
+
+
+def test_short_day_row():
+    """Asserts if a day row without enough cells goes to soup_moon_table,
+    & a table that never ends is no table."""
+    content = page('<table id="tb-7dmn"><tbody>' + ROW.format(day=1)
+                   + "<tr><th>2</th><td>-</td></tr></tbody></table>")
+
+    with pytest.raises(TableMismatch):
+        extract_rows(content)
+    assert fast_moon_table(content) == soup_moon_table(content)
+    assert find_table(b'<table id="tb-7dmn"><tbody><tr>') is None
+
+
+def test_extract_rows_text_between_cells():
+    """Asserts if text between cells is an item, like in row.contents."""
+    from bs4 import BeautifulSoup
+
+    row = ROW.format(day=4).replace("</td><td>", "</td>\n <td>")
+    content = page(f'<table id="tb-7dmn"><tbody>{row}</tbody></table>')
+    soup_row = BeautifulSoup(content, "html.parser").find("tbody").find("tr")
+
+    assert extract_rows(content) == {
+        4: [item.text for item in soup_row.contents[1:6]]}
+
+
+def test_extract_rows_structure():
+    """Asserts if each day gets the text of its 5 cells after the day."""
+    content = page('<table id="tb-7dmn"><tbody>' + ROW.format(day=12)
+                   + "</tbody></table>")
+
+    assert extract_rows(content) == {
+        12: ["9:04 am", "↑ (110°)", "8:24 pm", "↑ (250°)", "-"]}
@@ -72,12 +72,12 @@ def test_date_check():
 
     Notes
     -----
-    Cannot compute moon-phase prior to 1/6/2000. Thus, "Invalid Date".
+    The moon-phase works from 1900 to 2100. (Before 1/6/2000 included)
     Input: date_check(str_city, str_year, str_month, str_day)
     Output of date_check() is always ["moonrise", "moonset", "phase"]
     """
     assert (date_check("San Diego", "2000", "1", "5")
-            == ["5:54 am", "4:21 pm", "Can't compute before 1-6-2000"])
+            == ["5:54 am", "4:21 pm", "New Moon"])
     assert (date_check("San Diego", "2000", "1", "6")
             == ["6:44 am", "5:10 pm", "New Moon"])
     assert (date_check("San Diego", "2020", "05", "12")
@@ -0,0 +1,93 @@
+"""This contains tests for the US city gazetteer.
+
+Notes
+-----
+The strict-city tests swap transport.fetch for a fake (the fetches
+fixture, in conftest.py) to count the fetches that happen.
+"""
+import time
+
+import functions
+from gazetteer import City, Gazetteer, get_gazetteer, normalize
+
+
+def test_normalize():
+    """Asserts if typed names format the same way the keys do."""
+    assert normalize(" Portland,  ME ") == "portland-me"
+    assert normalize("Coeur d'Alene") == "coeur-d-alene"
+    assert normalize("Coeur d’Alene") == "coeur-d-alene"
+    assert normalize("PHO!!enix") == "phoenix"
+
+
+def test_lookup_shared_names():
+    """Asserts if the city timeanddate picks for a shared name comes first."""
+    gazetteer = get_gazetteer()
+
+    concords = gazetteer.lookup("concord")
+    assert [city.state for city in concords] == ["NH", "CA"]
+    assert gazetteer.resolve("Concord").slug == "concord"
+    assert gazetteer.resolve("Concord, CA").slug == "concord-ca"
+    assert gazetteer.resolve("concord-ca").slug == "concord-ca"
+    assert gazetteer.resolve("Portland, ME").label == "Portland, ME"
+    assert gazetteer.resolve("Hyrule") is None
+    assert "San Diego" in gazetteer and "Hyrule" not in gazetteer
+
+
+def test_every_slug_resolves_to_itself():
+    """Asserts if every slug is unique & leads back to its own city."""
+    gazetteer = get_gazetteer()
+
+    assert len({city.slug for city in gazetteer.cities}) == len(gazetteer)
+    for city in gazetteer.cities:
+        assert gazetteer.resolve(city.slug) == city
+        assert gazetteer.resolve(city.label) == city
+
+
+def test_complete():
+    """Asserts if completion gives each matching city once, in order."""
+    gazetteer = Gazetteer([
+        City("San Diego", "CA", "san-diego", 32.7, -117.2, "America/Los_Angeles"),
+        City("San Jose", "CA", "san-jose", 37.3, -121.9, "America/Los_Angeles"),
+        City("Sandy", "UT", "sandy", 40.6, -111.9, "America/Denver"),
+        City("Salem", "OR", "salem", 44.9, -123.0, "America/Los_Angeles"),
+    ])
+
+    assert ([city.name for city in gazetteer.complete("san")]
+            == ["San Diego", "San Jose", "Sandy"])
+    assert [city.name for city in gazetteer.complete("San ")] == \
+        ["San Diego", "San Jose"]
+    assert [city.name for city in gazetteer.complete("san", limit=1)] == \
+        ["San Diego"]
+    assert gazetteer.complete("") == []
+    assert gazetteer.complete("xyz") == []
+
+
+def test_lookup_speed():
+    """Asserts if a lookup & a completion take microseconds, not a fetch."""
+    gazetteer = get_gazetteer()
+    start = time.perf_counter()
+    for _ in range(1000):
+        gazetteer.resolve("San Diego")
+        gazetteer.complete("san")
+    # Generous, so slow machines pass; it's ~20 microseconds here.
+    assert (time.perf_counter() - start) / 1000 < 1e-3
+
+
+def test_canonical_city_for_the_website(fetches, loose_cities):
+    """Asserts if "Concord, NH" fetches timeanddate's "usa/concord" page."""
+    assert functions.canonical_city("Concord, NH") == "concord"
+    assert functions.canonical_city("Hyrule") == "hyrule"
+    assert functions.canonical_city(" ") is None
+    assert (functions.moon_scraper("Concord, NH", 2022, 6, 8)
+            == ["1:37 pm", "1:50 am"])
+    assert fetches[0].endswith("/usa/concord?month=6&year=2022")
+
+
+def test_strict_cities_skip_the_fetch(fetches, monkeypatch):
+    """Asserts if STRICT_CITIES makes unknown cities invalid with no fetch."""
+    monkeypatch.setattr(functions, "STRICT_CITIES", True)
+
+    assert functions.canonical_city("Hyrule") is None
+    assert (functions.moon_scraper("Hyrule", 2014, 2, 5)
+            == ["Invalid City Name OR", "No Moonrise/set time exists"])
+    assert fetches == []
@@ -0,0 +1,100 @@
+"""This contains tests for the GUI's background lookup worker.
+
+Notes
+-----
+The lookups here are fakes that wait on an Event, so each test decides
+exactly when a lookup finishes.
+"""
+import threading
+import time
+
+from gui_worker import LookupWorker
+
+
+def wait_for(worker: LookupWorker, timeout: float = 5):
+    """poll() until the newest lookup is done, like root.after() would."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        done = worker.poll()
+        if done is not None:
+            return done
+        time.sleep(0.005)
+    raise AssertionError("lookup never finished")
+
+
+def test_result_comes_back():
+    """Asserts if a lookup's result comes back with its generation."""
+    worker = LookupWorker(lambda city, day: [city, day])
+    generation = worker.submit("San Diego", 12)
+
+    done = wait_for(worker)
+    assert done.generation == generation
+    assert done.result == ["San Diego", 12] and done.error is None
+    assert not worker.busy
+    worker.close()
+
+
+def test_submit_does_not_block():
+    """Asserts if submit() returns right away while the lookup is slow."""
+    release = threading.Event()
+    worker = LookupWorker(lambda: release.wait(5))
+
+    start = time.perf_counter()
+    worker.submit()
+    assert time.perf_counter() - start < 0.1
+    assert worker.poll() is None and worker.busy
+
+    release.set()
+    assert wait_for(worker).result is True
+    worker.close()
+
+
+def test_stale_results_are_dropped():
+    """Asserts if clicking again drops the old result & skips queued ones."""
+    started = []
+    release = threading.Event()
+
+    def slow_lookup(name):
+        started.append(name)
+        release.wait(5)
+        return name
+
+    worker = LookupWorker(slow_lookup)
+    worker.submit("first")
+    while not started:
+        time.sleep(0.001)
+    # "second" gets replaced by "third" before the worker is free for it.
+    worker.submit("second")
+    newest = worker.submit("third")
+    release.set()
+
+    done = wait_for(worker)
+    assert done == (newest, "third", None)
+    assert started == ["first", "third"]
+    worker.close()
+
+
+def test_errors_come_back():
+    """Asserts if an exception in the lookup is handed back, not lost."""
+    def broken_lookup():
+        raise ConnectionError("no internet")
+
+    worker = LookupWorker(broken_lookup)
+    worker.submit()
+
+    done = wait_for(worker)
+    assert done.result is None and isinstance(done.error, ConnectionError)
+    worker.close()
+
+
+def test_cancel():
+    """Asserts if cancel() makes the running lookup's result stale."""
+    release = threading.Event()
+    worker = LookupWorker(lambda: release.wait(5))
+    worker.submit()
+    worker.cancel()
+    release.set()
+
+    time.sleep(0.05)
+    assert worker.poll() is None and not worker.busy
+    worker.close()
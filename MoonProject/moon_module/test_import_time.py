@@ -0,0 +1,94 @@
+"""This contains tests that the moon phase math stays quick to import.
+
+Notes
+-----
+Each check runs in a brand new Python, since this one has everything
+imported already. Mostly these check what gets imported. The one time
+budget (IMPORT_BUDGET_MS) is the best of a few runs & far over what it
+takes, so a busy machine doesn't trip it, but a heavy import slipping in
+does. For the real time, run benchmarks/bench_import.py, which has the
+tight budget.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("requests", "bs4", "numpy", "PIL", "sqlite3", "aiohttp")
+
+# Milliseconds "import functions" may take. (It's ~10, & bs4, NumPy or
+# requests alone add ~65 to ~130)
+IMPORT_BUDGET_MS = 50
+ROUNDS = 3
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(os.path.dirname(HERE), "scripts")
+
+
+def run_python(*args, cwd: str = HERE):
+    """Run a fresh Python in this folder, & get what it wrote to stderr/out."""
+    run = subprocess.run([sys.executable, *args], cwd=cwd,
+                         capture_output=True, text=True, check=True)
+    return run.stdout, run.stderr
+
+
+def test_phase_math_loads_nothing_heavy():
+    """Asserts if check_date (& using it) doesn't load scraping/imaging."""
+    stdout, _ = run_python("-c", (
+        "import sys\n"
+        "from functions import check_date, dic_calculator\n"
+        "check_date('1950', '6', '1')\n"
+        f"print(*[m for m in {HEAVY_MODULES!r} if m in sys.modules])"))
+
+    assert stdout.split() == []
+
+
+def test_import_functions_loads_nothing_heavy():
+    """Asserts if a plain "import functions" doesn't load bs4, NumPy,
+    aiohttp (or the rest of HEAVY_MODULES)."""
+    stdout, _ = run_python("-c", (
+        "import sys, functions\n"
+        f"print(*[m for m in {HEAVY_MODULES!r} if m in sys.modules])"))
+
+    assert stdout.split() == []
+
+
+def import_ms(module: str):
+    """Milliseconds a fresh Python took to import module. (-X importtime,
+    so without Python's own startup)"""
+    _, stderr = run_python("-X", "importtime", "-c", f"import {module}")
+    for line in stderr.splitlines():
+        # "import time: self | cumulative | name" (top level: no indent)
+        _, cumulative, name = line.split("|")
+        if name == f" {module}":
+            return int(cumulative) / 1000
+    raise AssertionError(f"{module} wasn't imported")
+
+
+def test_import_budget():
+    """Asserts if "import functions" stays under IMPORT_BUDGET_MS."""
+    fastest = min(import_ms("functions") for _ in range(ROUNDS))
+    assert fastest < IMPORT_BUDGET_MS
+
+
+def test_table_parser_loads_on_first_use():
+    """Asserts if fast_moon_table loads fast_table, but not requests."""
+    stdout, _ = run_python("-c", (
+        "import sys, functions\n"
+        "functions.fast_moon_table(b'<html></html>')\n"
+        "print('fast_table' in sys.modules, 'requests' in sys.modules)"))
+
+    assert stdout.split() == ["True", "False"]
+
+
+def test_gui_import_makes_no_window():
+    """Asserts if importing the GUI script doesn't make its Tk (or open a
+    window); only running it does."""
+    pytest.importorskip("tkinter")
+    stdout, _ = run_python("-c", (
+        "import tkinter, moon_gui\n"
+        "print(tkinter._default_root is None, callable(moon_gui.main))"),
+        cwd=SCRIPTS_DIR)
+
+    assert stdout.split() == ["True", "True"]
@@ -0,0 +1,96 @@
+"""This contains tests for the offline moonrise/moonset engine.
+
+Notes
+-----
+The expected times are the scraped ones asserted in test_functions.py,
+so these check the engine against timeanddate itself. Each time has to
+be within a minute of it (they all actually match exactly).
+"""
+import datetime as dt
+
+import numpy as np
+
+from functions import date_check
+from lunar_engine import (city_place, moon_rise_set,
+                          offline_month_table, offline_moon_scraper)
+
+SCRAPED = [
+    ("San Diego", 2006, 1, 7, ["11:55 am", "12:35 am"]),
+    ("San Diego", 2006, 7, 16, ["11:50 pm", "12:02 pm"]),
+    ("Sacr@amen@to", 2016, 1, 12, ["9:04 am", "8:24 pm"]),
+    ("Concord", 2022, 6, 8, ["1:37 pm", "1:50 am"]),
+    ("ChIcAgO", 2019, 4, 10, ["9:47 am", "No moonset"]),
+    ("SeaTTle", 2013, 10, 11, ["2:22 pm", "No moonset"]),
+    ("DaLLas", 2010, 12, 27, ["No moonrise", "11:41 am"]),
+    ("PHO!!enix", 2027, 7, 27, ["No moonrise", "2:10 pm"]),
+    ("San Diego", 2000, 1, 5, ["5:54 am", "4:21 pm"]),
+    ("San Diego", 2000, 1, 6, ["6:44 am", "5:10 pm"]),
+    ("San Diego", 2020, 5, 12, ["12:23 am", "10:38 am"]),
+]
+
+
+def minutes(clock: str):
+    """Minutes past midnight of "9:04 am" (or the text itself if no time)."""
+    if not clock.endswith(("am", "pm")):
+        return clock
+    hour, minute = map(int, clock[:-3].split(":"))
+    return (hour % 12 + 12 * clock.endswith("pm")) * 60 + minute
+
+
+def test_offline_within_a_minute_of_scraped():
+    """Asserts if every computed time is within a minute of the scraped."""
+    for city, year, month, day, scraped in SCRAPED:
+        computed = offline_moon_scraper(city, year, month, day)
+        for computed_time, scraped_time in zip(computed, scraped):
+            if isinstance(minutes(scraped_time), str):
+                assert computed_time == scraped_time
+            else:
+                assert abs(minutes(computed_time)
+                           - minutes(scraped_time)) <= 1
+
+
+def test_offline_month_table_matches_days():
+    """Asserts if the vectorized month gives what each day gives alone."""
+    month_rows = offline_month_table("San Diego", 2006, 1)
+
+    assert len(month_rows) == 31
+    for day in (1, 7, 15, 31):
+        assert list(month_rows[day]) == offline_moon_scraper("San Diego",
+                                                             2006, 1, day)
+
+
+def test_moon_rise_set_nan_and_order():
+    """Asserts if a day with no moonrise is NaN, & times fall in the day."""
+    latitude, longitude, timezone = city_place("Dallas")
+    dates = np.arange(np.datetime64("2010-12-01"), np.datetime64("2011-01-01"))
+    rises, sets = moon_rise_set(latitude, longitude, timezone, dates)
+
+    assert np.isnan(rises[26])
+    assert np.isnan(rises).sum() == 1
+    # Every time is a Julian Day within its local day (UTC-6 in December).
+    local_days = np.floor(rises[~np.isnan(rises)] + 0.5 - 6 / 24)
+    assert np.all(np.diff(local_days) >= 1)
+
+
+def test_offline_unknown_city():
+    """Asserts if a city with no coordinates gives the invalid city output."""
+    assert (offline_moon_scraper("Hyrule", 2014, 2, 5)
+            == ["Invalid City Name OR", "No Moonrise/set time exists"])
+    assert offline_month_table("Hyrule", 2014, 2) is None
+
+
+def test_date_check_offline():
+    """Asserts if date_check can use the engine instead of the website."""
+    assert (date_check("San Diego", "2020", "5", "12", offline=True)
+            == ["12:23 am", "10:38 am", "Waning Gibbous"])
+    assert (date_check("San Diego", "2020", "5", "49", offline=True)
+            == ["Invalid Date", "Invalid Date", "Invalid Date"])
+
+
+def test_daylight_saving_day():
+    """Asserts if the 23-hour day DST starts on still gets its times."""
+    latitude, longitude, timezone = city_place("San Diego")
+    rises, sets = moon_rise_set(latitude, longitude, timezone,
+                                [dt.date(2020, 3, 8)])
+
+    assert not np.isnan(rises[0]) or not np.isnan(sets[0])
@@ -0,0 +1,120 @@
+"""This contains tests for the lunation index (new moons & quarters).
+
+Notes
+-----
+The worked examples are from Meeus's "Astronomical Algorithms" (2nd ed.),
+examples 49.a & 49.b. The eclipse times are when those eclipses peaked,
+which is within minutes of the new/full moon itself.
+"""
+import calendar
+import datetime as dt
+
+from functions import OUT_OF_RANGE, check_date, month_phases
+from lunation_index import (INDEX_PATH, PRIMARY_PHASES, build_index,
+                            get_lunation_index, quarter_instants)
+
+UTC = dt.timezone.utc
+
+
+def test_meeus_examples():
+    """Asserts if the quarters match Meeus's own worked examples."""
+    # New moon of Feb 1977 (k = -283) & third quarter of Jan 2044.
+    new_moon, third_quarter = quarter_instants([-283 * 4, 544 * 4 + 3])
+    assert abs(new_moon - 2443192.65118) < 1e-5
+    assert abs(third_quarter - 2467636.49186) < 1e-5
+
+
+def test_shipped_index_is_up_to_date(tmp_path):
+    """Asserts if data/lunations.bin is exactly what build_index makes."""
+    build_index(tmp_path / "lunations.bin")
+
+    with open(INDEX_PATH, "rb") as shipped, \
+            open(tmp_path / "lunations.bin", "rb") as rebuilt:
+        assert shipped.read() == rebuilt.read()
+
+
+def test_eclipses():
+    """Asserts if a new/full moon is found at known eclipses, 1919-2017."""
+    index = get_lunation_index()
+    for phase, peak in (("New Moon", dt.datetime(1919, 5, 29, 13, 8)),
+                        ("Full Moon", dt.datetime(1982, 7, 6, 7, 31)),
+                        ("New Moon", dt.datetime(1999, 8, 11, 11, 3)),
+                        ("New Moon", dt.datetime(2017, 8, 21, 18, 25))):
+        instant = index.next_phase(phase, peak - dt.timedelta(days=1))
+        assert abs(instant - peak.replace(tzinfo=UTC)) < dt.timedelta(hours=1)
+
+
+def test_every_primary_phase_day():
+    """Asserts if every day with a primary phase in it (UT) is named it."""
+    index = get_lunation_index()
+    for position in range(len(index) - 1):
+        instant = index.instant(position)
+        if not 1900 <= instant.year <= 2100:
+            continue
+        assert (index.phase_on(instant.year, instant.month, instant.day)
+                == index.phase_kind(position))
+
+
+def test_queries():
+    """Asserts if next/previous/between give the right instants."""
+    index = get_lunation_index()
+
+    assert (index.next_phase("New Moon", dt.date(2000, 1, 1))
+            == dt.datetime(2000, 1, 6, 18, 14, tzinfo=UTC))
+    assert (index.previous_phase("New Moon", dt.date(2000, 1, 6))
+            .date() == dt.date(1999, 12, 7))
+
+    # 2020 had 13 full moons, with 2 in October (the 2nd on Halloween).
+    full_moons = index.phases_between("Full Moon", dt.date(2020, 1, 1),
+                                      dt.date(2021, 1, 1))
+    assert len(full_moons) == 13
+    assert [instant.day for instant in full_moons
+            if instant.month == 10] == [1, 31]
+
+    for phase in PRIMARY_PHASES:
+        assert 49 <= len(index.phases_between(
+            phase, dt.date(1900, 1, 1), dt.date(1904, 1, 1))) <= 50
+
+
+def test_moon_age():
+    """Asserts if the age is 0 at a new moon & grows a day per day."""
+    index = get_lunation_index()
+    new_moon = dt.datetime(2000, 1, 6, 18, 14)
+
+    assert index.moon_age(new_moon) == 0
+    assert abs(index.moon_age(new_moon + dt.timedelta(days=10)) - 10) < 1e-9
+    assert index.moon_age(dt.date(1800, 1, 1)) is None
+
+
+def test_month_phases():
+    """Asserts if month_phases is phase_on of every day, even at the ends."""
+    index = get_lunation_index()
+    for year, month in ((1899, 12), (1900, 1), (1950, 2), (2000, 1),
+                        (2024, 2), (2100, 12), (2101, 1), (2150, 6)):
+        days = calendar.monthrange(year, month)[1]
+        assert index.month_phases(year, month) == [
+            index.phase_on(year, month, day) for day in range(1, days + 1)]
+
+
+def test_month_phases_match_check_date():
+    """Asserts if functions.month_phases is every day's check_date phase."""
+    for year, month in ((2000, 1), (2020, 2), (1899, 12), (2150, 1)):
+        phases = month_phases(year, month)
+        assert list(phases) == [
+            check_date(str(year), str(month), str(day))[1]
+            for day in range(1, len(phases) + 1)]
+
+
+def test_check_date_before_2000():
+    """Asserts if check_date works from 1900 to 2100, & not outside it."""
+    assert check_date("2000", "1", "5") == ((2000, 1, 5), "New Moon")
+    # The total lunar eclipse of Jul 16, 2000 & of Jan 9, 1982 (UT).
+    assert check_date("2000", "7", "16")[1] == "Full Moon"
+    assert check_date("1982", "1", "9")[1] == "Full Moon"
+    assert check_date("1900", "1", "1")[1] == "New Moon"
+    assert check_date("2100", "12", "31")[1] != OUT_OF_RANGE
+    # The index goes a lunation past both ends, but the dates don't.
+    for year, month, day in ((1899, 12, 31), (2101, 1, 1)):
+        assert check_date(year, month, day)[1] == OUT_OF_RANGE
+    assert check_date("1850", "6", "1") == ((1850, 6, 1), OUT_OF_RANGE)
+    assert check_date("2150", "6", "1")[1] == OUT_OF_RANGE
@@ -0,0 +1,109 @@
+"""This contains tests for the metrics of the lookup pipeline.
+
+Notes
+-----
+These run against serve_pages, a local stand-in for the website that
+serves the synthetic pages in fixtures/synthetic_pages, so no internet
+is needed.
+"""
+import re
+
+import pytest
+
+import functions
+import transport
+from functions import check_date, date_check
+from fixture_pages import serve_pages
+from month_cache import MonthCache
+from metrics import Histogram, Metrics
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Metrics on, against the stand-in server, with a cold cache."""
+    events = []
+    with serve_pages() as server:
+        monkeypatch.setattr(functions, "BASE_URL", server.base_url)
+        monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+        monkeypatch.setattr(functions, "METRICS",
+                            Metrics(callback=lambda *event:
+                                    events.append(event)))
+        functions.METRICS.events = events
+        yield functions.METRICS
+
+
+def test_histogram():
+    """Asserts if measurements land in the right (cumulative) buckets."""
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(seconds)
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), ("+Inf", 4)]
+    assert (histogram.count, histogram.sum) == (4, 2.65)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) is None
+    assert Histogram().quantile(0.5) is None
+
+
+def test_lookup_stages_and_counters(metrics, loose_cities):
+    """Asserts if a cold then warm lookup reports every stage & counter."""
+    date_check("San Diego", "2020", "5", "12")
+    date_check("San Diego", "2020", "5", "13")
+    date_check("San Diegooo", "2020", "5", "12")
+    date_check("San Diego", "2020", "13", "12")
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["requests"] == 4
+    assert snapshot["counters"]["cache_misses"] == 2
+    assert snapshot["counters"]["cache_hits"] == 1
+    assert snapshot["counters"]["invalid_cities"] == 1
+    assert snapshot["counters"]["upstream_errors"] == 0
+    assert snapshot["counters"]["bytes_downloaded"] > 10000
+
+    stages = snapshot["stages"]
+    assert stages["validate"]["count"] == stages["date_check"]["count"] == 4
+    assert stages["phase"]["count"] == stages["extract"]["count"] == 3
+    assert stages["fetch"]["count"] == stages["parse"]["count"] == 2
+    assert stages["date_check"]["sum"] > stages["fetch"]["sum"]
+
+
+def test_callback(metrics):
+    """Asserts if the callback gets every measurement as it happens."""
+    date_check("San Diego", "2020", "5", "12")
+    kinds = {(kind, name) for kind, name, _ in metrics.events}
+    assert ("counter", "cache_misses") in kinds
+    assert ("histogram", "fetch") in kinds
+    bytes_events = [value for kind, name, value in metrics.events
+                    if name == "bytes_downloaded"]
+    assert bytes_events == [metrics.counters["bytes_downloaded"]]
+
+
+def test_upstream_errors(metrics, monkeypatch):
+    """Asserts if a download that fails counts as an upstream error."""
+    monkeypatch.setattr(functions, "BASE_URL", "http://127.0.0.1:9")
+    monkeypatch.setitem(transport.SETTINGS, "retries", 0)
+    with pytest.raises(OSError):
+        functions.moon_scraper("Seattle", 2013, 10, 11)
+    assert metrics.counters["upstream_errors"] == 1
+
+
+def test_prometheus_text(metrics):
+    """Asserts if prometheus_text is valid exposition format."""
+    date_check("San Diego", "2020", "5", "12")
+    text = metrics.prometheus_text()
+
+    assert "# TYPE moon_requests_total counter\nmoon_requests_total 1\n" \
+        in text
+    assert 'moon_stage_seconds_count{stage="fetch"} 1\n' in text
+    assert 'moon_stage_seconds_bucket{stage="fetch",le="+Inf"} 1\n' in text
+    sample = re.compile(r'^[a-z_]+(\{[a-z]+="[^"]*"(,[a-z]+="[^"]*")*\})? '
+                        r'[0-9.e+-]+$')
+    for line in text.splitlines():
+        assert line.startswith("# ") or sample.match(line), line
+
+
+def test_disabled_by_default():
+    """Asserts if lookups don't need METRICS to be on."""
+    assert functions.METRICS is None
+    assert check_date("2020", "5", "12") == ((2020, 5, 12),
+                                             "Waning Gibbous")
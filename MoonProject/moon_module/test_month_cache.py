@@ -0,0 +1,198 @@
+"""This contains tests for the month table cache behind moon_scraper.
+
+Notes
+-----
+These run offline: transport.fetch is swapped for a fake that serves the
+synthetic pages in fixtures/synthetic_pages & counts how many times it's
+called. (The fetches fixture, in conftest.py)
+"""
+import types
+import threading
+
+import functions
+from functions import moon_scraper, date_check
+from fixture_pages import page_for_link
+from month_cache import FRESH, MISSING, STALE, MonthCache
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_month_cache_lru():
+    """Asserts if the least recently used entry is evicted first."""
+    cache = MonthCache(max_entries=2)
+    cache.put(("a", 2020, 1), {1: ("x", "y")})
+    cache.put(("b", 2020, 1), {1: ("x", "y")})
+    # Touching "a" makes "b" the least recently used.
+    assert cache.get(("a", 2020, 1)) == {1: ("x", "y")}
+    cache.put(("c", 2020, 1), {1: ("x", "y")})
+
+    assert cache.get(("b", 2020, 1)) is MISSING
+    assert cache.get(("a", 2020, 1)) is not MISSING
+    assert cache.get(("c", 2020, 1)) is not MISSING
+    assert cache.stats() == {"hits": 3, "stale_hits": 0, "misses": 1,
+                             "evictions": 1, "size": 2, "max_entries": 2}
+
+
+def test_month_cache_ttl():
+    """Asserts if entries expire, with a shorter TTL for invalid cities."""
+    clock = FakeClock()
+    cache = MonthCache(ttl=100, negative_ttl=10, clock=clock)
+    cache.put(("good", 2020, 1), {1: ("x", "y")})
+    cache.put(("bad", 2020, 1), None)
+
+    clock.now = 9
+    assert cache.get(("bad", 2020, 1)) is None
+    clock.now = 10
+    assert cache.get(("bad", 2020, 1)) is MISSING
+    assert cache.get(("good", 2020, 1)) == {1: ("x", "y")}
+    clock.now = 100
+    assert cache.get(("good", 2020, 1)) is MISSING
+    assert len(cache) == 0
+
+
+def test_month_cache_stale():
+    """Asserts if lookup() gives stale entries until max_stale runs out,
+    while get() never does (& invalid cities are never stale)."""
+    clock = FakeClock()
+    cache = MonthCache(ttl=100, negative_ttl=10, max_stale=50, clock=clock)
+    cache.put(("good", 2020, 1), {1: ("x", "y")})
+    cache.put(("bad", 2020, 1), None)
+
+    assert cache.lookup(("good", 2020, 1)) == ({1: ("x", "y")}, FRESH)
+    clock.now = 100
+    assert cache.lookup(("good", 2020, 1)) == ({1: ("x", "y")}, STALE)
+    assert cache.get(("good", 2020, 1)) is MISSING
+    assert cache.lookup(("bad", 2020, 1)) == (MISSING, None)
+    clock.now = 149
+    assert cache.lookup(("good", 2020, 1))[1] is STALE
+    clock.now = 150
+    assert cache.lookup(("good", 2020, 1)) == (MISSING, None)
+    assert cache.stats()["stale_hits"] == 2
+    assert len(cache) == 0
+
+
+def test_month_cache_freshness_per_key():
+    """Asserts if freshness() sets the ttl & max_stale of each key."""
+    def freshness(key, table):
+        # Months before 2020 are done changing, so keep them longer.
+        return (1000, 0) if key[1] < 2020 else (10, 5)
+
+    clock = FakeClock()
+    cache = MonthCache(clock=clock, freshness=freshness)
+    cache.put(("old", 2019, 1), {1: ("x", "y")})
+    cache.put(("new", 2020, 1), {1: ("x", "y")})
+
+    clock.now = 12
+    assert cache.lookup(("old", 2019, 1))[1] is FRESH
+    assert cache.lookup(("new", 2020, 1))[1] is STALE
+    clock.now = 15
+    assert cache.lookup(("new", 2020, 1)) == (MISSING, None)
+
+
+def test_stale_while_revalidate(monkeypatch):
+    """Asserts if a stale month is served without waiting on the fetch,
+    with only one refresh for many lookups, & is fresh once it's done."""
+    clock = FakeClock()
+    monkeypatch.setattr(functions, "MONTH_CACHE",
+                        MonthCache(ttl=100, max_stale=1000, clock=clock))
+    links = []
+    release = threading.Event()
+
+    def slow_fetch(link, **_):
+        links.append(link)
+        if len(links) > 1:
+            # The refresh waits until the stale lookups are done.
+            assert release.wait(5)
+        status, content = page_for_link(link)
+        return types.SimpleNamespace(status_code=status, content=content)
+
+    monkeypatch.setattr(functions, "fetch", slow_fetch)
+    # No copy yet, so the first lookup waits on the fetch.
+    assert functions.month_lookup("San Diego", 2006, 1).freshness is FRESH
+
+    clock.now = 500
+    lookups = [functions.month_lookup("San Diego", 2006, 1) for _ in range(5)]
+    assert {lookup.freshness for lookup in lookups} == {STALE}
+    assert lookups[0].month_rows[7] == ("11:55 am", "12:35 am")
+    assert functions.REFRESHING == {("san-diego", 2006, 1)}
+
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name.startswith("refresh"):
+            thread.join(5)
+    assert len(links) == 2
+    assert not functions.REFRESHING
+    assert functions.month_lookup("San Diego", 2006, 1).freshness is FRESH
+
+
+def test_failed_refresh_keeps_stale_copy(fetches, monkeypatch):
+    """Asserts if a refresh that can't connect leaves the stale copy."""
+    clock = FakeClock()
+    monkeypatch.setattr(functions, "MONTH_CACHE",
+                        MonthCache(ttl=100, max_stale=1000, clock=clock))
+    assert moon_scraper("San Diego", 2006, 1, 7) == ["11:55 am", "12:35 am"]
+
+    def no_fetch(link, **_):
+        raise ConnectionError("no internet")
+
+    monkeypatch.setattr(functions, "fetch", no_fetch)
+    clock.now = 500
+    assert functions.refresh_month_table(("san-diego", 2006, 1))
+    for thread in threading.enumerate():
+        if thread.name.startswith("refresh"):
+            thread.join(5)
+    assert not functions.REFRESHING
+    month_rows, freshness = functions.MONTH_CACHE.lookup(
+        ("san-diego", 2006, 1))
+    assert freshness is STALE
+    assert month_rows[7] == ("11:55 am", "12:35 am")
+
+
+def test_moon_scraper_one_fetch_per_month(fetches):
+    """Asserts if a whole month of lookups costs a single fetch."""
+    outputs = [moon_scraper("San Diego", 2006, 1, day) for day in range(1, 32)]
+
+    assert len(fetches) == 1
+    assert outputs[6] == ["11:55 am", "12:35 am"]
+    assert functions.MONTH_CACHE.stats()["hits"] == 30
+
+    # Different spellings of the same city share the entry.
+    assert moon_scraper("SAN DIEGO", "2006", "01", "7") == outputs[6]
+    assert len(fetches) == 1
+
+
+def test_moon_scraper_negative_cache(fetches, loose_cities):
+    """Asserts if an invalid city is only fetched once."""
+    for _ in range(3):
+        assert (moon_scraper("Hyrule", 2014, 2, 5)
+                == ["Invalid City Name OR", "No Moonrise/set time exists"])
+
+    assert len(fetches) == 1
+
+
+def test_date_check_does_not_alter_cache(fetches):
+    """Asserts if date_check appending the phase leaves the cache alone."""
+    first = date_check("San Diego", "2020", "5", "12")
+    second = date_check("San Diego", "2020", "5", "12")
+
+    assert first == second == ["12:23 am", "10:38 am", "Waning Gibbous"]
+    assert len(fetches) == 1
+
+
+def test_moon_scraper_fixture_outputs(fetches):
+    """Asserts if the synthetic pages give test_functions's outputs."""
+    assert moon_scraper("San Diego", 2006, 7, 16) == ["11:50 pm", "12:02 pm"]
+    assert moon_scraper("Sacr@amen@to", 2016, 1, 12) == ["9:04 am", "8:24 pm"]
+    assert moon_scraper("Concord", 2022, 6, 8) == ["1:37 pm", "1:50 am"]
+    assert moon_scraper("ChIcAgO", 2019, 4, 10) == ["9:47 am", "No moonset"]
+    assert moon_scraper("SeaTTle", 2013, 10, 11) == ["2:22 pm", "No moonset"]
+    assert moon_scraper("DaLLas", 2010, 12, 27) == ["No moonrise", "11:41 am"]
+    assert moon_scraper("PHO!!enix", 2027, 7, 27) == ["No moonrise", "2:10 pm"]
@@ -0,0 +1,166 @@
+"""This contains tests for the SQLite month store.
+
+Notes
+-----
+Every test gets its own database file in pytest's tmp_path.
+The last test acts as 2 processes in a row: the 2nd one starts with a
+cold MONTH_CACHE & must not fetch anything the 1st one already did.
+"""
+import threading
+import multiprocessing
+
+import pytest
+
+import functions
+from functions import moon_scraper
+from month_cache import MISSING, MonthCache
+from month_store import MonthStore
+
+TABLE = {1: ("9:04 am", "8:24 pm"), 2: ("No moonrise", "9:11 pm")}
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def write_months(path: str, city: str, count: int):
+    """Save `count` months for city. (Run in another process/thread)"""
+    store = MonthStore(path)
+    for month in range(1, count + 1):
+        store.put((city, 2020, month), TABLE)
+    store.close()
+
+
+def test_month_store_round_trip(tmp_path):
+    """Asserts if tables (& invalid cities) come back as they went in."""
+    store = MonthStore(str(tmp_path / "moon.sqlite3"))
+    store.put(("sacramento", 2016, 1), TABLE)
+    store.put(("hyrule", 2014, 2), None)
+
+    assert store.get(("sacramento", 2016, 1)) == TABLE
+    assert store.get(("hyrule", 2014, 2)) is None
+    assert store.get(("sacramento", 2016, 2)) is MISSING
+
+    # Saving the same month again replaces it.
+    store.put(("sacramento", 2016, 1), {1: TABLE[1]})
+    assert store.get(("sacramento", 2016, 1)) == {1: TABLE[1]}
+    store.put(("sacramento", 2016, 1), {})
+    assert store.get(("sacramento", 2016, 1)) == {}
+
+    journal = store._connection().execute("PRAGMA journal_mode").fetchone()
+    assert journal[0] == "wal"
+
+
+def test_month_store_expiry_and_cap(tmp_path):
+    """Asserts if entries expire & only the newest max_months are kept."""
+    clock = FakeClock()
+    store = MonthStore(str(tmp_path / "moon.sqlite3"), ttl=100,
+                       negative_ttl=10, max_months=3, clock=clock,
+                       prune_every=1)
+    store.put(("hyrule", 2014, 2), None)
+    clock.now += 10
+    assert store.get(("hyrule", 2014, 2)) is MISSING
+
+    for month in range(1, 6):
+        clock.now += 1
+        store.put(("sacramento", 2016, month), TABLE)
+
+    assert len(store) == 3
+    assert store.get(("sacramento", 2016, 2)) is MISSING
+    assert store.get(("sacramento", 2016, 5)) == TABLE
+
+    clock.now += 100
+    assert store.get(("sacramento", 2016, 5)) is MISSING
+
+
+def test_month_store_prunes_every_n_writes(tmp_path):
+    """Asserts if the cap is only enforced every prune_every put()s (or on
+    prune())."""
+    store = MonthStore(str(tmp_path / "moon.sqlite3"), max_months=1,
+                       prune_every=3)
+    sizes = []
+    for month in range(1, 6):
+        store.put(("sacramento", 2016, month), TABLE)
+        sizes.append(len(store))
+    assert sizes == [1, 2, 1, 2, 3]
+    store.prune()
+    assert len(store) == 1
+    assert store.get(("sacramento", 2016, 5)) == TABLE
+
+
+def test_cache_copy_keeps_the_store_age(tmp_path, monkeypatch):
+    """Asserts if a MONTH_STORE hit is only cached for what's left of its
+    ttl, counted from when it was downloaded."""
+    clock = FakeClock()
+    store = MonthStore(str(tmp_path / "moon.sqlite3"), clock=clock)
+    store.put(("sacramento", 2016, 1), TABLE)
+    clock.now += 5 * 60 * 60
+    assert store.lookup(("sacramento", 2016, 1)) == (TABLE, 5 * 60 * 60)
+    assert store.lookup(("sacramento", 2016, 2)) == (MISSING, None)
+
+    cache = MonthCache(ttl=6 * 60 * 60, clock=clock)
+    monkeypatch.setattr(functions, "MONTH_STORE", store)
+    monkeypatch.setattr(functions, "MONTH_CACHE", cache)
+    assert functions.lookup_month_table(("sacramento", 2016, 1)) == \
+        (TABLE, functions.FRESH)
+    clock.now += 60 * 60 - 1
+    assert cache.get(("sacramento", 2016, 1)) == TABLE
+    clock.now += 1
+    assert cache.get(("sacramento", 2016, 1)) is MISSING
+
+
+def test_month_store_concurrent_writers(tmp_path):
+    """Asserts if many threads & processes can write at the same time."""
+    path = str(tmp_path / "moon.sqlite3")
+    MonthStore(path)
+
+    workers = [multiprocessing.Process(target=write_months,
+                                       args=(path, f"process-{count}", 12))
+               for count in range(3)]
+    workers += [threading.Thread(target=write_months,
+                                 args=(path, f"thread-{count}", 12))
+                for count in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    store = MonthStore(path)
+    assert len(store) == 72
+    assert store.get(("process-2", 2020, 12)) == TABLE
+    assert store.get(("thread-0", 2020, 1)) == TABLE
+
+
+def test_moon_scraper_reads_store(tmp_path, fetches, monkeypatch,
+                                  loose_cities):
+    """Asserts if a restarted process gets its months from the store."""
+    path = str(tmp_path / "moon.sqlite3")
+    monkeypatch.setattr(functions, "MONTH_STORE", MonthStore(path))
+    assert moon_scraper("Sacramento", 2016, 1, 12) == ["9:04 am", "8:24 pm"]
+    assert moon_scraper("Hyrule", 2014, 2, 5)[0] == "Invalid City Name OR"
+    assert len(fetches) == 2
+
+    # "Restart": a cold memory cache & a new connection to the same file.
+    monkeypatch.setattr(functions, "MONTH_STORE", MonthStore(path))
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    assert moon_scraper("Sacramento", 2016, 1, 12) == ["9:04 am", "8:24 pm"]
+    assert moon_scraper("Sacramento", 2016, 1, 13) == ["9:54 am", "9:14 pm"]
+    assert moon_scraper("Hyrule", 2014, 2, 5)[0] == "Invalid City Name OR"
+    assert len(fetches) == 2
+
+
+@pytest.mark.parametrize("city", ["sacramento", "hyrule"])
+def test_month_store_clear(tmp_path, city):
+    """Asserts if clear() forgets everything."""
+    store = MonthStore(str(tmp_path / "moon.sqlite3"))
+    store.put((city, 2016, 1), TABLE if city == "sacramento" else None)
+    store.clear()
+
+    assert len(store) == 0
+    assert store.get((city, 2016, 1)) is MISSING
@@ -0,0 +1,76 @@
+"""This contains tests for what the GUI's month view shows.
+
+Notes
+-----
+These run offline: transport.fetch is swapped for a fake that serves the
+synthetic pages in fixtures/synthetic_pages & counts how many times it's
+called.
+"""
+import datetime as dt
+
+import functions
+from functions import check_date, moon_scraper
+from month_cache import MISSING
+from month_view import (PENDING, cached_month, calendar_weeks, month_days,
+                        shift_month)
+from phase_images import PhaseImages
+
+
+def test_shift_month():
+    """Asserts if paging crosses years both ways."""
+    assert shift_month(2020, 12, 1) == (2021, 1)
+    assert shift_month(2020, 1, -1) == (2019, 12)
+    assert shift_month(2020, 5, 0) == (2020, 5)
+    assert shift_month(2020, 5, -17) == (2018, 12)
+
+
+def test_calendar_weeks():
+    """Asserts if weeks start on Sunday & every day is there once."""
+    weeks = calendar_weeks(2020, 5)
+    # May 1st, 2020 was a Friday.
+    assert weeks[0] == [0, 0, 0, 0, 0, 1, 2]
+    assert [day for week in weeks for day in week if day] == \
+        list(range(1, 32))
+    assert all(len(week) == 7 for week in weeks)
+
+
+def test_month_days(fetches):
+    """Asserts if the month's days match moon_scraper, with one fetch."""
+    days = month_days(2006, 1, functions.month_table("San Diego", 2006, 1))
+    assert len(days) == 31 and len(fetches) == 1
+    for moon_day in days:
+        assert [moon_day.moonrise, moon_day.moonset] == moon_scraper(
+            "San Diego", 2006, 1, moon_day.date.day)
+        assert moon_day.phase == check_date(2006, 1, moon_day.date.day)[1]
+    assert days[6].date == dt.date(2006, 1, 7)
+    assert len(fetches) == 1
+
+
+def test_month_days_pending_and_invalid():
+    """Asserts if a month not looked up yet (or invalid) still has phases."""
+    pending = month_days(2020, 2)
+    assert len(pending) == 29
+    assert pending[0].moonrise == pending[0].moonset == PENDING
+    invalid = month_days(2020, 2, None)
+    assert [invalid[0].moonrise, invalid[0].moonset] == \
+        list(functions.NO_TABLE)
+    assert [day.phase for day in invalid] == [day.phase for day in pending]
+
+
+def test_paging_a_year_reuses_everything(fetches, loose_cities):
+    """Asserts if flipping through a year (twice) fetches 12 pages, &
+    decodes each phase picture only once."""
+    images = PhaseImages(make_image=lambda path: object())
+
+    for _ in range(2):
+        for month in range(1, 13):
+            month_rows = cached_month("San Diego", 2006, month)
+            if month_rows is MISSING:
+                month_rows = functions.month_table("San Diego", 2006, month)
+            for moon_day in month_days(2006, month, month_rows):
+                images.get(moon_day.phase)
+
+    assert len(fetches) == 12
+    assert images.decodes == 8
+    assert cached_month("San Diegooo", 2006, 1) is MISSING
+    assert cached_month("San Diego", 2007, 1) is MISSING
@@ -0,0 +1,171 @@
+"""This contains tests for the record/replay archive of month pages.
+
+Notes
+-----
+These run offline: downloads are served from the synthetic pages in
+fixtures/synthetic_pages (or the stand-in server) & counted.
+"""
+import types
+import zipfile
+
+import pytest
+
+import functions
+from functions import date_check
+from fixture_pages import page_for_link, serve_pages
+from month_cache import MonthCache
+from page_archive import (ArchiveMiss, PageArchive, archive_key,
+                          pack_archive)
+from async_scraper import run_date_checks
+
+QUERIES = [
+    ("San Diego", "2020", "5", "12"),
+    ("San Diego", "2006", "1", "7"),
+    ("Concord", "2022", "6", "8"),
+    ("ChIcAgO", "2019", "4", "10"),
+    ("San Diegooo", "2020", "5", "12"),
+]
+
+
+@pytest.fixture
+def downloads():
+    """A fake transport.fetch that serves synthetic pages, & its links."""
+    links = []
+
+    def fake_download(link):
+        links.append(link)
+        status, content = page_for_link(link)
+        return types.SimpleNamespace(status_code=status, content=content)
+
+    fake_download.links = links
+    return fake_download
+
+
+@pytest.fixture
+def cold_cache(monkeypatch):
+    """An empty MONTH_CACHE, & PAGE_ARCHIVE put back afterwards."""
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    monkeypatch.setattr(functions, "PAGE_ARCHIVE", None)
+
+
+def record(path, downloads):
+    """Record every QUERIES page into a new archive, the normal way."""
+    archive = PageArchive(path, mode="record", download=downloads)
+    functions.PAGE_ARCHIVE = archive
+    answers = [date_check(*query) for query in QUERIES]
+    archive.close()
+    return answers
+
+
+def test_archive_key():
+    """Asserts if the website part of a link doesn't change its key."""
+    key, name = archive_key("https://www.timeanddate.com/moon/usa/"
+                            "san-diego?month=5&year=2020")
+    assert key == "/moon/usa/san-diego?month=5&year=2020"
+    assert archive_key("http://127.0.0.1:8000" + key) == (key, name)
+    assert archive_key(key.replace("5", "6"))[1] != name
+
+
+def test_record_then_replay(tmp_path, downloads, cold_cache, loose_cities):
+    """Asserts if replay gives the same answers with no downloads."""
+    path = str(tmp_path / "pages.zip")
+    recorded = record(path, downloads)
+    assert len(downloads.links) == len(QUERIES)
+
+    functions.MONTH_CACHE = MonthCache()
+    archive = PageArchive(path, mode="replay", download=downloads)
+    functions.PAGE_ARCHIVE = archive
+    assert [date_check(*query) for query in QUERIES] == recorded
+    assert len(downloads.links) == len(QUERIES)
+    assert (archive.hits, archive.misses) == (len(QUERIES), 0)
+    # The invalid city's not-found page was recorded too.
+    assert recorded[-1][:2] == list(functions.NO_TABLE)
+
+
+def test_archive_is_compressed(tmp_path, downloads, cold_cache):
+    """Asserts if the zip file is much smaller than the pages in it."""
+    path = str(tmp_path / "pages.zip")
+    record(path, downloads)
+    with zipfile.ZipFile(path) as archive_zip:
+        raw = sum(info.file_size for info in archive_zip.infolist())
+        assert archive_zip.testzip() is None
+    assert (tmp_path / "pages.zip").stat().st_size < raw / 3
+
+
+def test_replay_miss(tmp_path, downloads, cold_cache):
+    """Asserts if a page missing from the archive follows on_miss."""
+    path = str(tmp_path / "pages.zip")
+    record(path, downloads)
+    link = functions.month_link("seattle", 2013, 10)
+
+    with pytest.raises(ArchiveMiss, match="seattle"):
+        PageArchive(path).fetch(link)
+
+    fallback = PageArchive(path, on_miss="fetch", download=downloads)
+    assert fallback.fetch(link).status_code == 200
+    assert downloads.links[-1] == link
+    # Replay never writes to the archive.
+    assert link not in fallback and link not in PageArchive(path)
+
+
+def test_replay_miss_is_a_lookup_failure(tmp_path, downloads, cold_cache):
+    """Asserts if a miss reaches callers as an OSError, like no internet."""
+    path = str(tmp_path / "pages.zip")
+    record(path, downloads)
+    functions.PAGE_ARCHIVE = PageArchive(path)
+    with pytest.raises(OSError):
+        functions.moon_scraper("Seattle", 2013, 10, 11)
+
+
+def test_record_skips_server_errors(tmp_path):
+    """Asserts if a 5xx answer isn't kept, so it's retried next time."""
+    archive = PageArchive(str(tmp_path / "pages.zip"), mode="record")
+    archive.record("/moon/usa/x?month=1&year=2000", 503, b"busy")
+    archive.record("/moon/usa/x?month=1&year=2000", 200, b"page")
+    archive.record("/moon/usa/x?month=1&year=2000", 200, b"again")
+    assert len(archive) == 1
+    assert archive.get("/moon/usa/x?month=1&year=2000") == (200, b"page")
+    archive.close()
+
+
+def test_record_checkpoints(tmp_path):
+    """Asserts if recorded pages are added to the file every
+    checkpoint_every pages, without a close(), so a crash doesn't lose all
+    of them, & the file is a valid zip file in between."""
+    path = str(tmp_path / "pages.zip")
+    archive = PageArchive(path, mode="record", checkpoint_every=2)
+    for month in range(1, 6):
+        archive.record(f"/moon/usa/x?month={month}&year=2000", 200, b"page")
+        with zipfile.ZipFile(path) as crashed:
+            assert len(crashed.namelist()) == month // 2 * 2
+
+    archive.checkpoint()
+    with zipfile.ZipFile(path) as crashed:
+        assert len(crashed.namelist()) == 5
+    archive.close()
+    replay = PageArchive(path)
+    assert len(replay) == 5
+    assert replay.get("/moon/usa/x?month=5&year=2000") == (200, b"page")
+    replay.close()
+
+
+def test_pack_archive(tmp_path, downloads, cold_cache):
+    """Asserts if packing records every month once, even when re-run."""
+    path = str(tmp_path / "pages.zip")
+    assert pack_archive(path, ["San Diego", "Concord"], [2020],
+                        download=downloads) == 24
+    assert pack_archive(path, ["San Diego", "Seattle"], [2020],
+                        download=downloads) == 36
+    assert len(downloads.links) == 36
+
+
+def test_async_replay(tmp_path, downloads, cold_cache, monkeypatch):
+    """Asserts if AsyncMoonClient replays without reaching the server."""
+    path = str(tmp_path / "pages.zip")
+    with serve_pages() as server:
+        monkeypatch.setattr(functions, "BASE_URL", server.base_url)
+        recorded = record(path, downloads)
+        functions.MONTH_CACHE = MonthCache()
+        functions.PAGE_ARCHIVE = PageArchive(path)
+        assert run_date_checks(QUERIES) == recorded
+        assert server.request_count == 0
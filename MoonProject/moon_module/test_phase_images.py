@@ -0,0 +1,140 @@
+"""This contains tests (& a soak test) for the GUI's phase picture registry.
+
+Notes
+-----
+A "click" here is what upon_click does for the picture: check the date,
+then put the phase's picture into the one picture label. Without a display,
+the pictures are decoded with Pillow alone & the label is a stand-in that
+only keeps what it was configured with.
+"""
+import tracemalloc
+
+import pytest
+from PIL import Image
+
+from functions import OUT_OF_RANGE, check_date
+from lunation_index import PRIMARY_PHASES
+from phase_images import FALLBACK, PhaseImages, tk_thumbnail
+
+CLICKS = 5000
+
+
+def pil_image(path: str):
+    """Decode a picture without Tk."""
+    with Image.open(path) as image:
+        image.load()
+        return image.copy()
+
+
+class StandInLabel:
+    """Keeps what it was configured with, like a tk.Label would."""
+
+    def __init__(self):
+        self.options = {}
+
+    def configure(self, **options):
+        self.options.update(options)
+
+
+def click(images: PhaseImages, label, count: int):
+    """What clicking Enter does to the picture, for day `count` of 2020."""
+    date, moon_phase = check_date("2020", str(count % 12 + 1),
+                                  str(count % 28 + 1))
+    label.configure(image=images.get(moon_phase))
+    return moon_phase
+
+
+def test_each_picture_is_decoded_once():
+    """Asserts if the same object comes back & nothing is decoded twice."""
+    images = PhaseImages(make_image=pil_image)
+
+    assert images.get("Full Moon") is images.get("Full Moon")
+    assert images.decodes == 1
+    assert images.get("Not a phase") is images.get(FALLBACK)
+    assert images.decodes == 2
+
+    images.preload()
+    assert images.decodes == len(images.names()) == 10
+
+
+def test_every_label_has_a_picture():
+    """Asserts if every phase check_date can give has its own picture."""
+    images = PhaseImages(make_image=pil_image)
+    assert set(images.names()) == {*PRIMARY_PHASES, "Waxing Crescent",
+                                   "Waxing Gibbous", "Waning Gibbous",
+                                   "Waning Crescent", FALLBACK, OUT_OF_RANGE}
+    assert check_date("1850", "6", "1")[1] in images.names()
+
+
+def test_soak_flat_memory_and_pictures():
+    """Asserts if thousands of clicks keep memory & the number of decoded
+    pictures flat."""
+    images = PhaseImages(make_image=pil_image)
+    label = StandInLabel()
+    # Warm up, so every phase that'll come up is already decoded.
+    for count in range(500):
+        click(images, label, count)
+    decoded = (len(images), images.decodes)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    shown = set()
+    for count in range(CLICKS):
+        click(images, label, count)
+        shown.add(id(label.options["image"]))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # The set of ids is allocated here, so leave this file out.
+    not_this_file = [tracemalloc.Filter(False, __file__)]
+    growth = sum(stat.size_diff for stat in after.filter_traces(
+        not_this_file).compare_to(before.filter_traces(not_this_file),
+                                  "filename"))
+    # One decoded picture alone is ~270KB, so a leak per click can't hide.
+    assert growth < 64 * 1024
+
+    # Every click reused a picture the warm up already decoded.
+    assert (len(images), images.decodes) == decoded
+    assert len(shown) <= len(images) <= len(images.names())
+    assert list(label.options) == ["image"]
+
+
+def test_soak_real_tk_label():
+    """Same soak, with a real tk.Label. (Skipped if there's no display)"""
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display to make a Tk window on")
+
+    try:
+        images = PhaseImages()
+        label_img = tk.Label(root, image=images.get(FALLBACK))
+        label_img.grid(row=0)
+        for count in range(CLICKS):
+            moon_phase = click(images, label_img, count)
+            if count % 500 == 0:
+                root.update_idletasks()
+
+        assert label_img.cget("image") == str(images.get(moon_phase))
+        assert len(root.winfo_children()) == 1
+        assert images.decodes <= len(images.names())
+    finally:
+        root.destroy()
+
+
+def test_real_tk_thumbnails():
+    """Asserts if the month view's pictures are 50x50. (Needs a display)"""
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display to make a Tk window on")
+
+    try:
+        thumbnails = PhaseImages(make_image=tk_thumbnail)
+        thumbnail = thumbnails.get("Full Moon")
+        assert (thumbnail.width(), thumbnail.height()) == (50, 50)
+        assert thumbnails.get("Full Moon") is thumbnail
+    finally:
+        root.destroy()
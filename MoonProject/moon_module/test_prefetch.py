@@ -0,0 +1,154 @@
+"""This contains tests for the GUI's background prefetcher.
+
+Notes
+-----
+These run offline: transport.fetch is swapped for a fake that serves the
+synthetic pages in fixtures/synthetic_pages & records every link.
+"""
+import time
+import threading
+
+import functions
+from month_cache import MISSING, MonthCache
+from metrics import Metrics
+from month_view import cached_month
+from prefetch import Prefetcher, neighbor_months
+
+
+def wait_until(check, timeout: float = 5):
+    """Wait for check() to be True, like the GUI would (without blocking)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return
+        time.sleep(0.005)
+    raise AssertionError("never happened")
+
+
+def test_neighbor_months():
+    """Asserts if the next & previous months cross years."""
+    assert neighbor_months(2006, 1) == [(2006, 2), (2005, 12)]
+    assert neighbor_months(2020, 12) == [(2021, 1), (2020, 11)]
+
+
+def test_warm_fetches_next_and_previous_month(fetches):
+    """Asserts if paging after a lookup is served from memory."""
+    prefetcher = Prefetcher()
+    functions.month_table("San Diego", 2006, 7)
+    prefetcher.warm("San Diego", 2006, 7)
+
+    wait_until(lambda: prefetcher.stats["fetched"] == 2)
+    assert len(fetches) == 3
+    assert cached_month("San Diego", 2006, 8) is not MISSING
+    assert cached_month("San Diego", 2006, 6) is not MISSING
+    prefetcher.close()
+
+
+def test_recent_cities_and_skips(fetches, monkeypatch):
+    """Asserts if recent cities get the same month, & cached ones (or
+    invalid cities) are skipped instead of fetched again."""
+    loads = []
+    prefetcher = Prefetcher(load=lambda *key: loads.append(key), recent=2)
+    monkeypatch.setattr(functions, "STRICT_CITIES", True)
+    assert prefetcher.plan("Hyrule", 2020, 5) == []
+    monkeypatch.setattr(functions, "STRICT_CITIES", False)
+
+    for city in ("Seattle", "Chicago", "SEATTLE", "Dallas", "Phoenix"):
+        prefetcher.cancel()
+        prefetcher.warm(city, 2020, 5)
+    # Chicago fell off, since only 2 cities besides the current one stay,
+    # & SEATTLE made Seattle recent again.
+    assert list(prefetcher.recent_cities) == ["seattle", "dallas", "phoenix"]
+    assert prefetcher.plan("Chicago", 2020, 5) == [
+        ("Chicago", 2020, 6), ("Chicago", 2020, 4), ("Phoenix", 2020, 5),
+        ("Dallas", 2020, 5), ("SEATTLE", 2020, 5)]
+    assert prefetcher.plan("Phoenix", 2020, 5)[2:] == [
+        ("Dallas", 2020, 5), ("SEATTLE", 2020, 5)]
+
+    prefetcher.close()
+
+    functions.MONTH_CACHE.put(("concord", 2022, 7), {1: ("x", "y")})
+    prefetcher = Prefetcher(load=functions.month_table)
+    prefetcher.warm("Concord", 2022, 6)
+    wait_until(lambda: sum(prefetcher.stats.values()) == 2)
+    assert prefetcher.stats == {"fetched": 1, "skipped": 1, "cancelled": 0,
+                                "failed": 0}
+    assert fetches == [functions.month_link("concord", 2022, 5)]
+    prefetcher.close()
+
+
+def test_cancel_and_busy(fetches):
+    """Asserts if nothing is fetched while the GUI is busy, & a cancel
+    (the input changed) drops the whole plan."""
+    busy = threading.Event()
+    busy.set()
+    prefetcher = Prefetcher(busy=busy.is_set, idle_wait=0.001)
+    prefetcher.warm("San Diego", 2006, 7)
+
+    time.sleep(0.05)
+    assert fetches == []
+    prefetcher.cancel()
+    busy.clear()
+    wait_until(lambda: prefetcher.pending == 0)
+    time.sleep(0.05)
+    assert fetches == []
+    assert prefetcher.stats["cancelled"] == 2
+    prefetcher.close()
+
+
+def test_concurrency_cap(monkeypatch):
+    """Asserts if at most `workers` prefetches run at the same time."""
+    running = []
+    most = []
+    lock = threading.Lock()
+
+    def slow_load(city, year, month):
+        with lock:
+            running.append(city)
+            most.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(city)
+
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    prefetcher = Prefetcher(load=slow_load, workers=2, recent=5)
+    for city in ("Seattle", "Chicago", "Dallas", "Phoenix", "Concord"):
+        prefetcher.recent_cities[functions.canonical_city(city)] = city
+    prefetcher.warm("San Diego", 2020, 5)
+    wait_until(lambda: prefetcher.stats["fetched"] == 7)
+    assert max(most) == 2
+    prefetcher.close()
+
+
+def test_failed_prefetch_is_only_counted(monkeypatch):
+    """Asserts if a prefetch that can't connect doesn't break anything."""
+    def no_fetch(link, **_):
+        raise ConnectionError("no internet")
+
+    monkeypatch.setattr(functions, "fetch", no_fetch)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    prefetcher = Prefetcher()
+    prefetcher.warm("San Diego", 2006, 7)
+    wait_until(lambda: prefetcher.stats["failed"] == 2)
+    prefetcher.close()
+
+
+def test_any_error_is_counted(fetches, monkeypatch):
+    """Asserts if an unexpected error (not an OSError) is counted in stats
+    & METRICS, & the threads keep prefetching after it."""
+    def broken_parse(content):
+        raise AttributeError("unexpected page")
+
+    metrics = Metrics()
+    saved_parse = functions.parse_moon_table
+    monkeypatch.setattr(functions, "METRICS", metrics)
+    monkeypatch.setattr(functions, "parse_moon_table", broken_parse)
+    prefetcher = Prefetcher(workers=1)
+    prefetcher.warm("San Diego", 2006, 7)
+    wait_until(lambda: prefetcher.stats["failed"] == 2)
+    assert metrics.counters["prefetch_errors"] == 2
+
+    monkeypatch.setattr(functions, "parse_moon_table", saved_parse)
+    prefetcher.warm("San Diego", 2006, 7)
+    wait_until(lambda: prefetcher.stats["fetched"] == 2)
+    prefetcher.close()
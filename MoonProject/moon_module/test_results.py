@@ -0,0 +1,155 @@
+"""This contains tests for the compact (& columnar) lookup results.
+
+Notes
+-----
+These run offline: transport.fetch is swapped for a fake that serves the
+synthetic pages in fixtures/synthetic_pages.
+"""
+import csv
+import sys
+import datetime as dt
+
+import pytest
+
+import functions
+from functions import date_check
+from results import (INVALID_CITY, INVALID_DATE, MAX_CITIES, NO_EVENT,
+                     NO_TIME, OK, OUT_OF_RANGE, PHASES, MoonResult,
+                     MoonResults, moon_result, parse_clock)
+
+QUERIES = [
+    ("San Diego", "2000", "1", "5"),
+    ("San Diego", "2020", "05", "12"),
+    ("San Diego", "10000", "5", "12"),
+    ("San Diegooo", "2020", "5", "12"),
+    ("Concord", "2022", "6", "8"),
+    ("ChIcAgO", "2019", "4", "10"),
+    ("DaLLas", "2010", "12", "27"),
+    ("PHO!!enix", "2027", "7", "27"),
+]
+
+
+def test_parse_clock():
+    """Asserts if moonrise/moonset str become the right minutes."""
+    assert parse_clock("12:23 am") == 23
+    assert parse_clock("11:55 am") == 11 * 60 + 55
+    assert parse_clock("12:02 pm") == 12 * 60 + 2
+    assert parse_clock("11:50 pm") == 23 * 60 + 50
+    assert parse_clock("No moonrise") == parse_clock("No moonset") \
+        == NO_EVENT
+    assert parse_clock("Invalid Date") == NO_TIME
+
+
+def test_moon_result_round_trip(fetches):
+    """Asserts if every date_check output survives a MoonResult."""
+    for query in QUERIES:
+        output = date_check(*query)
+        result = MoonResult.from_output(output)
+        assert result.to_output() == output
+        assert moon_result(*query) == result
+
+
+def test_moon_result_fields(fetches):
+    """Asserts if the codes & times say what date_check's str said."""
+    result = moon_result("San Diego", "2020", "5", "12")
+    assert result == (PHASES.index("Waning Gibbous"), OK, 23, 10 * 60 + 38)
+    assert result.phase_name == "Waning Gibbous"
+    assert result.status_name == "ok"
+    assert result.rise_time == dt.time(0, 23)
+    assert result.set_time == dt.time(10, 38)
+
+    assert moon_result("PHO!!enix", "2027", "7", "27").moonrise == NO_EVENT
+    assert moon_result("San Diego", "2020", "13", "1").status == INVALID_DATE
+    assert moon_result("San Diegooo", "2020", "5", "12").status \
+        == INVALID_CITY
+    far = MoonResult.from_output(["9:04 am", "8:24 pm",
+                                  functions.OUT_OF_RANGE])
+    assert far == (-1, OUT_OF_RANGE, 9 * 60 + 4, 20 * 60 + 24)
+    assert far.phase_name is None
+    assert far.to_output()[2] == functions.OUT_OF_RANGE
+
+
+def test_moon_result_is_compact():
+    """Asserts if a MoonResult has no __dict__ & can't be changed."""
+    result = MoonResult(0, OK, 1, 2)
+    assert not hasattr(result, "__dict__")
+    with pytest.raises(AttributeError):
+        result.phase = 1
+
+
+def test_moon_results_rows(fetches):
+    """Asserts if MoonResults gives back exactly what was put in."""
+    results = MoonResults(capacity=2)
+    rows = [(query[0], dt.date(2000 + count, 1, count + 1),
+             MoonResult.from_output(date_check(*query)))
+            for count, query in enumerate(QUERIES)]
+    results.extend(rows)
+
+    assert len(results) == len(QUERIES)
+    assert list(results) == rows
+    assert results.cities.count("San Diego") == 1
+    assert results.array.itemsize == 16
+    assert results.nbytes == 16 * len(QUERIES)
+
+
+def test_too_many_cities():
+    """Asserts if a city past MAX_CITIES is refused, not given a wrapped
+    around code, & the rows already there are kept."""
+    results = MoonResults()
+    result = MoonResult(0, OK, 60, 120)
+    for code in range(MAX_CITIES):
+        results.append(f"city {code}", "2020-05-12", result)
+    results.append("city 0", "2020-05-13", result)
+    with pytest.raises(ValueError):
+        results.append("one city too many", "2020-05-12", result)
+
+    assert len(results) == MAX_CITIES + 1
+    assert results[-1][0] == "city 0"
+    assert results[MAX_CITIES - 1][0] == f"city {MAX_CITIES - 1}"
+
+
+def test_moon_results_memory():
+    """Asserts if 100k rows use far less memory than 100k output lists."""
+    outputs = [["12:23 am", "10:38 am", "Waning Gibbous"]
+               for _ in range(100000)]
+    list_bytes = sum(sys.getsizeof(output) for output in outputs)
+
+    results = MoonResults()
+    result = MoonResult.from_output(outputs[0])
+    for count in range(100000):
+        results.append("San Diego", "2020-05-12", result)
+    assert results.nbytes * 5 < list_bytes
+
+
+def test_to_csv(tmp_path, fetches):
+    """Asserts if the CSV has names & HH:MM times instead of codes."""
+    results = MoonResults()
+    for query in QUERIES:
+        results.append(query[0], "2020-01-01", moon_result(*query))
+    path = tmp_path / "results.csv"
+    results.to_csv(str(path), chunk_size=3)
+
+    with open(path, newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert len(rows) == len(QUERIES)
+    assert rows[1] == {"city": "San Diego", "date": "2020-01-01",
+                       "phase": "Waning Gibbous", "status": "ok",
+                       "moonrise": "00:23", "moonset": "10:38"}
+    assert rows[2]["status"] == "invalid date" and rows[2]["phase"] == ""
+    assert rows[3]["status"] == "invalid city" and rows[3]["moonrise"] == ""
+    assert rows[7]["moonrise"] == ""
+
+
+def test_to_parquet(tmp_path, fetches):
+    """Asserts if the Parquet file reads back the same. (Needs pyarrow)"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    results = MoonResults()
+    for query in QUERIES:
+        results.append(query[0], "2020-01-01", moon_result(*query))
+    path = str(tmp_path / "results.parquet")
+    results.to_parquet(path)
+
+    table = pq.read_table(path).to_pylist()
+    assert table[1]["phase"] == "Waning Gibbous"
+    assert table[1]["moonrise"] == 23
+    assert table[3]["moonrise"] is None
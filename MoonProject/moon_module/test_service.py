@@ -0,0 +1,211 @@
+"""This contains tests for the HTTP/JSON service.
+
+Notes
+-----
+These run the service on localhost, against serve_pages, a local
+stand-in for the website that serves the synthetic pages in
+fixtures/synthetic_pages, so no internet is needed.
+"""
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import functions
+from functions import date_check
+from fixture_pages import serve_pages
+from month_cache import MonthCache
+from metrics import Metrics
+from service import MAX_RANGE_DAYS, MoonService, make_app
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Point the service at a stand-in server, with a cold cache."""
+    with serve_pages(latency=0.02) as server:
+        monkeypatch.setattr(functions, "BASE_URL", server.base_url)
+        monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+        yield server
+
+
+def with_service(test, **settings):
+    """Run test(client) against a running service, & give what it gave."""
+    async def run():
+        app = make_app(MoonService(**settings))
+        async with TestClient(TestServer(app)) as client:
+            return await test(client)
+    return asyncio.run(run())
+
+
+async def get_json(client, path: str, **params):
+    """GET a path, & give (status, JSON body)."""
+    async with client.get(path, params=params) as answer:
+        return answer.status, await answer.json()
+
+
+def test_phase(stand_in):
+    """Asserts if /phase answers without touching the website."""
+    async def test(client):
+        return await get_json(client, "/phase", date="2000-01-05")
+
+    assert with_service(test) == (200, {"date": "2000-01-05",
+                                        "phase": "New Moon"})
+    assert stand_in.request_count == 0
+
+
+def test_riseset_matches_date_check(stand_in, monkeypatch):
+    """Asserts if /riseset gives the same as date_check."""
+    async def test(client):
+        return await get_json(client, "/riseset", city="San Diego",
+                              date="2020-05-12")
+
+    status, body = with_service(test)
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+    assert status == 200
+    assert [body["moonrise"], body["moonset"], body["phase"]] == \
+        date_check("San Diego", "2020", "5", "12")
+    assert body["freshness"] == "fresh"
+
+
+def test_bad_requests(stand_in):
+    """Asserts if bad parameters get a 400 & an error, not a crash."""
+    async def test(client):
+        return [await get_json(client, "/riseset", city="San Diego",
+                               date="2020-13-01"),
+                await get_json(client, "/riseset", date="2020-05-12"),
+                await get_json(client, "/range", city="San Diego",
+                               start="2020-01-01", end="2030-01-01"),
+                await get_json(client, "/compare", date="2020-05-12")]
+
+    for status, body in with_service(test):
+        assert status == 400 and "error" in body
+    assert stand_in.request_count == 0
+
+
+def test_range(stand_in):
+    """Asserts if /range gives every day, downloading each month once."""
+    async def test(client):
+        return await get_json(client, "/range", city="San Diego",
+                              start="2006-01-30", end="2006-07-02")
+
+    status, body = with_service(test)
+    assert status == 200
+    days = body["days"]
+    assert len(days) == 154
+    assert days[0]["date"] == "2006-01-30" and days[-1]["date"] == "2006-07-02"
+    # Only 2006-1 & 2006-7 are saved, the rest are not-found pages.
+    assert days[0]["moonrise"] != "Invalid City Name OR"
+    assert days[10]["moonrise"] == "Invalid City Name OR"
+    assert stand_in.request_count == 7
+    assert MAX_RANGE_DAYS >= 366
+
+
+def test_compare_shares_one_cache(stand_in, loose_cities):
+    """Asserts if many clients asking for the same month share a download."""
+    cities = ["San Diego", "Concord", "ChIcAgO", "San Diegooo"]
+
+    async def test(client):
+        answers = await asyncio.gather(*(
+            get_json(client, "/compare", city=cities, date="2020-05-12")
+            for _ in range(20)))
+        answers.append(await get_json(client, "/riseset", city="San Diego",
+                                      date="2020-05-20"))
+        return answers
+
+    answers = with_service(test)
+    assert all(status == 200 for status, _ in answers)
+    assert answers[0][1] == answers[19][1]
+    assert [answer["city"] for answer in answers[0][1]["cities"]] == cities
+    assert answers[0][1]["cities"][3]["moonrise"] == "Invalid City Name OR"
+    assert stand_in.request_count == 4
+
+
+def test_batch(stand_in):
+    """Asserts if /batch answers in order, with errors for bad queries."""
+    queries = [{"city": "San Diego", "date": "2006-01-07"},
+               {"city": "San Diego", "year": 2006, "month": 7, "day": 16},
+               {"city": "San Diego", "date": "not a date"},
+               {"date": "2020-01-01"}]
+
+    async def test(client):
+        async with client.post("/batch", json={"queries": queries}) as reply:
+            first = reply.status, await reply.json()
+        async with client.post("/batch", data=b"{oops") as reply:
+            return first, reply.status
+
+    (status, body), bad_status = with_service(test)
+    answers = body["answers"]
+    assert status == 200 and bad_status == 400
+    assert answers[0]["date"] == "2006-01-07"
+    assert answers[1]["date"] == "2006-07-16"
+    assert "bad query" in answers[2]["error"]
+    assert answers[3]["moonrise"] == "Invalid City Name OR"
+
+
+def test_concurrency_limit(stand_in):
+    """Asserts if requests past max_concurrent + max_waiting get a 503."""
+    async def test(client):
+        return await asyncio.gather(*(
+            get_json(client, "/riseset", city="San Diego",
+                     date=f"2006-01-{day:02d}") for day in range(1, 31)))
+
+    answers = with_service(test, max_concurrent=2, max_waiting=3)
+    statuses = [status for status, _ in answers]
+    assert statuses.count(200) >= 5
+    assert 503 in statuses
+    assert stand_in.request_count == 1
+
+
+def test_upstream_error(monkeypatch):
+    """Asserts if an unreachable website gets a 502, not a crash."""
+    monkeypatch.setattr(functions, "BASE_URL", "http://127.0.0.1:9")
+    monkeypatch.setattr(functions, "MONTH_CACHE", MonthCache())
+
+    async def test(client):
+        return await get_json(client, "/riseset", city="Seattle",
+                              date="2013-10-11")
+
+    status, body = with_service(test)
+    assert status == 502 and "lookup failed" in body["error"]
+
+
+def test_parse_error(stand_in, monkeypatch):
+    """Asserts if a page that won't parse gets a 502 that says so, & only
+    fails its own query in a batch."""
+    def broken_parse(content):
+        raise AttributeError("unexpected page")
+
+    monkeypatch.setattr(functions, "parse_moon_table", broken_parse)
+
+    async def test(client):
+        riseset = await get_json(client, "/riseset", city="San Diego",
+                                 date="2020-05-12")
+        async with client.post("/batch", json=[
+                {"city": "Seattle", "date": "2013-10-11"},
+                {"city": "Seattle", "date": "2013-10-32"}]) as reply:
+            return riseset, (reply.status, await reply.json())
+
+    (status, body), (batch_status, batch) = with_service(test)
+    assert status == 502
+    assert "couldn't parse" in body["error"]
+    assert "unexpected page" in body["error"]
+    assert batch_status == 200
+    assert "couldn't parse" in batch["answers"][0]["error"]
+    assert batch["answers"][1]["error"].startswith("bad query")
+
+
+def test_metrics_and_health(stand_in, monkeypatch):
+    """Asserts if /metrics & /health say what's been going on."""
+    monkeypatch.setattr(functions, "METRICS", Metrics())
+
+    async def test(client):
+        await get_json(client, "/riseset", city="San Diego",
+                       date="2020-05-12")
+        async with client.get("/metrics") as reply:
+            text = await reply.text()
+        return text, await get_json(client, "/health")
+
+    text, (status, health) = with_service(test)
+    assert "moon_cache_misses_total 1\n" in text
+    assert status == 200
+    assert health["served"] == 1 and health["cached_months"] == 1
@@ -0,0 +1,72 @@
+"""This contains tests for the pooled HTTP transport.
+
+Notes
+-----
+These run against serve_pages, a local stand-in for the website, which
+can be told to be slow or to answer with 503s.
+"""
+import pytest
+import requests
+
+import transport
+from transport import configure_transport, backoff_delay, fetch
+from fixture_pages import serve_pages
+
+
+@pytest.fixture
+def settings():
+    """Fast retries for the tests, & the old settings put back after."""
+    old_settings = dict(transport.SETTINGS)
+    configure_transport(backoff_base=0.001, backoff_cap=0.01)
+    yield transport.SETTINGS
+    configure_transport(**old_settings)
+
+
+def test_fetch_reuses_connections(settings):
+    """Asserts if many fetches share one keep-alive connection."""
+    with serve_pages() as server:
+        for month in range(1, 13):
+            page = fetch(f"{server.base_url}/moon/usa/san-diego"
+                         f"?month={month}&year=2006")
+            assert page.status_code in (200, 404)
+
+        assert server.request_count == 12
+        assert server.connection_count == 1
+
+
+def test_fetch_retries_5xx(settings):
+    """Asserts if 503s are retried until one works, or retries run out."""
+    link_path = "/moon/usa/san-diego?month=1&year=2006"
+    with serve_pages() as server:
+        server.failures = 2
+        assert fetch(server.base_url + link_path).status_code == 200
+        assert server.request_count == 3
+
+        configure_transport(retries=1)
+        server.failures = 5
+        assert fetch(server.base_url + link_path).status_code == 503
+        assert server.request_count == 5
+
+
+def test_fetch_read_timeout(settings):
+    """Asserts if a stalled server raises a timeout instead of hanging."""
+    configure_transport(read_timeout=0.05, retries=1)
+    with serve_pages(latency=0.5) as server:
+        with pytest.raises(requests.Timeout):
+            fetch(f"{server.base_url}/moon/usa/san-diego?month=1&year=2006")
+        assert server.request_count == 2
+
+
+def test_backoff_delay(settings):
+    """Asserts if the waits are random but never above the ceiling."""
+    configure_transport(backoff_base=1.0, backoff_cap=5.0)
+    for attempt, ceiling in ((0, 1.0), (1, 2.0), (2, 4.0), (5, 5.0)):
+        delays = [backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_configure_transport_unknown_setting():
+    """Asserts if a misspelled setting is caught."""
+    with pytest.raises(TypeError):
+        configure_transport(pool_sise=4)
@@ -0,0 +1,118 @@
+"""This contains the HTTP transport that month_table downloads pages with.
+
+Notes
+-----
+A bare requests.get() opens a new connection every time, never times out,
+& gives up on the first hiccup. fetch() instead goes through one shared
+requests.Session with:
+1. A pool of keep-alive connections (pool_size per host)
+2. Connect & read timeouts, so a stalled website can't hang the GUI
+3. Retries on connection errors & 5xx answers, waiting a random
+   ("jittered") exponentially growing time between tries
+configure_transport() changes any of these for the whole module.
+"""
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Answers worth trying again, since the next try might work.
+RETRY_STATUSES = frozenset((500, 502, 503, 504))
+
+SETTINGS = {
+    "pool_size": 16,
+    "connect_timeout": 5.0,
+    "read_timeout": 15.0,
+    "retries": 3,
+    "backoff_base": 0.25,
+    "backoff_cap": 4.0,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure_transport(**settings):
+    """Change transport settings. (Same names as the SETTINGS keys)
+
+    Parameters
+    ----------
+    pool_size : int
+        Keep-alive connections kept open per host.
+    connect_timeout, read_timeout : float
+        Seconds to wait for a connection, & then for each read.
+    retries : int
+        Extra tries after the first one fails. (0 = no retries)
+    backoff_base, backoff_cap : float
+        Seconds to wait before retry n is random(0, base * 2**n),
+        but never more than backoff_cap.
+    """
+    global _session
+
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise TypeError(f"Unknown transport settings: {sorted(unknown)}")
+
+    with _session_lock:
+        SETTINGS.update(settings)
+        # The next fetch() makes a new session with the new pool size.
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """Get the shared requests.Session, making it on first use."""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=SETTINGS["pool_size"],
+                                  pool_maxsize=SETTINGS["pool_size"])
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def backoff_delay(attempt: int):
+    """Seconds to wait before retry number `attempt`. (Full jitter)"""
+    ceiling = min(SETTINGS["backoff_cap"],
+                  SETTINGS["backoff_base"] * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def fetch(link: str):
+    """Download a page through the shared session, retrying if needed.
+
+    Parameter
+    ---------
+    link : str
+        The page to download.
+
+    Returns
+    -------
+    page : requests.Response
+        The last answer. (A 5xx one, if every try got a 5xx)
+
+    Raises
+    ------
+    requests.RequestException
+        If the last try couldn't connect or timed out.
+    """
+    timeout = (SETTINGS["connect_timeout"], SETTINGS["read_timeout"])
+    attempt = 0
+    while True:
+        try:
+            page = get_session().get(link, timeout=timeout)
+            if (page.status_code not in RETRY_STATUSES
+                    or attempt >= SETTINGS["retries"]):
+                return page
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= SETTINGS["retries"]:
+                raise
+
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
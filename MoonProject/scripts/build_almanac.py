@@ -0,0 +1,48 @@
+"""Precompute every lookup of some cities & years into an almanac file.
+
+Notes
+-----
+For example, to save 10 cities' days from 2020 to 2030:
+    python build_almanac.py top_cities.almanac --years 2020 2030
+    python build_almanac.py sd.almanac --cities "San Diego" "Concord, CA"
+Then, with MOON_ALMANAC_PATH=top_cities.almanac set, the GUI, moon_cli.py
+& date_check answer those cities & days without parsing or internet.
+(Set MOON_ARCHIVE_PATH too, to build it from a replay archive instead)
+See moon_module/almanac.py for the rest.
+"""
+import os
+import sys
+import argparse
+import datetime as dt
+
+# Unlike the GUI, this can be run from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..'))
+from moon_module.almanac import RECORD, build_almanac
+from pack_archive import TOP_CITIES
+
+
+def main(argv=None):
+    """Build the almanac, & print how big it is."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="the almanac file (replaced)")
+    parser.add_argument("--cities", nargs="+", default=TOP_CITIES,
+                        help="US cities (default: the 10 biggest)")
+    parser.add_argument("--years", nargs=2, type=int, metavar=("FIRST",
+                        "LAST"), default=(2020, 2030))
+    parser.add_argument("--workers", type=int, default=16,
+                        help="most month pages downloading at once")
+    args = parser.parse_args(argv)
+
+    first, last = args.years
+    first_date, last_date = dt.date(first, 1, 1), dt.date(last, 12, 31)
+    slugs = build_almanac(args.path, args.cities, first_date, last_date,
+                          workers=args.workers)
+    days = (last_date - first_date).days + 1
+    print(f"{args.path}: {len(slugs)} cities x {days} days "
+          f"({len(slugs) * days * RECORD.size / 2 ** 20:.1f} MiB of records)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
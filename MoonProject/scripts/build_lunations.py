@@ -0,0 +1,37 @@
+"""Build moon_module/data/lunations.bin, the lunation index, again.
+
+Notes
+-----
+The file is in the repo already, so this is only needed after changing
+lunation_index.py (or lunar_engine's TT - UT). It needs NumPy:
+    python build_lunations.py
+    python build_lunations.py /tmp/lunations.bin (to compare it first)
+It comes out the same, byte for byte, on any machine.
+See moon_module/lunation_index.py for the rest.
+"""
+import os
+import sys
+import argparse
+
+# Unlike the GUI, this can be run from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..'))
+from moon_module.lunation_index import (FIRST_DATE, INDEX_PATH, LAST_DATE,
+                                        build_index)
+
+
+def main(argv=None):
+    """Build the index, & print how big it is."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default=INDEX_PATH,
+                        help="the index file (default: the one in the repo)")
+    args = parser.parse_args(argv)
+
+    build_index(args.path, FIRST_DATE.year, LAST_DATE.year)
+    print(f"{args.path}: {FIRST_DATE.year} to {LAST_DATE.year} "
+          f"({os.path.getsize(args.path) / 2 ** 10:.1f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
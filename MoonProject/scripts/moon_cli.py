@@ -0,0 +1,21 @@
+"""Headless (no GUI) moon lookups, for servers & big batches of queries.
+
+Notes
+-----
+Reads (city, date) queries as CSV or JSONL & prints one JSON line per
+query, in the same order. For example:
+    python moon_cli.py queries.csv > answers.jsonl
+    python moon_cli.py --phase-only < queries.jsonl
+    python moon_cli.py --offline --executor process --workers 4 big.csv
+See moon_module/cli.py (or python moon_cli.py --help) for the rest.
+"""
+import os
+import sys
+
+# Unlike the GUI, this can be run from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..'))
+from moon_module.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
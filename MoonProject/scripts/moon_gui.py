@@ -27,144 +27,443 @@ tuned a lot of the things to my specific project.
 """
 import sys
 import tkinter as tk
-from tkinter import font
-
-from PIL import Image, ImageTk
+from tkinter import font, ttk
 
 sys.path.append('../')
-from moon_module.functions import date_check
-
-
-root = tk.Tk()
-root.title("Moon Info GUI")
-root.iconbitmap("../moon_images/moon.ico")
-root.resizable(width=False, height=False)
-
-default_font = font.nametofont("TkDefaultFont")
-default_font.configure(family="Verdana", size=9)
-
-# create the main containers
-frame_date = tk.Frame(root, bg="gray32", width=310, height=30, padx=4, pady=4)
-frame_city = tk.Frame(root, bg="gray32", width=310, height=30, padx=4, pady=4)
-frame_img = tk.Frame(root, bg="gray32", width=310, height=310, padx=4, pady=2)
-frame_info = tk.Frame(root, bg="gray32", width=310, height=90, padx=4, pady=4)
-
-# layout the main containers
-frame_date.grid(row=0, sticky="ew")
-frame_city.grid(row=1, sticky="ew")
-frame_img.grid(row=2, sticky="ew")
-frame_info.grid(row=3, sticky="ew")
-
-# widgets for frame_date
-label_date = tk.Label(frame_date, text="Date:")
-label_month = tk.Label(frame_date, text="MM")
-label_day = tk.Label(frame_date, text="DD")
-label_year = tk.Label(frame_date, text="YYYY")
-entry_month = tk.Entry(frame_date, width=3)
-entry_day = tk.Entry(frame_date, width=3)
-entry_year = tk.Entry(frame_date, width=5)
-
-# layout for frame_date
-label_date.grid(row=0)
-label_month.grid(row=0, column=1, padx=6)
-label_day.grid(row=0, column=3, padx=6)
-label_year.grid(row=0, column=5, padx=6)
-entry_month.grid(row=0, column=2)
-entry_day.grid(row=0, column=4)
-entry_year.grid(row=0, column=6)
-
-# widgets for frame_city
-label_city = tk.Label(frame_city, text="US City:")
-entry_city = tk.Entry(frame_city, width=24)
-
-# layout for frame_city
-label_city.grid(row=0)
-entry_city.grid(row=0, column=1, padx=6)
-
-# default image for frame_img & UPPER_CASE because it's a constant.
-DEFAULT_IMG = "../moon_images/moon_phases/Invalid Date.png"
-
-# widgets for frame_img
-img_moon = ImageTk.PhotoImage(Image.open(DEFAULT_IMG))
-label_img = tk.Label(frame_img, image=img_moon)
-
-# layout for frame_img
-label_img.grid(row=0)
-
-# widgets for frame_info
-label_phase = tk.Label(frame_info, text="Moon Phase:")
-label_rise = tk.Label(frame_info, text="Moonrise:")
-label_set = tk.Label(frame_info, text="Moonset:")
-phase_input = tk.Label(frame_info, text="Awaiting Moon Phase")
-rise_input = tk.Label(frame_info, text="Awaiting Moon Rise")
-set_input = tk.Label(frame_info, text="Awaiting Moon Set")
-
-# layout for frame_info
-label_phase.grid(row=0, sticky="w", padx=(0, 5))
-label_rise.grid(row=1, sticky="w", pady=4)
-label_set.grid(row=2, sticky="w")
-phase_input.grid(row=0, column=1, sticky="w")
-rise_input.grid(row=1, column=1, sticky="w")
-set_input.grid(row=2, column=1, sticky="w")
-
-
-def upon_click():
-    """Takes GUI inputs & outputs moonphase, pic of phase, & moonrise/set.
-    When a user types in inputs and clicks the button in the GUI,
-    this will get the corresponding moonphase, moonrise/set. AND,
-    it will also get the corresponding moonphase image to match!
-
-    Citations
-    ---------
-    (0) Title: The Tkinter PhotoImage Class
-    Author: Unknown
-    Date: Unknown
-    Code Version: N/A
-    Availability: https://tinyurl.com/3bnlgx
-
-    (1) Title: Why do my Tkinter images not appear?
-    Author: Unknown
-    Date: Unknown
-    Code Version: N/A
-    Availability: https://tinyurl.com/v8p9b
-
-    (2) Title: Stackoverflow : How do you replace a label in Tkinter python?
-    Author: Bryan Oakley
-    Date: December 8th, 2013
-    Code Version: N/A
-    Availability: https://tinyurl.com/ydcab26a
+from moon_module.compare import compare_cities
+from moon_module.functions import check_date, moon_scraper, month_table
+from moon_module.gazetteer import get_gazetteer
+from moon_module.gui_worker import LookupWorker
+from moon_module.month_cache import MISSING
+from moon_module.month_view import (cached_month, calendar_weeks, month_days,
+                                    shift_month)
+from moon_module.phase_images import FALLBACK, PhaseImages, tk_thumbnail
+from moon_module.prefetch import Prefetcher
+
+
+def main():
+    """Make the GUI (root & every widget/window in it) & run it.
+    (Nothing's made at import, so importing this doesn't open a window)
     """
-    get_year = entry_year.get()
-    get_month = entry_month.get()
-    get_day = entry_day.get()
-
-    # If no city given, default to "San Diego" because I had a habit of not
-    # inputting any city parameter, so I hope this helps users like me.
-    if entry_city.get() == "":
-        get_city = "San Diego"
-    else:
-        get_city = entry_city.get()
-
-    # output of moon_info = ["moonrise","moonset","moon phase"]
-    moon_info = date_check(get_city, get_year, get_month, get_day)
-
-    phase_img_loc = f"../moon_images/moon_phases/{moon_info[2]}.png"
-    # (0) I'm not risking an AI violation for no citation.
-    phase_img = ImageTk.PhotoImage(Image.open(phase_img_loc))
-
-    label_img = tk.Label(frame_img, image=phase_img)
-    # (1) To avoid having blank images on GUI input changes.
-    label_img.image = phase_img
+    root = tk.Tk()
+    root.title("Moon Info GUI")
+    root.iconbitmap("../moon_images/moon.ico")
+    root.resizable(width=False, height=False)
+
+    default_font = font.nametofont("TkDefaultFont")
+    default_font.configure(family="Verdana", size=9)
+
+    # create the main containers
+    frame_date = tk.Frame(root, bg="gray32", width=310, height=30,
+                          padx=4, pady=4)
+    frame_city = tk.Frame(root, bg="gray32", width=310, height=30,
+                          padx=4, pady=4)
+    frame_img = tk.Frame(root, bg="gray32", width=310, height=310,
+                         padx=4, pady=2)
+    frame_info = tk.Frame(root, bg="gray32", width=310, height=90,
+                          padx=4, pady=4)
+
+    # layout the main containers
+    frame_date.grid(row=0, sticky="ew")
+    frame_city.grid(row=1, sticky="ew")
+    frame_img.grid(row=2, sticky="ew")
+    frame_info.grid(row=3, sticky="ew")
+
+    # widgets for frame_date
+    label_date = tk.Label(frame_date, text="Date:")
+    label_month = tk.Label(frame_date, text="MM")
+    label_day = tk.Label(frame_date, text="DD")
+    label_year = tk.Label(frame_date, text="YYYY")
+    entry_month = tk.Entry(frame_date, width=3)
+    entry_day = tk.Entry(frame_date, width=3)
+    entry_year = tk.Entry(frame_date, width=5)
+
+    # layout for frame_date
+    label_date.grid(row=0)
+    label_month.grid(row=0, column=1, padx=6)
+    label_day.grid(row=0, column=3, padx=6)
+    label_year.grid(row=0, column=5, padx=6)
+    entry_month.grid(row=0, column=2)
+    entry_day.grid(row=0, column=4)
+    entry_year.grid(row=0, column=6)
+
+    # widgets for frame_city
+    label_city = tk.Label(frame_city, text="US City:")
+    entry_city = tk.Entry(frame_city, width=24)
+
+    # layout for frame_city
+    label_city.grid(row=0)
+    entry_city.grid(row=0, column=1, padx=6)
+
+    # autocomplete for entry_city (only shown while there are suggestions)
+    list_cities = tk.Listbox(frame_city, width=24, height=4,
+                             activestyle="none")
+
+    def suggest_cities(event=None):
+        """Show the gazetteer cities that start with what's in entry_city."""
+        typed = entry_city.get()
+        matches = get_gazetteer().complete(typed, limit=4)
+
+        list_cities.delete(0, tk.END)
+        for city in matches:
+            list_cities.insert(tk.END, city.label)
+
+        # Nothing to suggest, or the city is already picked, so get out of
+        # the way.
+        if not matches or [city.label for city in matches] == [typed]:
+            list_cities.grid_remove()
+        else:
+            list_cities.configure(height=len(matches))
+            list_cities.grid(row=1, column=1, padx=6, sticky="w")
+
+    def pick_city(event=None):
+        """Put the clicked suggestion into entry_city."""
+        selection = list_cities.curselection()
+        if selection:
+            entry_city.delete(0, tk.END)
+            entry_city.insert(0, list_cities.get(selection[0]))
+        list_cities.grid_remove()
+
+    entry_city.bind("<KeyRelease>", suggest_cities)
+    # Typing something new means the old prefetch guesses are off.
+    for entry in (entry_month, entry_day, entry_year, entry_city):
+        entry.bind("<Key>", lambda event: prefetcher.cancel(), add="+")
+    list_cities.bind("<<ListboxSelect>>", pick_city)
+
+    # Every phase picture, decoded once & reused on every click.
+    phase_images = PhaseImages()
+
+    # widgets for frame_img (the default image is the "Invalid Date" one)
+    label_img = tk.Label(frame_img, image=phase_images.get(FALLBACK))
+
+    # layout for frame_img
     label_img.grid(row=0)
 
-    # (2) This allows GUI input texts to update, w/o overlaying each other.
-    phase_input.configure(text=moon_info[2])
-    rise_input.configure(text=moon_info[0])
-    set_input.configure(text=moon_info[1])
-
-# widget & layout for input button
-button_input = tk.Button(frame_date,
-                         text="Enter", width=4, command=upon_click)
-button_input.grid(row=0, column=7, padx=(9, 0))
-
-root.mainloop()
+    # widgets for frame_info
+    label_phase = tk.Label(frame_info, text="Moon Phase:")
+    label_rise = tk.Label(frame_info, text="Moonrise:")
+    label_set = tk.Label(frame_info, text="Moonset:")
+    phase_input = tk.Label(frame_info, text="Awaiting Moon Phase")
+    rise_input = tk.Label(frame_info, text="Awaiting Moon Rise")
+    set_input = tk.Label(frame_info, text="Awaiting Moon Set")
+
+    # layout for frame_info
+    label_phase.grid(row=0, sticky="w", padx=(0, 5))
+    label_rise.grid(row=1, sticky="w", pady=4)
+    label_set.grid(row=2, sticky="w")
+    phase_input.grid(row=0, column=1, sticky="w")
+    rise_input.grid(row=1, column=1, sticky="w")
+    set_input.grid(row=2, column=1, sticky="w")
+
+    # Scraping runs on this worker's thread, so mainloop never waits on it.
+    lookup_worker = LookupWorker(moon_scraper)
+    # The (city, year, month) of the newest lookup, for prefetcher.warm().
+    lookup_month = [None]
+
+    # Once a lookup is done, the next & previous month (& recent cities) get
+    # downloaded in the background, but only while no lookup (or comparison)
+    # is going.
+    prefetcher = Prefetcher(
+        busy=lambda: lookup_worker.busy or month_worker.busy
+        or compare_worker.busy)
+
+    # How often (ms) to check on the worker, & the "Loading" animation frames.
+    POLL_MS = 50
+    LOADING_FRAMES = ("Loading", "Loading.", "Loading..", "Loading...")
+
+    def show_phase(moon_phase: str):
+        """Show the moon phase & its picture.
+        The same label_img gets its picture swapped, & phase_images hands
+        back the already decoded picture, so clicking doesn't pile anything up.
+        (phase_images also keeps the picture alive, so it doesn't go blank)
+        """
+        label_img.configure(image=phase_images.get(moon_phase))
+        phase_input.configure(text=moon_phase)
+
+    def poll_lookup(frame: int = 0):
+        """Check on the worker every POLL_MS, until the newest lookup is done.
+        Meanwhile, the moonrise/moonset labels show a "Loading..." animation.
+        """
+        done = lookup_worker.poll()
+
+        if done is not None:
+            if done.error is not None:
+                rise_input.configure(text="Couldn't reach the website")
+                set_input.configure(text="Try again in a bit")
+            else:
+                rise_input.configure(text=done.result[0])
+                set_input.configure(text=done.result[1])
+                prefetcher.warm(*lookup_month[0])
+            root.configure(cursor="")
+        elif lookup_worker.busy:
+            # Every 6th poll, so the dots move ~3 times a second.
+            loading = LOADING_FRAMES[(frame // 6) % len(LOADING_FRAMES)]
+            rise_input.configure(text=loading)
+            set_input.configure(text=loading)
+            root.after(POLL_MS, poll_lookup, frame + 1)
+
+    def upon_click():
+        """Takes GUI inputs & outputs moonphase, pic of phase, & moonrise/set.
+        When a user types in inputs and clicks the button in the GUI,
+        this will get the corresponding moonphase, moonrise/set. AND,
+        it will also get the corresponding moonphase image to match!
+
+        The moon phase is computed right here, so it shows up right away.
+        The moonrise/moonset is scraped by lookup_worker in the background
+        (see poll_lookup), & clicking again makes the old lookup stale.
+
+        Citations
+        ---------
+        (2) Title: Stackoverflow : How do you replace a label in Tkinter
+        python?
+        Author: Bryan Oakley
+        Date: December 8th, 2013
+        Code Version: N/A
+        Availability: https://tinyurl.com/ydcab26a
+        """
+        get_year = entry_year.get()
+        get_month = entry_month.get()
+        get_day = entry_day.get()
+
+        # If no city given, default to "San Diego" because I had a habit of not
+        # inputting any city parameter, so I hope this helps users like me.
+        if entry_city.get() == "":
+            get_city = "San Diego"
+        else:
+            get_city = entry_city.get()
+
+        date, moon_phase = check_date(get_year, get_month, get_day)
+        show_phase(moon_phase)
+
+        # (2) This allows GUI input texts to update, w/o overlaying each other.
+        if date is None:
+            # Cannot compute anything w/o the date.
+            lookup_worker.cancel()
+            rise_input.configure(text="Invalid Date")
+            set_input.configure(text="Invalid Date")
+            root.configure(cursor="")
+            return
+
+        # Only start polling if it isn't already going for an older lookup.
+        already_polling = lookup_worker.busy
+        lookup_worker.submit(get_city, *date)
+        lookup_month[0] = (get_city, date[0], date[1])
+        root.configure(cursor="watch")
+        if not already_polling:
+            poll_lookup()
+
+    # widget & layout for input button
+    button_input = tk.Button(frame_date,
+                             text="Enter", width=4, command=upon_click)
+    button_input.grid(row=0, column=7, padx=(9, 0))
+
+    # The month view: its own window, made once & hidden/shown after that.
+    window_month = tk.Toplevel(root, bg="gray32", padx=4, pady=4)
+    window_month.title("Moon Month")
+    window_month.resizable(width=False, height=False)
+    window_month.protocol("WM_DELETE_WINDOW", window_month.withdraw)
+    window_month.withdraw()
+
+    # Small phase pictures for the month view, decoded once like the big ones.
+    phase_thumbnails = PhaseImages(make_image=tk_thumbnail)
+
+    # widgets for window_month (7 x 6 day cells, reconfigured when paging)
+    frame_month_head = tk.Frame(window_month, bg="gray32")
+    frame_month_days = tk.Frame(window_month, bg="gray32")
+    label_month_title = tk.Label(frame_month_head, width=28)
+    weekday_labels = [tk.Label(frame_month_days, text=name, width=9)
+                      for name in ("Sun", "Mon", "Tue", "Wed", "Thu", "Fri",
+                                   "Sat")]
+    day_cells = [[tk.Label(frame_month_days, compound="top", width=64,
+                           height=92, font=("Verdana", 7), justify="center")
+                  for _ in range(7)] for _ in range(6)]
+
+    # layout for window_month
+    frame_month_head.grid(row=0, pady=(0, 4))
+    frame_month_days.grid(row=1)
+    for column, label_weekday in enumerate(weekday_labels):
+        label_weekday.grid(row=0, column=column, padx=1, pady=1)
+    for row, week_cells in enumerate(day_cells, start=1):
+        for column, cell in enumerate(week_cells):
+            cell.grid(row=row, column=column, padx=1, pady=1)
+
+    # The month shown ([year, month]) & the city it's for.
+    month_shown = [0, 0]
+    month_city = ["San Diego"]
+
+    # Month tables get looked up on their own worker, like lookup_worker.
+    month_worker = LookupWorker(month_table)
+
+    def fill_month(month_rows=MISSING):
+        """Put the shown month's days (& their phase pictures) in the cells."""
+        year, month = month_shown
+        days = month_days(year, month, month_rows)
+        # An invalid city's "Invalid City Name OR..." won't fit in a cell.
+        no_table = " (no moonrise/set)" if month_rows is None else ""
+        label_month_title.configure(
+            text=f"{days[0].date:%B %Y} - {month_city[0]}{no_table}")
+
+        for week, week_cells in zip(
+                calendar_weeks(year, month) + [[0] * 7] * 6, day_cells):
+            for day, cell in zip(week, week_cells):
+                if day == 0:
+                    cell.configure(image="", text="")
+                    continue
+                moon_day = days[day - 1]
+                rise_and_set = "" if month_rows is None else \
+                    f"\n{moon_day.moonrise}\n{moon_day.moonset}"
+                cell.configure(image=phase_thumbnails.get(moon_day.phase),
+                               text=f"{day}{rise_and_set}")
+
+    def poll_month():
+        """Check on month_worker every POLL_MS, until the month is there."""
+        done = month_worker.poll()
+        if done is not None:
+            if done.error is not None:
+                label_month_title.configure(text="Couldn't reach the website")
+            else:
+                fill_month(done.result)
+                prefetcher.warm(month_city[0], *month_shown)
+            window_month.configure(cursor="")
+        elif month_worker.busy:
+            root.after(POLL_MS, poll_month)
+
+    def show_month(year: int, month: int):
+        """Show a month: the phases right away, & the moonrise/moonset as
+        soon as its one month table is there. (Right away too, if cached)
+        """
+        month_shown[:] = [year, month]
+        month_rows = cached_month(month_city[0], year, month)
+        fill_month(month_rows)
+        if month_rows is not MISSING:
+            month_worker.cancel()
+            window_month.configure(cursor="")
+            prefetcher.warm(month_city[0], year, month)
+            return
+
+        already_polling = month_worker.busy
+        month_worker.submit(month_city[0], year, month)
+        window_month.configure(cursor="watch")
+        if not already_polling:
+            poll_month()
+
+    def open_month():
+        """Show the month view, for the month (& city) typed in the GUI."""
+        date, _ = check_date(entry_year.get(), entry_month.get(), "1")
+        if date is None:
+            date, _ = check_date(*month_shown, 1)
+        if date is None:
+            phase_input.configure(text="Type in a year & month first")
+            return
+
+        month_city[0] = entry_city.get() or "San Diego"
+        window_month.deiconify()
+        window_month.lift()
+        show_month(date[0], date[1])
+
+    def page_month(step: int):
+        """Go step months back (-1) or forward (1) in the month view."""
+        show_month(*shift_month(*month_shown, step))
+
+    # widgets & layout for the month view's buttons
+    button_month = tk.Button(frame_city, text="Month", width=5,
+                             command=open_month)
+    button_month.grid(row=0, column=2, padx=(4, 0))
+    button_prev = tk.Button(frame_month_head, text="<", width=3,
+                            command=lambda: page_month(-1))
+    button_next = tk.Button(frame_month_head, text=">", width=3,
+                            command=lambda: page_month(1))
+    button_prev.grid(row=0, column=0)
+    label_month_title.grid(row=0, column=1, padx=6)
+    button_next.grid(row=0, column=2)
+    window_month.bind("<Left>", lambda event: page_month(-1))
+    window_month.bind("<Right>", lambda event: page_month(1))
+
+    # The compare panel: one date (from the main window), many cities at once.
+    window_compare = tk.Toplevel(root, bg="gray32", padx=4, pady=4)
+    window_compare.title("Moon Compare")
+    window_compare.protocol("WM_DELETE_WINDOW", window_compare.withdraw)
+    window_compare.withdraw()
+
+    # widgets for window_compare (cities one per line, since they have commas)
+    label_compare_cities = tk.Label(window_compare,
+                                    text="US Cities (1 per line):")
+    text_compare_cities = tk.Text(window_compare, width=28, height=8)
+    label_compare_title = tk.Label(window_compare, text="", width=40)
+    tree_compare = ttk.Treeview(window_compare, height=8, show="headings",
+                                columns=("city", "moonrise", "moonset"))
+    for column, heading, width in (("city", "City", 150),
+                                   ("moonrise", "Moonrise", 140),
+                                   ("moonset", "Moonset", 140)):
+        tree_compare.heading(column, text=heading)
+        tree_compare.column(column, width=width, anchor="w")
+
+    # All the cities are looked up at once, on their own worker.
+    compare_worker = LookupWorker(compare_cities)
+
+    def fill_compare(comparison):
+        """Show the phase once & a row per city."""
+        label_compare_title.configure(text=comparison.phase)
+        tree_compare.delete(*tree_compare.get_children())
+        for row in comparison.table()[1:]:
+            tree_compare.insert("", tk.END, values=row)
+
+    def poll_compare():
+        """Check on compare_worker every POLL_MS, until every city is there."""
+        done = compare_worker.poll()
+        if done is not None:
+            if done.error is not None:
+                label_compare_title.configure(
+                    text="Couldn't reach the website")
+            else:
+                fill_compare(done.result)
+            window_compare.configure(cursor="")
+        elif compare_worker.busy:
+            root.after(POLL_MS, poll_compare)
+
+    def run_compare():
+        """Compare every city in the panel, on the date typed in the GUI."""
+        cities = [city.strip() for city in
+                  text_compare_cities.get("1.0", tk.END).splitlines()
+                  if city.strip()]
+        if not cities:
+            label_compare_title.configure(text="Type in some cities first")
+            return
+
+        already_polling = compare_worker.busy
+        compare_worker.submit(cities, entry_year.get(), entry_month.get(),
+                              entry_day.get())
+        label_compare_title.configure(text="Loading...")
+        window_compare.configure(cursor="watch")
+        if not already_polling:
+            poll_compare()
+
+    def open_compare():
+        """Show the compare panel, starting with the city typed in the GUI."""
+        if not text_compare_cities.get("1.0", tk.END).strip():
+            text_compare_cities.insert("1.0", entry_city.get() or "San Diego")
+        window_compare.deiconify()
+        window_compare.lift()
+        text_compare_cities.focus_set()
+
+    # widgets & layout for the compare panel's buttons
+    button_compare = tk.Button(frame_city, text="Compare", width=7,
+                               command=open_compare)
+    button_compare.grid(row=0, column=3, padx=(4, 0))
+    button_run_compare = tk.Button(window_compare, text="Compare", width=7,
+                                   command=run_compare)
+    label_compare_cities.grid(row=0, column=0, sticky="w")
+    text_compare_cities.grid(row=1, column=0, rowspan=2, sticky="n")
+    button_run_compare.grid(row=0, column=1, sticky="w", padx=(6, 0))
+    label_compare_title.grid(row=1, column=1, sticky="w", padx=(6, 0))
+    tree_compare.grid(row=2, column=1, padx=(6, 0))
+
+    # Decode the rest of the pictures once the window is up, not on a click.
+    root.after_idle(phase_images.preload)
+    root.after_idle(phase_thumbnails.preload)
+
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Local HTTP/JSON service for moon lookups, shared by every tool.
+
+Notes
+-----
+For example:
+    python moon_service.py --port 8080
+    curl "localhost:8080/riseset?city=San%20Diego&date=2020-05-12"
+See moon_module/service.py for every endpoint.
+"""
+import os
+import sys
+import argparse
+
+# Unlike the GUI, this can be run from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..'))
+from moon_module import functions
+from moon_module.month_cache import MonthCache
+from moon_module.service import run_service
+
+
+def main(argv=None):
+    """Run the service until Ctrl+C."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--upstream-limit", type=int, default=32,
+                        help="most month pages downloading at once")
+    parser.add_argument("--max-concurrent", type=int, default=64,
+                        help="most requests answered at once")
+    parser.add_argument("--max-waiting", type=int, default=256,
+                        help="most requests waiting, before 503s")
+    parser.add_argument("--fresh-hours", type=float, default=6,
+                        help="hours a month table is fresh for")
+    parser.add_argument("--max-stale-hours", type=float, default=0,
+                        help="hours past that it's still answered with, "
+                             "while it downloads again")
+    args = parser.parse_args(argv)
+
+    functions.MONTH_CACHE = MonthCache(
+        max_entries=functions.MONTH_CACHE.max_entries,
+        ttl=args.fresh_hours * 60 * 60,
+        max_stale=args.max_stale_hours * 60 * 60)
+
+    run_service(args.host, args.port, upstream_limit=args.upstream_limit,
+                max_concurrent=args.max_concurrent,
+                max_waiting=args.max_waiting)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
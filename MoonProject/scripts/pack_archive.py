@@ -0,0 +1,44 @@
+"""Download every month page of some cities into a replay archive.
+
+Notes
+-----
+For example, to pack 10 cities' months from 2020 to 2030:
+    python pack_archive.py top_cities.zip --years 2020 2030
+    python pack_archive.py sd.zip --cities "San Diego" "Concord, CA"
+Then, with MOON_ARCHIVE_PATH=top_cities.zip set, the GUI, moon_cli.py &
+date_check look those months up without touching the internet.
+See moon_module/page_archive.py for the rest.
+"""
+import os
+import sys
+import argparse
+
+# Unlike the GUI, this can be run from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..'))
+from moon_module.page_archive import pack_archive
+
+# The 10 biggest US cities.
+TOP_CITIES = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix",
+              "Philadelphia", "San Antonio", "San Diego", "Dallas",
+              "San Jose"]
+
+
+def main(argv=None):
+    """Pack the archive, & print how many pages it has."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="the zip file (added to, if it exists)")
+    parser.add_argument("--cities", nargs="+", default=TOP_CITIES,
+                        help="US cities (default: the 10 biggest)")
+    parser.add_argument("--years", nargs=2, type=int, metavar=("FIRST",
+                        "LAST"), default=(2020, 2030))
+    args = parser.parse_args(argv)
+
+    first, last = args.years
+    pages = pack_archive(args.path, args.cities, range(first, last + 1))
+    print(f"{args.path}: {pages} month pages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())